@@ -1,17 +1,24 @@
+import argparse
+from contextlib import contextmanager
 from copy import copy
 import os
 import json
 import subprocess
 import csv
 import random
+import re
+import threading
 import time
 from pathlib import Path
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 import psycopg2
 import httpx
 from python_on_whales import DockerClient
 import datetime
 
+import loadgen
+
 # Load environment variables
 load_dotenv(".docker.env", override=True)
 
@@ -27,41 +34,831 @@ DURATION = os.getenv("DURATION_SECONDS", "60")  # 1 minute per test for stable r
 CONCURRENCY = os.getenv("CONCURRENCY", "50")
 THREADS = os.getenv("THREADS", "2")
 DATA_PATH = Path("data/products.csv")
-OUTPUT_PATH = Path(
-    f"results/benchmark_wrk_results_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+RESULTS_DIR = Path("results")
+RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+
+# --- COMMAND LINE ---
+# Rows are appended to the CSV files as they are produced, and every finished
+# cell (a test case of one service and server config, or a whole optional
+# pass) is recorded in the run's manifest. --resume continues a run that was
+# interrupted: it appends to the same files and skips the cells already done.
+parser = argparse.ArgumentParser(description="Benchmark the framework services.")
+parser.add_argument(
+    "--resume",
+    nargs="?",
+    const="latest",
+    metavar="RESULTS_CSV",
+    help="continue the run that wrote RESULTS_CSV (default: the latest run)",
 )
-OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+ARGS, _ = parser.parse_known_args()
+
+
+def latest_run():
+    """Main CSV of the most recent run that has a manifest, or None."""
+    manifests = sorted(RESULTS_DIR.glob("benchmark_wrk_results_*_manifest.jsonl"))
+    if not manifests:
+        return None
+    return manifests[-1].with_name(manifests[-1].name.removesuffix("_manifest.jsonl") + ".csv")
+
+
+if ARGS.resume == "latest":
+    OUTPUT_PATH = latest_run()
+    if OUTPUT_PATH is None:
+        parser.error(f"no run to resume in {RESULTS_DIR}/")
+elif ARGS.resume:
+    OUTPUT_PATH = Path(ARGS.resume)
+else:
+    OUTPUT_PATH = RESULTS_DIR / (
+        f"benchmark_wrk_results_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    )
+MANIFEST_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_manifest.jsonl")
 
 FRAMEWORK_SERVICES = [
     "flask",
     "django",
+    "django-lean-middleware",
+    "django-lean",
     "fastapi-uvicorn-async",
     "fastapi-uvicorn-sync",
     "fastapi-gunicorn-async",
     "fastapi-gunicorn-sync",
+    "fastapi-hypercorn-async",
+    "fastapi-hypercorn-sync",
+    "django-asgi",
     "express",
     "gin",
 ]
 DB_SERVICE = "db"
+# Streaming replica of DB_SERVICE, only started by the replica pass
+DB_REPLICA_SERVICE = "db-replica"
+
+# --- SERVER / WORKER MATRIX ---
+# With SERVER_MATRIX=true every Python service listed below is benchmarked
+# once per server configuration and worker count instead of once with its
+# defaults. The values are exported to docker compose, which passes them to
+# serve.sh / gunicorn.conf.py inside the container (see x-server-env).
+SERVER_MATRIX = os.getenv("SERVER_MATRIX", "false").lower() == "true"
+HOST_CPUS = os.cpu_count() or 1
+GTHREAD_THREADS = os.getenv("GTHREAD_THREADS", "4")
+
+
+def default_worker_counts():
+    """Powers of two from 1 up to the number of cores, plus the core count."""
+    counts = []
+    n = 1
+    while n < HOST_CPUS:
+        counts.append(n)
+        n *= 2
+    counts.append(HOST_CPUS)
+    return counts
+
+
+WORKER_COUNTS = [
+    int(n) for n in os.getenv("WORKER_COUNTS", "").split(",") if n.strip()
+] or default_worker_counts()
+
+WSGI_SERVER_CONFIGS = [
+    {"SERVER": "gunicorn", "WORKER_CLASS": "sync"},
+    {"SERVER": "gunicorn", "WORKER_CLASS": "gthread", "WORKER_THREADS": GTHREAD_THREADS},
+    {"SERVER": "gunicorn", "WORKER_CLASS": "gevent"},
+    {"SERVER": "granian"},
+]
+ASGI_SERVER_CONFIGS = [
+    {"SERVER": "gunicorn", "WORKER_CLASS": "uvicorn.workers.UvicornWorker"},
+    {"SERVER": "uvicorn"},
+    {"SERVER": "granian"},
+    {"SERVER": "hypercorn"},
+]
+# Services swept by the matrix. The fastapi-uvicorn-* services run the same
+# images as fastapi-gunicorn-*, so they are only run with their defaults.
+SERVER_MATRIX_SERVICES = {
+    "flask": WSGI_SERVER_CONFIGS,
+    "django": WSGI_SERVER_CONFIGS,
+    "fastapi-gunicorn-async": ASGI_SERVER_CONFIGS,
+    "fastapi-gunicorn-sync": ASGI_SERVER_CONFIGS,
+}
+# What each service runs when nothing is overridden (mirrors the compose file).
+SERVICE_SERVER_DEFAULTS = {
+    "flask": {"SERVER": "gunicorn", "WORKER_CLASS": "sync"},
+    "django": {"SERVER": "gunicorn", "WORKER_CLASS": "sync"},
+    "django-lean-middleware": {"SERVER": "gunicorn", "WORKER_CLASS": "sync"},
+    "django-lean": {"SERVER": "gunicorn", "WORKER_CLASS": "sync"},
+    "fastapi-uvicorn-async": {"SERVER": "uvicorn"},
+    "fastapi-uvicorn-sync": {"SERVER": "uvicorn"},
+    "fastapi-gunicorn-async": {
+        "SERVER": "gunicorn",
+        "WORKER_CLASS": "uvicorn.workers.UvicornWorker",
+    },
+    "fastapi-gunicorn-sync": {
+        "SERVER": "gunicorn",
+        "WORKER_CLASS": "uvicorn.workers.UvicornWorker",
+    },
+    "fastapi-hypercorn-async": {"SERVER": "hypercorn"},
+    "fastapi-hypercorn-sync": {"SERVER": "hypercorn"},
+    "django-asgi": {"SERVER": "hypercorn"},
+    "express": {"SERVER": "node"},
+    "gin": {"SERVER": "gin"},
+}
+
+# --- OVERLOAD / ADMISSION CONTROL ---
+# With OVERLOAD=true the sync Python services are also driven far past
+# saturation through loadgen (wrk cannot split latency by status code), once
+# without limits and once with admission control, to compare goodput and the
+# p99 of the requests that were actually admitted.
+OVERLOAD = os.getenv("OVERLOAD", "false").lower() == "true"
+OVERLOAD_CONCURRENCY = int(os.getenv("OVERLOAD_CONCURRENCY", "256"))
+OVERLOAD_DURATION = int(os.getenv("OVERLOAD_DURATION_SECONDS", DURATION))
+OVERLOAD_CASES = ["Get Product", "List Products"]
+# Flask runs gevent workers here: a sync worker never has more than one
+# request in flight, so there would be nothing to shed.
+OVERLOAD_SERVICES = {
+    "flask": {"WORKER_CLASS": "gevent"},
+    "fastapi-uvicorn-sync": {},
+    "fastapi-gunicorn-sync": {},
+}
+ADMISSION_PROFILES = {
+    "unbounded": {"MEASURE_QUEUE_TIME": "true"},
+    "admission-control": {
+        "MEASURE_QUEUE_TIME": "true",
+        "MAX_IN_FLIGHT": os.getenv("OVERLOAD_MAX_IN_FLIGHT", "32"),
+        "DB_STATEMENT_TIMEOUT_MS": os.getenv("OVERLOAD_STATEMENT_TIMEOUT_MS", "1000"),
+    },
+}
+OVERLOAD_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_overload.csv")
+
+# With FORTUNE_PROBE=true /fortune is rendered at several page sizes in both
+# FORTUNE_MODEs (buffered vs streamed from a server-side cursor). Requests are
+# sequential so time-to-first-byte and the container's peak memory above idle
+# can be attributed to a single page render.
+FORTUNE_PROBE = os.getenv("FORTUNE_PROBE", "false").lower() == "true"
+FORTUNE_ROWS = [int(n) for n in os.getenv("FORTUNE_ROWS", "100,1000,10000").split(",")]
+FORTUNE_PROBE_REQUESTS = int(os.getenv("FORTUNE_PROBE_REQUESTS", "20"))
+FORTUNE_MODES = ["buffered", "streaming"]
+FORTUNE_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+FORTUNE_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_fortune.csv")
+
+# With EXPORT=true the product table is grown to EXPORT_ROWS rows and each
+# Python service streams it through /products/export in every format,
+# recording throughput (MB/s) and the container's peak memory above idle.
+EXPORT = os.getenv("EXPORT", "false").lower() == "true"
+EXPORT_ROWS = int(os.getenv("EXPORT_ROWS", "1000000"))
+EXPORT_FORMATS = ["ndjson", "csv"]
+EXPORT_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+EXPORT_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_export.csv")
+
+# With SEARCH=true the product table is grown to SEARCH_ROWS rows and the
+# /products/search cases run against each Python service twice: with the
+# secondary indexes below, then again after dropping them (sequential scans).
+SEARCH = os.getenv("SEARCH", "false").lower() == "true"
+SEARCH_ROWS = int(os.getenv("SEARCH_ROWS", "1000000"))
+# Selectivities are those of data/products.csv, which scaling preserves.
+SEARCH_CASES = [
+    # 0.05% of rows
+    {"name": "Search Brand", "params": {"brand": "Kennedy LLC"}},
+    # 0.4%
+    {
+        "name": "Search Category + Price",
+        "params": {"category": "Team Sports", "min_price": 100, "max_price": 200},
+    },
+    # 1%
+    {"name": "Search Price Range", "params": {"min_price": 100, "max_price": 110}},
+    # 16%: LIMIT 100 is met early, so the index matters least here
+    {"name": "Search Availability", "params": {"availability": "in_stock"}},
+    # 0.5%
+    {"name": "Search Name Prefix", "params": {"prefix": "Smart Fan"}},
+    # 0.15%
+    {"name": "Search Name Contains", "params": {"q": "wireless speaker"}},
+]
+SEARCH_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+SEARCH_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_search.csv")
+# Secondary indexes behind /products/search; the Django model declares the
+# same ones (products/migrations/0003_product_search_indexes.py).
+SEARCH_INDEXES = {
+    "product_category_idx": "ON product (category)",
+    "product_brand_idx": "ON product (brand)",
+    "product_availability_idx": "ON product (availability)",
+    "product_price_idx": "ON product (price)",
+    "product_name_prefix_idx": "ON product (name text_pattern_ops)",
+    # UPPER(name) LIKE '%...%' is what every app's substring search sends.
+    "product_name_trgm_idx": "ON product USING gin (UPPER(name) gin_trgm_ops)",
+}
+# With STATS=true GET /products/stats is benchmarked at each STATS_ROWS table
+# size, served from the trigger-maintained summary and from a full GROUP BY.
+STATS = os.getenv("STATS", "false").lower() == "true"
+STATS_ROWS = [int(n) for n in os.getenv("STATS_ROWS", "10000,100000,1000000").split(",")]
+STATS_MODES = ["summary", "naive"]
+STATS_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+STATS_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_stats.csv")
+# With REVALIDATION=true the product detail and list endpoints are polled by
+# clients that already hold the current ETag: REVALIDATION_RATIO of the
+# requests send it in If-None-Match (answered with an empty 304) and the rest
+# are plain GETs. Each case also runs at ratio 0, the baseline for the bytes
+# saved and RPS gained.
+REVALIDATION = os.getenv("REVALIDATION", "false").lower() == "true"
+REVALIDATION_RATIO = float(os.getenv("REVALIDATION_RATIO", "0.9"))
+REVALIDATION_CASES = [
+    {"name": "Get Product", "path": "/products/1"},
+    {"name": "List Products", "path": "/products"},
+]
+REVALIDATION_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+REVALIDATION_OUTPUT_PATH = OUTPUT_PATH.with_name(
+    OUTPUT_PATH.stem + "_revalidation.csv"
+)
+# With COMPRESSION_BENCHMARK=true each Python service runs with every codec
+# enabled and the cases below are requested with one Accept-Encoding at a
+# time, recording bytes on the wire per request (wrk's Transfer/sec) against
+# the CPU the container burns per request (docker stats). COMPRESSION_LEVEL
+# and COMPRESSION_MIN_SIZE from .docker.env apply as usual.
+COMPRESSION_BENCHMARK = os.getenv("COMPRESSION_BENCHMARK", "false").lower() == "true"
+COMPRESSION_ENCODINGS = os.getenv("COMPRESSION_ENCODINGS", "identity,gzip,br,zstd").split(",")
+COMPRESSION_CASES = [
+    {"name": "List Products", "path": "/products"},
+    {"name": "Fortune 100", "path": "/fortune"},
+]
+COMPRESSION_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+COMPRESSION_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_compression.csv")
+# With JSON_BENCHMARK=true GET /json?size=&depth= is benchmarked on each
+# Python service once per JSON_ENCODER backend, for every size x depth pair
+# in JSON_PAYLOADS (records x nesting levels per record).
+JSON_BENCHMARK = os.getenv("JSON_BENCHMARK", "false").lower() == "true"
+JSON_ENCODERS = os.getenv("JSON_ENCODERS", "stdlib,ujson,orjson,msgspec").split(",")
+JSON_PAYLOADS = [
+    tuple(int(n) for n in pair.split("x"))
+    for pair in os.getenv("JSON_PAYLOADS", "1x1,100x1,100x8,10000x1").split(",")
+]
+JSON_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+JSON_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_json.csv")
+
+# --- STORAGE PASS ---
+# With STORAGE=true TEST_CASES run on each Python service twice: against
+# Postgres, then with STORAGE_BACKEND=memory, where products live in the
+# worker's memory and no request reaches the database. The memory run is the
+# framework's own ceiling; db_time_pct is the share of the full-stack time
+# per request that the database round trips account for.
+STORAGE = os.getenv("STORAGE", "false").lower() == "true"
+STORAGE_BACKENDS = ["postgres", "memory"]
+STORAGE_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+STORAGE_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_storage.csv")
+
+# --- POSTGRES STATISTICS ---
+# With PG_STATS=true every test case starts from a reset pg_stat_statements
+# (the db service preloads it) and a pg_stat_database snapshot. Afterwards
+# the case's result row gains the statements, database time, commits,
+# rollbacks and buffer hits/reads per request, and the PG_STATS_TOP
+# statements by total time go to *_pgstats.csv.
+PG_STATS = os.getenv("PG_STATS", "false").lower() == "true"
+PG_STATS_TOP = int(os.getenv("PG_STATS_TOP", "10"))
+# Backends flush their pg_stat_database counters at most once a second.
+PG_STATS_FLUSH_SECONDS = 1.5
+PG_STATS_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_pgstats.csv")
+
+# --- QUERY PLAN PASS ---
+# With PLANS=true the db service runs auto_explain (ANALYZE, BUFFERS) for
+# every statement while each Python service answers PLAN_REQUESTS sequential
+# requests per PLAN_CASES entry on a PLAN_ROWS-row table. The logged plans
+# are checked for large sequential scans, sorts and OFFSET scans; findings
+# and suggested indexes go to *_plans.csv.
+PLANS = os.getenv("PLANS", "false").lower() == "true"
+PLAN_ROWS = int(os.getenv("PLAN_ROWS", "10000"))
+PLAN_REQUESTS = int(os.getenv("PLAN_REQUESTS", "3"))
+PLAN_OFFSET = int(os.getenv("PLAN_OFFSET", "5000"))
+# Scans reading (or OFFSETs skipping) fewer rows than this are not flagged.
+PLAN_MIN_ROWS = int(os.getenv("PLAN_MIN_ROWS", "1000"))
+PLAN_CASES = [
+    {"name": "Get Product", "path": "/products/1"},
+    {"name": "List Products", "path": "/products"},
+    {
+        "name": "List Products (deep offset)",
+        "path": f"/products?limit=100&offset={PLAN_OFFSET}",
+    },
+    {"name": "Batch Get Products", "path": "/products?ids=" + ",".join(map(str, range(1, 51)))},
+    {"name": "Fortune 100", "path": "/fortune"},
+    *(
+        {"name": case["name"], "path": f"/products/search?{urlencode(case['params'])}"}
+        for case in SEARCH_CASES
+    ),
+    {"name": "Stats (naive)", "path": "/products/stats?mode=naive"},
+]
+PLAN_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync",
+]
+PLANS_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_plans.csv")
+
+# --- COLD START PASS ---
+# With COLD_START=true every service is started COLD_START_RUNS times from a
+# stopped container. Each run records the seconds from `compose up` to the
+# first 200 from /plain-text (polled every COLD_START_POLL_SECONDS), then
+# the first and second request latency of each COLD_START_PATHS entry.
+# The Python services' app modules are also imported under
+# `python -X importtime`; the costliest packages go to *_importtime.csv.
+COLD_START = os.getenv("COLD_START", "false").lower() == "true"
+COLD_START_RUNS = int(os.getenv("COLD_START_RUNS", "5"))
+COLD_START_POLL_SECONDS = 0.05
+COLD_START_PATHS = ["/products/1", "/products", "/fortune"]
+# What each Python service imports before it can serve its first request
+IMPORT_TIME_MODULES = {
+    "flask": ["app"],
+    "django": ["core.wsgi", "core.urls"],
+    "django-lean-middleware": ["core.wsgi", "core.urls"],
+    "django-lean": ["core.wsgi", "core.urls"],
+    "fastapi-uvicorn-async": ["main"],
+    "fastapi-uvicorn-sync": ["main"],
+    "fastapi-gunicorn-async": ["main"],
+    "fastapi-gunicorn-sync": ["main"],
+}
+IMPORT_TIME_TOP = int(os.getenv("IMPORT_TIME_TOP", "15"))
+IMPORT_TIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+COLD_START_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_coldstart.csv")
+IMPORT_TIME_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_importtime.csv")
+
+# --- SOAK PASS ---
+# With SOAK=true each SOAK_SERVICES entry serves SOAK_PATH for
+# SOAK_DURATION_SECONDS, either closed loop at SOAK_CONCURRENCY or, with
+# SOAK_RATE > 0, at that many requests per second. Per-second RPS, p50/p99
+# and errors go to *_soak_timeseries.csv, the RSS of every process in the
+# container (sampled every SOAK_SAMPLE_SECONDS) to *_soak_memory.csv, and
+# per service drift, memory growth and the worst seconds to *_soak.csv.
+SOAK = os.getenv("SOAK", "false").lower() == "true"
+SOAK_DURATION = int(os.getenv("SOAK_DURATION_SECONDS", "3600"))
+SOAK_RATE = float(os.getenv("SOAK_RATE", "0"))
+SOAK_CONCURRENCY = int(os.getenv("SOAK_CONCURRENCY", CONCURRENCY))
+SOAK_PATH = os.getenv("SOAK_PATH", "/products")
+SOAK_SAMPLE_SECONDS = int(os.getenv("SOAK_SAMPLE_SECONDS", "10"))
+SOAK_SERVICES = os.getenv(
+    "SOAK_SERVICES", "flask,django,fastapi-uvicorn-async,fastapi-uvicorn-sync"
+).split(",")
+# Seconds excluded from the start of the drift comparison while the service warms up
+SOAK_WARMUP_SECONDS = 30
+SOAK_WORST_WINDOWS = 5
+SOAK_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_soak.csv")
+SOAK_TIMESERIES_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_soak_timeseries.csv")
+SOAK_MEMORY_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_soak_memory.csv")
+
+# --- GC PROFILE PASS ---
+# With GC_PROFILE=true the gunicorn services run the ORM-heavy cases with
+# GC_PROFILE_WORKERS workers, once as configured by default and once with
+# the app preloaded in the master, gc.freeze() before the forks and
+# GC_TUNED_THRESHOLD. Each row has the latency percentiles, the GC pauses
+# the workers reported on /metrics during the case, and the container's
+# RSS against its PSS: preloaded pages shared copy-on-write count fully in
+# every worker's RSS but only once in the PSS.
+GC_PROFILE = os.getenv("GC_PROFILE", "false").lower() == "true"
+GC_PROFILE_WORKERS = int(os.getenv("GC_PROFILE_WORKERS", "4"))
+GC_TUNED_THRESHOLD = os.getenv("GC_TUNED_THRESHOLD", "50000,20,20")
+GC_PROFILES = {
+    "default": {},
+    "preload-freeze": {
+        "GUNICORN_PRELOAD": "true",
+        "GC_FREEZE": "true",
+        "GC_THRESHOLD": GC_TUNED_THRESHOLD,
+    },
+}
+GC_PROFILE_CASES = ["List Products", "Fortune 100"]
+GC_PROFILE_SERVICES = [
+    "flask",
+    "django",
+    "fastapi-gunicorn-async",
+    "fastapi-gunicorn-sync",
+]
+GC_METRIC_PATTERN = re.compile(r'app_gc_pause_ms_(count|sum)\{generation="(\d)"\} (\S+)')
+GC_PROFILE_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_gc.csv")
+
+# --- RESOURCE PROFILES ---
+# With RESOURCES=true each RESOURCE_SERVICES service runs the TEST_CASES
+# once per profile: the server pinned to that many cores (one worker per
+# core) with RESOURCE_SERVER_MEMORY, while Postgres and wrk keep their own
+# fixed cores. The three cpusets are disjoint, wrk's first, then the DB's,
+# then the server's, so the load generator and the database never take CPU
+# from the framework. Profiles that do not fit on the host are skipped.
+RESOURCES = os.getenv("RESOURCES", "false").lower() == "true"
+RESOURCE_PROFILES = {
+    f"{cpus}vcpu": cpus
+    for cpus in map(int, os.getenv("RESOURCE_CPUS", "1,2,4").split(","))
+}
+RESOURCE_SERVER_MEMORY = os.getenv("RESOURCE_SERVER_MEMORY", "1g")
+RESOURCE_DB_CPUS = int(os.getenv("RESOURCE_DB_CPUS", "2"))
+RESOURCE_DB_MEMORY = os.getenv("RESOURCE_DB_MEMORY", "2g")
+RESOURCE_WRK_CPUS = int(os.getenv("RESOURCE_WRK_CPUS", "2"))
+RESOURCE_SERVICES = os.getenv(
+    "RESOURCE_SERVICES",
+    "flask,django,fastapi-gunicorn-async,fastapi-gunicorn-sync,express,gin",
+).split(",")
+RESOURCES_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_resources.csv")
+
+# --- CONNECTION CHURN PASS ---
+# With CHURN=true CHURN_PATH is driven over short-lived connections instead
+# of wrk's persistent ones: CHURN_CONCURRENCY clients reconnecting after
+# every CHURN_REQUESTS_PER_CONNECTION requests (1 sends each request with
+# Connection: close), then connection storms of CHURN_STORM_BURST
+# simultaneous connects. Rows report connect time percentiles and the
+# listen queue overflows/drops the container's kernel counted meanwhile.
+# Connect times include docker's port forwarding in front of the server.
+CHURN = os.getenv("CHURN", "false").lower() == "true"
+CHURN_PATH = os.getenv("CHURN_PATH", "/plain-text")
+CHURN_CONCURRENCY = int(os.getenv("CHURN_CONCURRENCY", CONCURRENCY))
+CHURN_DURATION = int(os.getenv("CHURN_DURATION_SECONDS", DURATION))
+CHURN_REQUESTS_PER_CONNECTION = [
+    int(n) for n in os.getenv("CHURN_REQUESTS_PER_CONNECTION", "1,10,100").split(",")
+]
+CHURN_STORM_BURST = int(os.getenv("CHURN_STORM_BURST", "1000"))
+CHURN_STORM_BURSTS = int(os.getenv("CHURN_STORM_BURSTS", "10"))
+CHURN_STORM_INTERVAL = float(os.getenv("CHURN_STORM_INTERVAL_SECONDS", "1"))
+CHURN_SERVICES = os.getenv(
+    "CHURN_SERVICES",
+    "flask,django,fastapi-uvicorn-async,fastapi-gunicorn-async,express,gin",
+).split(",")
+CHURN_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_churn.csv")
+
+# --- HTTP/2 PASS ---
+# With H2=true the hypercorn services are driven over H2_CONNECTIONS
+# connections with each of H2_STREAMS requests in flight per connection,
+# once as multiplexed h2c streams and once as that many HTTP/1.1 keep-alive
+# connections. With H2_SLOW_PATH one stream per connection requests that
+# path throughout, and the case's latency shows the head-of-line blocking.
+# hypercorn allows 100 concurrent streams per connection.
+H2 = os.getenv("H2", "false").lower() == "true"
+H2_CONNECTIONS = int(os.getenv("H2_CONNECTIONS", "4"))
+H2_STREAMS = [int(n) for n in os.getenv("H2_STREAMS", "1,16,64").split(",")]
+H2_DURATION = int(os.getenv("H2_DURATION_SECONDS", DURATION))
+H2_SLOW_PATH = os.getenv("H2_SLOW_PATH", "/fortune")
+H2_CASES = ["Get Product", "List Products"]
+H2_SERVICES = os.getenv(
+    "H2_SERVICES", "fastapi-hypercorn-async,fastapi-hypercorn-sync,django-asgi"
+).split(",")
+H2_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_h2.csv")
+
+# --- READ REPLICA PASS ---
+# With REPLICA=true each service below runs next to db-replica, a streaming
+# replica of db, once with every query on the primary and once with its
+# read endpoints on the replica (POSTGRES_REPLICA_HOST). wrk measures read
+# scaling on REPLICA_CASES; loadgen then runs a mixed workload in which
+# REPLICA_WRITE_FRACTION of the iterations update a product and read it
+# straight back, with and without X-Min-LSN (read-your-writes), to show the
+# stale reads and primary fallbacks replica lag causes.
+REPLICA = os.getenv("REPLICA", "false").lower() == "true"
+REPLICA_CASES = ["Get Product", "List Products", "Fortune 100"]
+# More workers than the default one, so the database is the bottleneck
+REPLICA_WORKERS = int(os.getenv("REPLICA_WORKERS", str(HOST_CPUS)))
+REPLICA_CONCURRENCY = int(os.getenv("REPLICA_CONCURRENCY", CONCURRENCY))
+REPLICA_DURATION = int(os.getenv("REPLICA_DURATION_SECONDS", DURATION))
+REPLICA_WRITE_FRACTION = float(os.getenv("REPLICA_WRITE_FRACTION", "0.1"))
+REPLICA_LAG_SAMPLE_SECONDS = 0.5
+REPLICA_SERVICES = os.getenv(
+    "REPLICA_SERVICES", "flask,django,fastapi-gunicorn-sync,fastapi-gunicorn-async"
+).split(",")
+REPLICA_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_replica.csv")
+REPLICA_MIXED_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_replica_mixed.csv")
+
+# --- PYTHON VERSION MATRIX ---
+# With PYTHON_MATRIX=true the services below are rebuilt on each interpreter
+# of PYTHON_MATRIX_VERSIONS (the PYTHON_IMAGE build argument) and run
+# TEST_CASES with the same server config, one worker process with
+# PYTHON_MATRIX_THREADS threads, so a free-threaded build can use more than
+# one core. Rows get their change against the first version. The official
+# images have neither the JIT nor the free-threaded build, so those are
+# compiled from source by python/Dockerfile as local images, once.
+PYTHON_MATRIX = os.getenv("PYTHON_MATRIX", "false").lower() == "true"
+# CPython release compiled for the source-built interpreters
+PYTHON_SOURCE_VERSION = os.getenv("PYTHON_SOURCE_VERSION", "3.13.9")
+PYTHON_BUILDS = {
+    "3.11": {"image": "python:3.11-slim"},
+    "3.12": {"image": "python:3.12-slim"},
+    "3.13": {"image": "python:3.13-slim"},
+    "3.13-jit": {
+        "image": "benchmark-python:3.13-jit",
+        "configure": "--enable-experimental-jit",
+    },
+    "3.13t": {
+        "image": "benchmark-python:3.13t",
+        "configure": "--disable-gil",
+        # Otherwise importing an extension that has not declared
+        # free-threading support turns the GIL back on.
+        "env": {"PYTHON_GIL": "0"},
+    },
+}
+# What the services are built on outside the matrix (the compose file default)
+DEFAULT_PYTHON_IMAGE = os.getenv("PYTHON_IMAGE", "python:3.11-slim")
+PYTHON_MATRIX_VERSIONS = os.getenv(
+    "PYTHON_MATRIX_VERSIONS", ",".join(PYTHON_BUILDS)
+).split(",")
+PYTHON_MATRIX_THREADS = os.getenv("PYTHON_MATRIX_THREADS", str(HOST_CPUS))
+PYTHON_MATRIX_SERVICES = {
+    "flask": {"WORKER_CLASS": "gthread", "WORKER_THREADS": PYTHON_MATRIX_THREADS},
+    "django": {"WORKER_CLASS": "gthread", "WORKER_THREADS": PYTHON_MATRIX_THREADS},
+    # Sync endpoints run on the threadpool, async ones on the event loop
+    "fastapi-gunicorn-sync": {"THREADPOOL_SIZE": PYTHON_MATRIX_THREADS},
+    "fastapi-gunicorn-async": {},
+}
+# Version, JIT and GIL of the interpreter a service's container runs
+INTERPRETER_SCRIPT = """
+import json, platform, sys, sysconfig
+print(json.dumps({
+    "version": platform.python_version(),
+    "jit": "--enable-experimental-jit" in (sysconfig.get_config_var("CONFIG_ARGS") or ""),
+    "free_threaded": bool(sysconfig.get_config_var("Py_GIL_DISABLED")),
+    "gil_enabled": getattr(sys, "_is_gil_enabled", lambda: True)(),
+}))
+"""
+PYTHON_MATRIX_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_python.csv")
+
+# --- CRUD LIFECYCLE PASS ---
+# wrk's Update and Delete Product cases hit fixed or random ids, so once a
+# row is deleted most of them are cheap 404s. With CRUD=true loadgen runs a
+# stateful create/read/update/delete mix instead: created ids join a shared
+# pool that reads, updates and deletes draw from, every status is checked,
+# and throughput counts successful operations only.
+CRUD = os.getenv("CRUD", "false").lower() == "true"
+# Relative weight of each operation
+CRUD_MIX = {
+    operation: float(weight)
+    for operation, weight in (
+        item.split("=")
+        for item in os.getenv("CRUD_MIX", "create=1,read=4,update=2,delete=1").split(",")
+    )
+}
+CRUD_CONCURRENCY = int(os.getenv("CRUD_CONCURRENCY", CONCURRENCY))
+CRUD_DURATION = int(os.getenv("CRUD_DURATION_SECONDS", DURATION))
+CRUD_SERVICES = os.getenv(
+    "CRUD_SERVICES", "flask,django,fastapi-gunicorn-sync,fastapi-gunicorn-async,express,gin"
+).split(",")
+CRUD_OUTPUT_PATH = OUTPUT_PATH.with_name(OUTPUT_PATH.stem + "_crud.csv")
+
+# --- PRODUCT STATS SUMMARY ---
+# Per (category, availability) aggregates behind GET /products/stats, kept
+# current by statement-level triggers on product. The Django migration
+# products/0004_product_stats installs the same SQL.
+PRODUCT_STATS_SQL = """
+DO $$
+BEGIN
+    -- UNIQUE NULLS NOT DISTINCT below is new in PostgreSQL 15.
+    IF current_setting('server_version_num')::int < 150000 THEN
+        RAISE EXCEPTION 'product_stats needs PostgreSQL 15 or later, found %',
+            current_setting('server_version');
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS product_stats (
+    category TEXT,
+    availability TEXT,
+    product_count BIGINT NOT NULL,
+    total_stock BIGINT NOT NULL,
+    price_count BIGINT NOT NULL,
+    price_sum NUMERIC NOT NULL,
+    min_price NUMERIC,
+    max_price NUMERIC,
+    UNIQUE NULLS NOT DISTINCT (category, availability)
+);
+
+CREATE OR REPLACE FUNCTION product_stats_add() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Groups are upserted in a fixed order so concurrent statements lock
+    -- summary rows in the same order.
+    INSERT INTO product_stats AS s
+    SELECT category, availability, count(*), coalesce(sum(stock), 0),
+           count(price), coalesce(sum(price), 0), min(price), max(price)
+    FROM new_rows
+    GROUP BY category, availability
+    ORDER BY category, availability
+    ON CONFLICT (category, availability) DO UPDATE SET
+        product_count = s.product_count + EXCLUDED.product_count,
+        total_stock = s.total_stock + EXCLUDED.total_stock,
+        price_count = s.price_count + EXCLUDED.price_count,
+        price_sum = s.price_sum + EXCLUDED.price_sum,
+        min_price = least(s.min_price, EXCLUDED.min_price),
+        max_price = greatest(s.max_price, EXCLUDED.max_price);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION product_stats_remove() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- A removed row holding a group's min/max price sets it to NULL, and
+    -- only those extremes are recomputed from product.
+    UPDATE product_stats s SET
+        product_count = s.product_count - r.product_count,
+        total_stock = s.total_stock - r.total_stock,
+        price_count = s.price_count - r.price_count,
+        price_sum = s.price_sum - r.price_sum,
+        min_price = CASE WHEN r.min_price <= s.min_price THEN NULL ELSE s.min_price END,
+        max_price = CASE WHEN r.max_price >= s.max_price THEN NULL ELSE s.max_price END
+    FROM (
+        SELECT category, availability, count(*) AS product_count,
+               coalesce(sum(stock), 0) AS total_stock,
+               count(price) AS price_count,
+               coalesce(sum(price), 0) AS price_sum,
+               min(price) AS min_price, max(price) AS max_price
+        FROM old_rows
+        GROUP BY category, availability
+    ) r
+    WHERE s.category IS NOT DISTINCT FROM r.category
+      AND s.availability IS NOT DISTINCT FROM r.availability;
+
+    DELETE FROM product_stats WHERE product_count = 0;
+
+    UPDATE product_stats s SET
+        min_price = coalesce(s.min_price, e.min_price),
+        max_price = coalesce(s.max_price, e.max_price)
+    FROM product_stats g
+    CROSS JOIN LATERAL (
+        SELECT min(p.price) AS min_price, max(p.price) AS max_price
+        FROM product p
+        WHERE (p.category = g.category OR (p.category IS NULL AND g.category IS NULL))
+          AND (p.availability = g.availability
+               OR (p.availability IS NULL AND g.availability IS NULL))
+    ) e
+    WHERE (g.min_price IS NULL OR g.max_price IS NULL)
+      AND s.category IS NOT DISTINCT FROM g.category
+      AND s.availability IS NOT DISTINCT FROM g.availability;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION product_stats_clear() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE product_stats;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE TRIGGER product_stats_insert AFTER INSERT ON product
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_add();
+CREATE OR REPLACE TRIGGER product_stats_update_old AFTER UPDATE ON product
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_remove();
+CREATE OR REPLACE TRIGGER product_stats_update_new AFTER UPDATE ON product
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_add();
+CREATE OR REPLACE TRIGGER product_stats_delete AFTER DELETE ON product
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_remove();
+CREATE OR REPLACE TRIGGER product_stats_truncate AFTER TRUNCATE ON product
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_clear();
+"""
+PRODUCT_STATS_REBUILD_SQL = """
+TRUNCATE product_stats;
+INSERT INTO product_stats
+SELECT category, availability, count(*), coalesce(sum(stock), 0),
+       count(price), coalesce(sum(price), 0), min(price), max(price)
+FROM product
+GROUP BY category, availability;
+"""
+
+# Statements of the benchmark database, without the harness's own queries
+PG_STATEMENTS_SQL = """
+SELECT query, calls, total_exec_time, mean_exec_time, max_exec_time, rows,
+       shared_blks_hit, shared_blks_read
+FROM pg_stat_statements
+WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+  AND query NOT LIKE '%pg_stat%'
+ORDER BY total_exec_time DESC
+"""
+
+PG_DATABASE_SQL = """
+SELECT xact_commit, xact_rollback, blks_hit, blks_read
+FROM pg_stat_database
+WHERE datname = current_database()
+"""
+
+# Lag of db-replica as the primary sees it: WAL bytes not yet replayed and
+# the replay delay (NULL while the replica is idle)
+REPLICATION_LAG_SQL = """
+SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), replay_lsn),
+       EXTRACT(EPOCH FROM replay_lag) * 1000
+FROM pg_stat_replication
+WHERE state = 'streaming'
+"""
+
+# Per-database settings that make every new session log its plans; the
+# services connect after they are set, so all of their statements are covered.
+AUTO_EXPLAIN_SETTINGS = {
+    "session_preload_libraries": "auto_explain",
+    "auto_explain.log_min_duration": "0",
+    "auto_explain.log_analyze": "on",
+    "auto_explain.log_buffers": "on",
+    "auto_explain.log_format": "json",
+}
+PLAN_LOG_PATTERN = re.compile(r"duration: ([\d.]+) ms\s+plan:\s*")
+# Column and operator of each comparison in a scan filter, e.g. "(price >= 100)"
+FILTER_COLUMN_PATTERN = re.compile(r"\(?(\w+)\)? (=|<>|<|<=|>|>=|~~\*?) ")
+
+# --- PRODUCT VERSION ---
+# Row version behind the ETags of GET /products/{id} and /products, bumped on
+# every UPDATE whichever service writes the row. The Django migration
+# products/0005_product_version installs the same trigger.
+PRODUCT_VERSION_SQL = """
+CREATE OR REPLACE FUNCTION product_bump_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE TRIGGER product_version BEFORE UPDATE ON product
+    FOR EACH ROW EXECUTE FUNCTION product_bump_version();
+"""
 
 # --- TEST CASES ---
+# Products per POST /products/bulk and ids per GET /products?ids= request
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "50"))
+# Services without the bulk/batch endpoints, which only the Python apps have
+NON_PYTHON_SERVICES = {"express", "gin"}
+
+# Optional case keys: "lua" picks a LUA_TEMPLATES entry other than the
+# method's, "rows" is the number of products each request handles (for
+# rows_per_sec) and "python_only" skips NON_PYTHON_SERVICES. A "{...}"
+# placeholder in the path means the Lua script builds the path itself.
 TEST_CASES = [
     {"name": "PlainText", "method": "GET", "path": "/plain-text"},
     {"name": "JSON Echo", "method": "GET", "path": "/json"},
     {"name": "Create Product", "method": "POST", "path": "/products"},
+    {
+        "name": "Bulk Create Products",
+        "method": "POST",
+        "path": "/products/bulk",
+        "lua": "POST_BULK",
+        "rows": BATCH_SIZE,
+        "python_only": True,
+    },
     {"name": "Get Product", "method": "GET", "path": "/products/1"},
     {"name": "List Products", "method": "GET", "path": "/products"},
+    {
+        "name": "Batch Get Products",
+        "method": "GET",
+        "path": "/products?ids={ids}",
+        "lua": "GET_BATCH",
+        "rows": BATCH_SIZE,
+        "python_only": True,
+    },
     {"name": "Update Product", "method": "PUT", "path": "/products/1"},
     {"name": "Fortune 100", "method": "GET", "path": "/fortune"},
     {"name": "Delete Product", "method": "DELETE", "path": "/products/{id}"},
 ]
 
 # --- LUA SCRIPTS ---
+PRODUCT_JSON = '{"name":"Test Product","price":99.99,"stock":100, "description": "desc", "brand": "brand", "category": "cat", "currency": "USD", "ean": "123", "color": "red", "size": "M", "availability": "in-stock", "internal_id": "123"}'
 LUA_TEMPLATES = {
-    "POST": """
+    "POST": f"""
+wrk.method = "POST"
+wrk.headers["Content-Type"] = "application/json"
+wrk.body = '{PRODUCT_JSON}'
+    """,
+    "POST_BULK": f"""
 wrk.method = "POST"
 wrk.headers["Content-Type"] = "application/json"
-wrk.body = '{"name":"Test Product","price":99.99,"stock":100, "description": "desc", "brand": "brand", "category": "cat", "currency": "USD", "ean": "123", "color": "red", "size": "M", "availability": "in-stock", "internal_id": "123"}'
+wrk.body = '[{",".join([PRODUCT_JSON] * BATCH_SIZE)}]'
+    """,
+    "GET_BATCH": f"""
+function request()
+  local ids = {{}}
+  for i = 1, {BATCH_SIZE} do
+    ids[i] = math.random(1, 10000)
+  end
+  return wrk.format("GET", "/products?ids=" .. table.concat(ids, ","))
+end
     """,
     "PUT": """
 wrk.method = "PUT"
@@ -75,6 +872,40 @@ function request()
 end
     """,
 }
+ACCEPT_ENCODING_LUA = """
+wrk.headers["Accept-Encoding"] = "{encoding}"
+"""
+# Conditional GET of the URL's path; filled in with str.format. wrk's
+# Non-2xx counter only covers statuses above 399, so the 304s are counted
+# per thread here and summed in done().
+REVALIDATION_LUA = """
+local etag = '{etag}'
+local threads = {{}}
+function setup(thread)
+  table.insert(threads, thread)
+end
+function init(args)
+  not_modified = 0
+end
+function request()
+  if math.random() < {ratio} then
+    return wrk.format("GET", nil, {{["If-None-Match"] = etag}})
+  end
+  return wrk.format("GET")
+end
+function response(status, headers, body)
+  if status == 304 then
+    not_modified = not_modified + 1
+  end
+end
+function done(summary, latency, requests)
+  local total = 0
+  for _, thread in ipairs(threads) do
+    total = total + thread:get("not_modified")
+  end
+  io.write(string.format("Not modified: %d\\n", total))
+end
+"""
 
 
 def write_lua_script(content, name):
@@ -97,13 +928,230 @@ def write_lua_script(content, name):
 def stop_and_remove_all_services():
     print("Stopping all running containers...")
     all_svc = copy(FRAMEWORK_SERVICES)
-    all_svc.append(DB_SERVICE)
+    all_svc.extend([DB_SERVICE, DB_REPLICA_SERVICE])
     docker.compose.down(services=all_svc, volumes=False)
 
 
-def start_service(service):
+@contextmanager
+def compose_environment(overrides):
+    """Temporarily export variables that docker compose interpolates."""
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def start_service(service, env=None):
     print(f"Starting {service} container...")
-    docker.compose.up(detach=True, services=[service])
+    with compose_environment(env or {}):
+        docker.compose.up(detach=True, services=[service])
+
+
+def server_configs(service):
+    """Return the compose environment overrides to benchmark a service with."""
+    if not SERVER_MATRIX or service not in SERVER_MATRIX_SERVICES:
+        return [{}]
+    return [
+        {**config, "WEB_WORKERS": str(workers)}
+        for config in SERVER_MATRIX_SERVICES[service]
+        for workers in WORKER_COUNTS
+    ]
+
+
+def describe_server(service, env, cpus=HOST_CPUS, gil_enabled=True):
+    """Resolve the effective server settings for a service and its overrides.
+
+    `cpus` is how many cores the service's container may run on;
+    `gil_enabled` is False for a free-threaded interpreter running without
+    the GIL.
+    """
+    settings = {**SERVICE_SERVER_DEFAULTS.get(service, {}), **env}
+    server = settings.get("SERVER", "")
+    workers = int(settings.get("WEB_WORKERS", 1))
+    threads = int(settings.get("WORKER_THREADS", 1))
+    if service == "gin":
+        # The Go runtime schedules goroutines on every core by itself.
+        cores = cpus
+    elif not gil_enabled:
+        # Without the GIL every thread of a process can keep a core busy:
+        # gthread workers, or the threadpool behind sync FastAPI endpoints.
+        pool = int(settings.get("THREADPOOL_SIZE", threads))
+        cores = min(workers * pool, cpus)
+    else:
+        # One Python (or Node) process keeps at most one core busy.
+        cores = min(workers, cpus)
+    return {
+        "server": server,
+        "worker_class": settings.get("WORKER_CLASS", "") if server == "gunicorn" else "",
+        "workers": workers,
+        "threads": threads,
+        "cores": cores,
+    }
+
+
+class ResourceSampler:
+    """Poll `docker stats` for a compose service in a background thread."""
+
+    def __init__(self, service, interval=0.5):
+        self.containers = docker.compose.ps(services=[service])
+        self.interval = interval
+        self.memory = []  # bytes, summed over the service's containers
+        self.cpu = []  # percent of one core, summed over the containers
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _poll(self):
+        while not self._stop.is_set():
+            stats = docker.stats(containers=self.containers)
+            self.memory.append(sum(s.memory_used for s in stats))
+            self.cpu.append(sum(s.cpu_percentage for s in stats))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak_memory(self):
+        return max(self.memory, default=0)
+
+    @property
+    def mean_cpu(self):
+        return sum(self.cpu) / len(self.cpu) if self.cpu else 0.0
+
+
+class ProcessMemorySampler:
+    """Poll the RSS of every process in a compose service's container."""
+
+    # VmRSS (kB) of each process but the sampling shell itself
+    COMMAND = (
+        "for p in /proc/[0-9]*; do [ $p = /proc/$$ ] || "
+        "grep -s VmRSS $p/status; done"
+    )
+
+    def __init__(self, service, interval):
+        self.service = service
+        self.interval = interval
+        self.samples = []  # (elapsed_s, total_rss_bytes, max_rss_bytes, processes)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _poll(self):
+        started = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                output = docker.compose.execute(
+                    self.service, ["sh", "-c", self.COMMAND], tty=False
+                )
+            except Exception as e:
+                print(f"⚠️ RSS sample failed: {e}")
+            else:
+                rss = [int(line.split()[1]) * 1024 for line in output.splitlines() if line]
+                if rss:
+                    self.samples.append(
+                        (time.perf_counter() - started, sum(rss), max(rss), len(rss))
+                    )
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class ReplicationLagSampler:
+    """Poll the primary's pg_stat_replication in a background thread."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = []  # (lag_bytes, replay_lag_ms or None)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _poll(self):
+        conn = connect_postgres()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                while not self._stop.is_set():
+                    cur.execute(REPLICATION_LAG_SQL)
+                    row = cur.fetchone()
+                    if row and row[0] is not None:
+                        self.samples.append(
+                            (int(row[0]), float(row[1]) if row[1] is not None else None)
+                        )
+                    self._stop.wait(self.interval)
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        lag_bytes = [b for b, _ in self.samples]
+        lag_ms = [ms for _, ms in self.samples if ms is not None]
+        return {
+            "replica_lag_max_bytes": max(lag_bytes, default=None),
+            "replica_lag_p50_ms": loadgen.percentile(lag_ms, 50),
+            "replica_lag_max_ms": round(max(lag_ms), 3) if lag_ms else None,
+        }
+
+
+def container_memory(service):
+    """Rss, Pss, Shared and Private bytes summed over the processes in a service's container."""
+    fields = "Rss|Pss|Shared_Clean|Shared_Dirty|Private_Clean|Private_Dirty"
+    output = docker.compose.execute(
+        service,
+        [
+            "sh",
+            "-c",
+            f"for p in /proc/[0-9]*; do [ $p = /proc/$$ ] || "
+            f"grep -sE '^({fields}):' $p/smaps_rollup; done",
+        ],
+        tty=False,
+    )
+    totals = {"Rss": 0, "Pss": 0, "Shared": 0, "Private": 0}
+    for line in output.splitlines():
+        if not line:
+            continue
+        name, kb = line.split(":")[0], int(line.split()[1])
+        totals[name.split("_")[0]] += kb * 1024
+    return totals
+
+
+def listen_queue_counters(service):
+    """ListenOverflows and ListenDrops from the kernel of a service's container.
+
+    Both count since the container started; None when they cannot be read.
+    """
+    try:
+        output = docker.compose.execute(service, ["cat", "/proc/net/netstat"], tty=False)
+    except Exception as e:
+        print(f"⚠️ Could not read listen queue counters of {service}: {e}")
+        return None
+    lines = [line.split() for line in output.splitlines() if line.startswith("TcpExt:")]
+    if len(lines) < 2:
+        return None
+    counters = dict(zip(lines[0][1:], map(int, lines[1][1:])))
+    return counters.get("ListenOverflows", 0), counters.get("ListenDrops", 0)
 
 
 def stop_and_remove_service(service):
@@ -112,33 +1160,67 @@ def stop_and_remove_service(service):
     docker.compose.rm(services=[service])
 
 
-def wait_for_service_ready(base_url):
-    """Polls a simple endpoint to ensure the service is ready before benchmarking."""
+def wait_for_service_ready(base_url, started=None, poll_interval=1):
+    """Polls a simple endpoint to ensure the service is ready before benchmarking.
+
+    Returns the seconds from `started` (a time.perf_counter() value, default:
+    now) to the first 200, or None if the service is not up within 30 seconds.
+    """
     print(f"Waiting for {base_url} to be ready...")
-    start_time = time.time()
-    while time.time() - start_time < 30:  # 30-second timeout
+    if started is None:
+        started = time.perf_counter()
+    deadline = time.perf_counter() + 30  # 30-second timeout
+    while time.perf_counter() < deadline:
         try:
             response = httpx.get(base_url + "/plain-text", timeout=1)
             if response.status_code == 200:
-                print(f"✅ Service at {base_url} is ready.")
-                return True
+                elapsed = time.perf_counter() - started
+                print(f"✅ Service at {base_url} is ready after {elapsed:.2f}s.")
+                return elapsed
         except httpx.RequestError:
             pass
-        time.sleep(1)
+        time.sleep(poll_interval)
     print(f"❌ Service at {base_url} did not become ready in time.")
+    return None
+
+
+def wait_for_replica(timeout=120):
+    """Wait until db-replica streams from the primary and has replayed all of its WAL."""
+    print("Waiting for the replica to catch up...")
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = connect_postgres()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(REPLICATION_LAG_SQL)
+                    row = cur.fetchone()
+            finally:
+                conn.close()
+            if row and row[0] == 0:
+                print("✅ Replica is streaming.")
+                return True
+        except psycopg2.Error:
+            pass
+        time.sleep(1)
+    print("❌ Replica did not catch up in time.")
     return False
 
 
 # --- DATABASE SEEDING ---
+def connect_postgres():
+    return psycopg2.connect(
+        host=os.getenv("POSTGRES_LOCALHOST", "localhost"),
+        port=os.getenv("POSTGRES_PORT", 5432),
+        user=os.getenv("POSTGRES_USER", "postgres"),
+        password=os.getenv("POSTGRES_PASSWORD", "root"),
+        dbname=os.getenv("POSTGRES_DB", "benchmark_db"),
+    )
+
+
 def seed_database_postgres(products):
     try:
-        conn = psycopg2.connect(
-            host=os.getenv("POSTGRES_LOCALHOST", "localhost"),
-            port=os.getenv("POSTGRES_PORT", 5432),
-            user=os.getenv("POSTGRES_USER", "postgres"),
-            password=os.getenv("POSTGRES_PASSWORD", "root"),
-            dbname=os.getenv("POSTGRES_DB", "benchmark_db"),
-        )
+        conn = connect_postgres()
         cur = conn.cursor()
         cur.execute(
             """
@@ -155,11 +1237,29 @@ def seed_database_postgres(products):
                 color TEXT,
                 size TEXT,
                 availability TEXT,
-                internal_id TEXT
+                internal_id TEXT,
+                version INTEGER NOT NULL DEFAULT 1
             );
         """
         )
+        # Tables created before the version column (or by another service)
+        cur.execute(
+            "ALTER TABLE product ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;"
+        )
+        cur.execute(PRODUCT_VERSION_SQL)
+        # Matches the Django model's index; backs its default ORDER BY name.
+        cur.execute("CREATE INDEX IF NOT EXISTS product_name_idx ON product (name);")
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        if PG_STATS:
+            # Needs shared_preload_libraries (see the db service) to be queried.
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements;")
+        for name, definition in SEARCH_INDEXES.items():
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} {definition};")
+        cur.execute(PRODUCT_STATS_SQL)
         conn.commit()
+        # Row-at-a-time seeding would fire the stats triggers per row; the
+        # summary is rebuilt in one pass afterwards instead.
+        cur.execute("ALTER TABLE product DISABLE TRIGGER USER;")
         cur.execute("TRUNCATE TABLE product RESTART IDENTITY CASCADE;")
         for prod in products:
             cur.execute(
@@ -180,6 +1280,8 @@ def seed_database_postgres(products):
                     prod["internal_id"],
                 ),
             )
+        cur.execute(PRODUCT_STATS_REBUILD_SQL)
+        cur.execute("ALTER TABLE product ENABLE TRIGGER USER;")
         conn.commit()
         print("✅ Database seeded successfully.")
         return True
@@ -192,8 +1294,186 @@ def seed_database_postgres(products):
             conn.close()
 
 
+def reset_pg_stats():
+    """Clear pg_stat_statements and return a pg_stat_database snapshot."""
+    conn = connect_postgres()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_stat_statements_reset();")
+            cur.execute(PG_DATABASE_SQL)
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+
+def collect_pg_stats(before, requests):
+    """Database counters since reset_pg_stats(), as (per-case summary, statements)."""
+    time.sleep(PG_STATS_FLUSH_SECONDS)
+    conn = connect_postgres()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(PG_STATEMENTS_SQL)
+            statements = cur.fetchall()
+            cur.execute(PG_DATABASE_SQL)
+            after = cur.fetchone()
+    finally:
+        conn.close()
+
+    commits, rollbacks, blks_hit, blks_read = (a - b for a, b in zip(after, before))
+    requests = max(requests, 1)
+    summary = {
+        "db_statements_per_request": round(sum(s[1] for s in statements) / requests, 2),
+        "db_time_ms_per_request": round(sum(s[2] for s in statements) / requests, 3),
+        "db_commits_per_request": round(commits / requests, 2),
+        "db_rollbacks_per_request": round(rollbacks / requests, 2),
+        "db_blks_hit": blks_hit,
+        "db_blks_read": blks_read,
+    }
+    top = [
+        {
+            "rank": rank,
+            "calls": calls,
+            "calls_per_request": round(calls / requests, 2),
+            "total_time_ms": round(total, 2),
+            "mean_time_ms": round(mean, 3),
+            "max_time_ms": round(max_time, 3),
+            "rows": rows,
+            "shared_blks_hit": hit,
+            "shared_blks_read": read,
+            "query": " ".join(query.split()),
+        }
+        for rank, (query, calls, total, mean, max_time, rows, hit, read) in enumerate(
+            statements[:PG_STATS_TOP], 1
+        )
+    ]
+    return summary, top
+
+
+def set_auto_explain(enabled):
+    """Turn auto_explain on or off for new sessions of the benchmark database."""
+    with connect_postgres() as conn, conn.cursor() as cur:
+        cur.execute("SELECT current_database();")
+        (database,) = cur.fetchone()
+        for name, value in AUTO_EXPLAIN_SETTINGS.items():
+            if enabled:
+                cur.execute(f'ALTER DATABASE "{database}" SET {name} = %s;', (value,))
+            else:
+                cur.execute(f'ALTER DATABASE "{database}" RESET {name};')
+    conn.close()
+
+
+def indexed_columns():
+    """Leading column of every index, per table."""
+    with connect_postgres() as conn, conn.cursor() as cur:
+        cur.execute("SELECT tablename, indexdef FROM pg_indexes WHERE schemaname = 'public';")
+        indexes = cur.fetchall()
+    conn.close()
+    columns = {}
+    for table, definition in indexes:
+        match = re.search(r"USING \w+ \((\w+)", definition)
+        if match:
+            columns.setdefault(table, set()).add(match.group(1))
+    return columns
+
+
+def read_logged_plans(since):
+    """(duration_ms, plan) for each auto_explain entry the db logged after `since`."""
+    logs = docker.compose.logs(services=[DB_SERVICE], no_log_prefix=True, since=str(since))
+    decoder = json.JSONDecoder()
+    plans = []
+    for match in PLAN_LOG_PATTERN.finditer(logs):
+        try:
+            plan, _ = decoder.raw_decode(logs, match.end())
+        except ValueError:
+            continue
+        plans.append((float(match.group(1)), plan))
+    return plans
+
+
+def analyze_plan(plan, indexes):
+    """Flag sequential scans, sorts and OFFSET scans; suggest indexes for them."""
+    flags, suggestions = [], []
+
+    def relation(node):
+        if "Relation Name" in node:
+            return node["Relation Name"]
+        for child in node.get("Plans", []):
+            if name := relation(child):
+                return name
+        return None
+
+    def suggest(table, columns):
+        if table and columns and columns[0] not in indexes.get(table, set()):
+            suggestions.append(f"CREATE INDEX ON {table} ({', '.join(columns)})")
+
+    def actual_rows(node):
+        return node.get("Actual Rows", 0) * node.get("Actual Loops", 1)
+
+    def visit(node):
+        kind = node["Node Type"]
+        children = node.get("Plans", [])
+        if kind == "Seq Scan":
+            scanned = actual_rows(node) + node.get("Rows Removed by Filter", 0)
+            if scanned >= PLAN_MIN_ROWS:
+                flags.append(f"seq scan on {node['Relation Name']} ({scanned} rows)")
+                # Equality columns lead, range and LIKE columns follow.
+                comparisons = FILTER_COLUMN_PATTERN.findall(node.get("Filter", ""))
+                comparisons.sort(key=lambda comparison: comparison[1] != "=")
+                suggest(node["Relation Name"], list(dict.fromkeys(c for c, _ in comparisons)))
+        elif kind in ("Sort", "Incremental Sort"):
+            keys = [key.split(".")[-1] for key in node.get("Sort Key", [])]
+            # A top-N sort emits only the LIMIT rows; its input is what is sorted.
+            sorted_rows = actual_rows(children[0]) if children else actual_rows(node)
+            flags.append(f"sort on {', '.join(keys)} ({sorted_rows} rows)")
+            if all(re.fullmatch(r"\w+", key) for key in keys):
+                suggest(relation(node), keys)
+        elif kind == "Limit" and children:
+            skipped = actual_rows(children[0]) - actual_rows(node)
+            if skipped >= PLAN_MIN_ROWS:
+                flags.append(f"offset scan ({skipped} rows skipped)")
+                suggestions.append("keyset pagination instead of OFFSET")
+        for child in children:
+            visit(child)
+
+    visit(plan["Plan"])
+    return flags, list(dict.fromkeys(suggestions))
+
+
+def scale_products(rows):
+    """Grow the seeded product table to `rows` rows by repeating the seed data."""
+    columns = (
+        "name, description, brand, category, price, currency, stock, ean, "
+        "color, size, availability, internal_id"
+    )
+    with connect_postgres() as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM product;")
+        (seeded,) = cur.fetchone()
+        missing = rows - seeded
+        if missing > 0:
+            print(f"Scaling product table from {seeded} to {rows} rows...")
+            repeats = -(-missing // seeded)
+            cur.execute(
+                f"INSERT INTO product ({columns}) "
+                f"SELECT {columns} FROM product CROSS JOIN generate_series(1, %s) "
+                "LIMIT %s;",
+                (repeats, missing),
+            )
+        cur.execute("ANALYZE product;")
+    conn.close()
+
+
+def drop_search_indexes():
+    with connect_postgres() as conn, conn.cursor() as cur:
+        for name in SEARCH_INDEXES:
+            cur.execute(f"DROP INDEX IF EXISTS {name};")
+        cur.execute("ANALYZE product;")
+    conn.close()
+
+
 # --- WRK EXECUTION ---
-def run_wrk(url, duration, concurrency, threads, lua_script_path=None):
+def run_wrk(url, duration, concurrency, threads, lua_script_path=None, cpuset=None):
     wrk_docker = DockerClient()
 
     try:
@@ -201,7 +1481,7 @@ def run_wrk(url, duration, concurrency, threads, lua_script_path=None):
         wrk_docker.pull("openeuler/wrk:latest", quiet=True)
 
         # Build wrk command as a list
-        command = f"wrk -d {duration}s -c {concurrency} -t {threads}"
+        command = f"wrk -d {duration}s -c {concurrency} -t {threads} --latency"
         if lua_script_path:
             command += f" -s {lua_script_path}"
         command += f" {url}"
@@ -220,7 +1500,8 @@ def run_wrk(url, duration, concurrency, threads, lua_script_path=None):
             "privileged": True,  # This might help with network access
             "networks": ["host"],
         }
-
+        if cpuset:
+            run_args["cpuset_cpus"] = cpuset
         # Add volume and workdir only if we have a Lua script
         if lua_script_path:
             # Convert Windows path to proper Docker volume format
@@ -255,6 +1536,22 @@ def run_wrk(url, duration, concurrency, threads, lua_script_path=None):
         return f"ERROR: {str(e)}"
 
 
+def latency_to_ms(value):
+    """Convert a wrk latency such as '850.12us', '1.69ms' or '1.02s' to ms."""
+    for unit, factor in (("us", 0.001), ("ms", 1), ("s", 1000), ("m", 60000)):
+        if value.endswith(unit):
+            return round(float(value[: -len(unit)]) * factor, 3)
+    return None
+
+
+def transfer_to_bytes(value):
+    """Convert a wrk transfer rate such as '1.23MB' or '512.00B' to bytes."""
+    for unit, factor in (("GB", 1024**3), ("MB", 1024**2), ("KB", 1024), ("B", 1)):
+        if value.endswith(unit):
+            return round(float(value[: -len(unit)]) * factor)
+    return None
+
+
 def parse_wrk_output(output):
     if not output:
         print("⚠️ No output received from wrk")
@@ -278,11 +1575,30 @@ def parse_wrk_output(output):
                 req_sec = float(line.split(":")[1].strip())
                 print(f"📈 Found requests/sec: {req_sec}")
                 results["requests_per_sec"] = req_sec
-            elif "Latency" in line and "Thread" not in line:
+            elif (
+                "Latency" in line
+                and "Thread" not in line
+                and "Distribution" not in line
+            ):
                 parts = [p for p in line.strip().split() if p]
                 if len(parts) >= 2:
                     print(f"⏱️ Found latency: {parts[1]}")
                     results["avg_latency_ms"] = parts[1]
+            elif line.strip().startswith(("50%", "99%")):
+                # Latency Distribution section, printed with --latency
+                pct, value = line.split()
+                results[f"latency_p{pct[:-1]}_ms"] = latency_to_ms(value)
+            elif line.startswith("Transfer/sec"):
+                results["transfer_bytes_per_sec"] = transfer_to_bytes(
+                    line.split(":")[1].strip()
+                )
+            elif " requests in " in line:
+                results["requests"] = int(line.split()[0])
+            elif "Non-2xx or 3xx responses" in line:
+                results["non_2xx"] = int(line.split(":")[1].strip())
+            elif line.startswith("Not modified:"):
+                # Printed by REVALIDATION_LUA
+                results["not_modified"] = int(line.split(":")[1].strip())
     except Exception as e:
         print(f"❌ Error parsing wrk output: {str(e)}")
         return None
@@ -291,12 +1607,25 @@ def parse_wrk_output(output):
 
 
 # --- MAIN RUNNER ---
-def main():
-    products = [dict(p) for p in csv.DictReader(open(DATA_PATH))]
-    results = []
+framework_name_map = {
+    "express": "express",
+    "gin": "gin",
+    "flask": "flask",
+    "django": "django",
+    "django-lean-middleware": "django-lean-middleware",
+    "django-lean": "django-lean",
+    "fastapi-uvicorn-async": "fastapi-uvicorn-async",
+    "fastapi-uvicorn-sync": "fastapi-uvicorn-sync",
+    "fastapi-gunicorn-async": "fastapi-gunicorn-async",
+    "fastapi-gunicorn-sync": "fastapi-gunicorn-sync",
+    "fastapi-hypercorn-async": "fastapi-hypercorn-async",
+    "fastapi-hypercorn-sync": "fastapi-hypercorn-sync",
+    "django-asgi": "django-asgi",
+}
 
-    print("--- Starting Benchmark ---")
 
+def reset_database(products):
+    """Restart the DB container on a clean slate and seed it."""
     # Stop everything first for a clean slate
     stop_and_remove_all_services()
 
@@ -306,93 +1635,2078 @@ def main():
     print("Waiting for DB to initialize...")
     time.sleep(10)  # Give DB time to start
 
-    # Seed database once
-    if not seed_database_postgres(products):
-        print("❌ Initial database seeding failed. Aborting benchmarks.")
-        docker.compose.down(remove_orphans=True)
-        return
-
-    for service in FRAMEWORK_SERVICES:
-        print(f"\n📦 Benchmarking Service: {service}")
-        # Stop everything first for a clean slate
-        stop_and_remove_all_services()
-
-        # Start DB service
-        print("\n=== Starting DB container ===")
-        docker.compose.up(detach=True, services=[DB_SERVICE])
-        print("Waiting for DB to initialize...")
-        time.sleep(10)  # Give DB time to start
+    return seed_database_postgres(products)
 
-        # Seed database once
-        if not seed_database_postgres(products):
-            print("❌ Initial database seeding failed. Aborting benchmarks.")
-            docker.compose.down(remove_orphans=True)
-            return
-        start_service(service)
 
-        framework_name_map = {
-            "express": "express",
-            "gin": "gin",
-            "flask": "flask",
-            "django": "django",
-            "fastapi-uvicorn-async": "fastapi-uvicorn-async",
-            "fastapi-uvicorn-sync": "fastapi-uvicorn-sync",
-            "fastapi-gunicorn-async": "fastapi-gunicorn-async",
-            "fastapi-gunicorn-sync": "fastapi-gunicorn-sync",
-        }
-        framework = framework_name_map.get(service, service.capitalize())
-        base_url = FRAMEWORKS.get(framework)
+def framework_cases(framework):
+    """The TEST_CASES a framework implements."""
+    return [
+        case
+        for case in TEST_CASES
+        if not (case.get("python_only") and framework in NON_PYTHON_SERVICES)
+    ]
 
-        if not base_url:
-            print(f"⚠️ Skipping {framework}: No base URL configured.")
-            stop_and_remove_service(service)
-            continue
 
-        if not wait_for_service_ready(base_url):
-            print(f"⚠️ Skipping {framework} because it failed the health check.")
-            stop_and_remove_service(service)
-            continue
+def run_test_cases(
+    framework,
+    base_url,
+    server,
+    pg_statements=None,
+    wrk_cpuset=None,
+    cases=None,
+    on_result=None,
+):
+    """Run `cases` (default: all the framework's) against a ready service.
 
-        for case in TEST_CASES:
-            print(f"  -> Running test: {case['name']}")
-            url = base_url.rstrip("/") + case["path"]
-            lua_script = None
-            if case["method"] in ["POST", "PUT", "DELETE"]:
-                lua_script = write_lua_script(
-                    LUA_TEMPLATES[case["method"]],
-                    f"{case['method'].lower()}_{framework}",
-                )
-                if case["method"] == "DELETE":
-                    url = base_url  # Path is in Lua script
+    Returns the result rows and also hands each one to `on_result` as soon
+    as its case finishes. With PG_STATS each case's top statements are
+    appended to `pg_statements`. `wrk_cpuset` pins wrk to those cores.
+    """
+    results = []
+    for case in framework_cases(framework) if cases is None else cases:
+        print(f"  -> Running test: {case['name']}")
+        url = base_url.rstrip("/") + case["path"]
+        lua_script = None
+        template = case.get("lua", case["method"])
+        if template in LUA_TEMPLATES:
+            lua_script = write_lua_script(
+                LUA_TEMPLATES[template],
+                f"{template.lower()}_{framework}",
+            )
+            if "{" in case["path"]:
+                url = base_url  # Path is in Lua script
 
-            output = run_wrk(url, DURATION, CONCURRENCY, THREADS, lua_script)
-            parsed = parse_wrk_output(output)
+        if PG_STATS:
+            pg_before = reset_pg_stats()
+        output = run_wrk(url, DURATION, CONCURRENCY, THREADS, lua_script, wrk_cpuset)
+        parsed = parse_wrk_output(output)
 
-            if parsed:
-                results.append(
-                    {
+        if parsed:
+            rps = parsed.get("requests_per_sec")
+            row = {
+                "framework": framework,
+                "test": case["name"],
+                "server": server["server"],
+                "worker_class": server["worker_class"],
+                "workers": server["workers"],
+                "threads": server["threads"],
+                "requests_per_sec": rps,
+                "rows_per_sec": round(rps * case.get("rows", 1), 2),
+                "avg_latency_ms": parsed.get("avg_latency_ms"),
+                "latency_p50_ms": parsed.get("latency_p50_ms"),
+                "latency_p99_ms": parsed.get("latency_p99_ms"),
+                "non_2xx": parsed.get("non_2xx", 0),
+                # Requests answered with a 2xx/3xx, e.g. not the 404s of
+                # deleting ids that are already gone
+                "ok_requests_per_sec": (
+                    round(rps * (1 - parsed.get("non_2xx", 0) / parsed["requests"]), 2)
+                    if parsed.get("requests")
+                    else rps
+                ),
+                "total_requests": int(rps * int(DURATION)),
+                "rps_per_worker": round(rps / server["workers"], 2),
+                "rps_per_core": round(rps / server["cores"], 2),
+            }
+            if PG_STATS:
+                requests = parsed.get("requests") or row["total_requests"]
+                summary, top = collect_pg_stats(pg_before, requests)
+                row.update(summary)
+                if pg_statements is not None:
+                    case_info = {
                         "framework": framework,
                         "test": case["name"],
-                        "requests_per_sec": parsed.get("requests_per_sec"),
-                        "avg_latency_ms": parsed.get("avg_latency_ms"),
-                        "total_requests": int(
-                            parsed.get("requests_per_sec") * int(DURATION)
+                        "server": server["server"],
+                        "workers": server["workers"],
+                    }
+                    pg_statements.extend({**case_info, **statement} for statement in top)
+            results.append(row)
+            if on_result:
+                on_result(row)
+    return results
+
+
+def run_overload_pass(products, recorder):
+    """Drive the sync services past saturation with and without admission control.
+
+    Returns False when the database could not be seeded.
+    """
+    for service, service_env in OVERLOAD_SERVICES.items():
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping overload run for {framework}: No base URL configured.")
+            continue
+
+        for profile, profile_env in ADMISSION_PROFILES.items():
+            if recorder.done(service=service, profile=profile):
+                continue
+            print(
+                f"\n🚦 Overload: {service} ({profile}, "
+                f"{OVERLOAD_CONCURRENCY} connections)"
+            )
+            if not reset_database(products):
+                print("❌ Database seeding failed. Skipping the rest of the overload pass.")
+                return False
+            start_service(service, {**service_env, **profile_env})
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            rows = []
+            for case in TEST_CASES:
+                if case["name"] not in OVERLOAD_CASES:
+                    continue
+                print(f"  -> Running overload test: {case['name']}")
+                samples, elapsed = loadgen.run_load(
+                    base_url,
+                    case["method"],
+                    case["path"],
+                    OVERLOAD_CONCURRENCY,
+                    OVERLOAD_DURATION,
+                )
+                summary = loadgen.summarize(samples, elapsed)
+                print(
+                    f"     goodput={summary['goodput_rps']} rps "
+                    f"admitted p99={summary['admitted_p99_ms']} ms "
+                    f"shed={summary['shed_503']}"
+                )
+                rows.append(
+                    {
+                        "framework": framework,
+                        "test": case["name"],
+                        "profile": profile,
+                        "concurrency": OVERLOAD_CONCURRENCY,
+                        **summary,
+                    }
+                )
+            recorder.save({"service": service, "profile": profile}, rows)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+    return True
+
+
+def run_fortune_probe(products, recorder):
+    """Compare buffered and streamed /fortune renders as the page grows.
+
+    Returns False when the database could not be seeded.
+    """
+    cells = [{"service": s, "mode": m} for s in FORTUNE_SERVICES for m in FORTUNE_MODES]
+    if not recorder.pending(cells):
+        return True
+    if not reset_database(products):
+        print("❌ Database seeding failed. Skipping the fortune probe.")
+        return False
+
+    for service in FORTUNE_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping fortune probe for {framework}: No base URL configured.")
+            continue
+
+        for mode in FORTUNE_MODES:
+            if recorder.done(service=service, mode=mode):
+                continue
+            print(f"\n📜 Fortune probe: {service} ({mode})")
+            start_service(service, {"FORTUNE_MODE": mode})
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            rows = []
+            for page_rows in FORTUNE_ROWS:
+                # Render once so imports, template compilation and the
+                # connection pool are out of the way before measuring.
+                loadgen.time_to_first_byte(base_url, "/fortune", 1, {"rows": page_rows})
+                with ResourceSampler(service) as sampler:
+                    time.sleep(sampler.interval)
+                    idle = sampler.memory[0] if sampler.memory else 0
+                    timings = loadgen.time_to_first_byte(
+                        base_url, "/fortune", FORTUNE_PROBE_REQUESTS, {"rows": page_rows}
+                    )
+                ttfb = [t[0] for t in timings]
+                total = [t[1] for t in timings]
+                row = {
+                    "framework": framework,
+                    "mode": mode,
+                    "rows": page_rows,
+                    "requests": len(timings),
+                    "ttfb_p50_ms": round(loadgen.percentile(ttfb, 50) * 1000, 3),
+                    "ttfb_p99_ms": round(loadgen.percentile(ttfb, 99) * 1000, 3),
+                    "total_p50_ms": round(loadgen.percentile(total, 50) * 1000, 3),
+                    "total_p99_ms": round(loadgen.percentile(total, 99) * 1000, 3),
+                    "body_bytes": timings[-1][2],
+                    "peak_memory_over_idle_mb": round(
+                        (sampler.peak_memory - idle) / 1024 / 1024, 2
+                    ),
+                }
+                print(
+                    f"  -> rows={page_rows}: ttfb p50={row['ttfb_p50_ms']} ms "
+                    f"total p50={row['total_p50_ms']} ms "
+                    f"peak +{row['peak_memory_over_idle_mb']} MB"
+                )
+                rows.append(row)
+            recorder.save({"service": service, "mode": mode}, rows)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+    return True
+
+
+def run_export_pass(products, recorder):
+    """Stream a large product table through /products/export in each format.
+
+    Returns False when the database could not be seeded.
+    """
+    if not recorder.pending([{"service": service} for service in EXPORT_SERVICES]):
+        return True
+    if not reset_database(products):
+        print("❌ Database seeding failed. Skipping the export pass.")
+        return False
+    scale_products(EXPORT_ROWS)
+
+    for service in EXPORT_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping export for {framework}: No base URL configured.")
+            continue
+        if recorder.done(service=service):
+            continue
+
+        print(f"\n📤 Export: {service} ({EXPORT_ROWS} rows)")
+        start_service(service)
+        if not wait_for_service_ready(base_url):
+            print(f"⚠️ Skipping {framework} because it failed the health check.")
+            stop_and_remove_service(service)
+            continue
+
+        rows = []
+        for export_format in EXPORT_FORMATS:
+            with ResourceSampler(service) as sampler:
+                time.sleep(sampler.interval)
+                idle = sampler.memory[0] if sampler.memory else 0
+                [(ttfb, elapsed, size)] = loadgen.time_to_first_byte(
+                    base_url,
+                    "/products/export",
+                    1,
+                    {"format": export_format},
+                    timeout=None,
+                )
+            row = {
+                "framework": framework,
+                "format": export_format,
+                "rows": EXPORT_ROWS,
+                "bytes": size,
+                "seconds": round(elapsed, 3),
+                "mb_per_sec": round(size / 1024 / 1024 / elapsed, 2),
+                "rows_per_sec": round(EXPORT_ROWS / elapsed, 2),
+                "ttfb_ms": round(ttfb * 1000, 3),
+                "peak_memory_over_idle_mb": round(
+                    (sampler.peak_memory - idle) / 1024 / 1024, 2
+                ),
+            }
+            print(
+                f"  -> {export_format}: {row['mb_per_sec']} MB/s "
+                f"in {row['seconds']} s, peak +{row['peak_memory_over_idle_mb']} MB"
+            )
+            rows.append(row)
+        recorder.save({"service": service}, rows)
+
+        stop_and_remove_service(service)
+        time.sleep(2)
+    return True
+
+
+def run_search_pass(products, recorder):
+    """Run the search cases on a large table with and without its indexes.
+
+    Returns False when the database could not be seeded.
+    """
+    cells = [
+        {"service": service, "indexes": indexes}
+        for indexes in ["indexed", "seqscan"]
+        for service in SEARCH_SERVICES
+    ]
+    if not recorder.pending(cells):
+        return True
+    if not reset_database(products):
+        print("❌ Database seeding failed. Skipping the search pass.")
+        return False
+    scale_products(SEARCH_ROWS)
+
+    for indexes in ["indexed", "seqscan"]:
+        if indexes == "seqscan":
+            print("\nDropping search indexes...")
+            drop_search_indexes()
+
+        for service in SEARCH_SERVICES:
+            framework = framework_name_map.get(service, service)
+            base_url = FRAMEWORKS.get(framework)
+            if not base_url:
+                print(f"⚠️ Skipping search for {framework}: No base URL configured.")
+                continue
+            if recorder.done(service=service, indexes=indexes):
+                continue
+
+            print(f"\n🔎 Search: {service} ({indexes}, {SEARCH_ROWS} rows)")
+            start_service(service)
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            rows = []
+            for case in SEARCH_CASES:
+                print(f"  -> Running test: {case['name']}")
+                url = f"{base_url.rstrip('/')}/products/search?{urlencode(case['params'])}"
+                parsed = parse_wrk_output(run_wrk(url, DURATION, CONCURRENCY, THREADS))
+                if parsed:
+                    rows.append(
+                        {
+                            "framework": framework,
+                            "test": case["name"],
+                            "indexes": indexes,
+                            "rows": SEARCH_ROWS,
+                            "requests_per_sec": parsed.get("requests_per_sec"),
+                            "avg_latency_ms": parsed.get("avg_latency_ms"),
+                            "latency_p50_ms": parsed.get("latency_p50_ms"),
+                            "latency_p99_ms": parsed.get("latency_p99_ms"),
+                            "non_2xx": parsed.get("non_2xx", 0),
+                        }
+                    )
+            recorder.save({"service": service, "indexes": indexes}, rows)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+    return True
+
+
+def run_revalidation_pass(products, recorder):
+    """Poll the product endpoints with and without a matching If-None-Match.
+
+    Returns False when the database could not be seeded.
+    """
+    for service in REVALIDATION_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping revalidation for {framework}: No base URL configured.")
+            continue
+        if recorder.done(service=service):
+            continue
+
+        print(f"\n🏷️ Revalidation: {service} (ratio {REVALIDATION_RATIO})")
+        if not reset_database(products):
+            print("❌ Database seeding failed. Skipping the rest of the revalidation pass.")
+            return False
+        start_service(service)
+        if not wait_for_service_ready(base_url):
+            print(f"⚠️ Skipping {framework} because it failed the health check.")
+            stop_and_remove_service(service)
+            continue
+
+        rows = []
+        for case in REVALIDATION_CASES:
+            url = base_url.rstrip("/") + case["path"]
+            etag = httpx.get(url, timeout=30).headers.get("etag")
+            if not etag:
+                print(f"  ⚠️ {case['name']} sent no ETag; skipping it.")
+                continue
+            baseline = None
+            for ratio in [0.0, REVALIDATION_RATIO]:
+                print(f"  -> Running test: {case['name']} (revalidation ratio {ratio})")
+                lua_script = write_lua_script(
+                    REVALIDATION_LUA.format(etag=etag, ratio=ratio),
+                    f"revalidation_{framework}",
+                )
+                parsed = parse_wrk_output(
+                    run_wrk(url, DURATION, CONCURRENCY, THREADS, lua_script)
+                )
+                if not parsed:
+                    continue
+                rps = parsed.get("requests_per_sec")
+                transfer = parsed.get("transfer_bytes_per_sec")
+                requests, not_modified = parsed.get("requests"), parsed.get("not_modified")
+                row = {
+                    "framework": framework,
+                    "test": case["name"],
+                    "revalidation_ratio": ratio,
+                    "requests_per_sec": rps,
+                    "bytes_per_request": round(transfer / rps) if transfer and rps else None,
+                    "not_modified": not_modified,
+                    # Share of responses served as 304; should track the ratio
+                    "hit_ratio": (
+                        round(not_modified / requests, 3)
+                        if requests and not_modified is not None
+                        else None
+                    ),
+                    "rps_gain_pct": None,
+                    "bytes_saved_pct": None,
+                    "avg_latency_ms": parsed.get("avg_latency_ms"),
+                    "latency_p50_ms": parsed.get("latency_p50_ms"),
+                    "latency_p99_ms": parsed.get("latency_p99_ms"),
+                    "non_2xx": parsed.get("non_2xx", 0),
+                }
+                if baseline is None:
+                    baseline = row
+                else:
+                    if baseline["requests_per_sec"]:
+                        row["rps_gain_pct"] = round(
+                            (rps / baseline["requests_per_sec"] - 1) * 100, 1
+                        )
+                    if baseline["bytes_per_request"] and row["bytes_per_request"]:
+                        row["bytes_saved_pct"] = round(
+                            (1 - row["bytes_per_request"] / baseline["bytes_per_request"])
+                            * 100,
+                            1,
+                        )
+                rows.append(row)
+        recorder.save({"service": service}, rows)
+
+        stop_and_remove_service(service)
+        time.sleep(2)
+    return True
+
+
+def run_compression_pass(products, recorder):
+    """Trade bytes on the wire against CPU for each response encoding.
+
+    Returns False when the database could not be seeded.
+    """
+    for service in COMPRESSION_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping compression for {framework}: No base URL configured.")
+            continue
+        if recorder.done(service=service):
+            continue
+
+        print(f"\n🗜️ Compression: {service}")
+        if not reset_database(products):
+            print("❌ Database seeding failed. Skipping the rest of the compression pass.")
+            return False
+        codecs = [e for e in COMPRESSION_ENCODINGS if e != "identity"]
+        start_service(service, {"COMPRESSION": ",".join(codecs)})
+        if not wait_for_service_ready(base_url):
+            print(f"⚠️ Skipping {framework} because it failed the health check.")
+            stop_and_remove_service(service)
+            continue
+
+        rows = []
+        for case in COMPRESSION_CASES:
+            url = base_url.rstrip("/") + case["path"]
+            baseline = None
+            for encoding in COMPRESSION_ENCODINGS:
+                print(f"  -> Running test: {case['name']} ({encoding})")
+                lua_script = write_lua_script(
+                    ACCEPT_ENCODING_LUA.format(encoding=encoding),
+                    f"compression_{framework}",
+                )
+                with ResourceSampler(service) as sampler:
+                    output = run_wrk(url, DURATION, CONCURRENCY, THREADS, lua_script)
+                parsed = parse_wrk_output(output)
+                if not parsed:
+                    continue
+                rps = parsed.get("requests_per_sec")
+                transfer = parsed.get("transfer_bytes_per_sec")
+                row = {
+                    "framework": framework,
+                    "test": case["name"],
+                    "encoding": encoding,
+                    "requests_per_sec": rps,
+                    "bytes_per_request": round(transfer / rps) if transfer and rps else None,
+                    "bytes_saved_pct": None,
+                    "cpu_percent": round(sampler.mean_cpu, 1),
+                    # CPU time spent per request, across all workers
+                    "cpu_ms_per_request": (
+                        round(sampler.mean_cpu * 10 / rps, 3) if rps else None
+                    ),
+                    "avg_latency_ms": parsed.get("avg_latency_ms"),
+                    "latency_p50_ms": parsed.get("latency_p50_ms"),
+                    "latency_p99_ms": parsed.get("latency_p99_ms"),
+                    "non_2xx": parsed.get("non_2xx", 0),
+                }
+                if baseline is None:
+                    baseline = row
+                elif baseline["bytes_per_request"] and row["bytes_per_request"]:
+                    row["bytes_saved_pct"] = round(
+                        (1 - row["bytes_per_request"] / baseline["bytes_per_request"])
+                        * 100,
+                        1,
+                    )
+                rows.append(row)
+        recorder.save({"service": service}, rows)
+
+        stop_and_remove_service(service)
+        time.sleep(2)
+    return True
+
+
+def run_json_pass(products, recorder):
+    """Benchmark each JSON encoder backend across payload sizes and depths.
+
+    Returns False when the database could not be seeded.
+    """
+    for service in JSON_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping JSON encoders for {framework}: No base URL configured.")
+            continue
+
+        for encoder in JSON_ENCODERS:
+            if recorder.done(service=service, encoder=encoder):
+                continue
+            print(f"\n🧾 JSON: {service} (JSON_ENCODER={encoder})")
+            if not reset_database(products):
+                print("❌ Database seeding failed. Skipping the rest of the JSON pass.")
+                return False
+            start_service(service, {"JSON_ENCODER": encoder})
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            rows = []
+            for size, depth in JSON_PAYLOADS:
+                print(f"  -> Running test: JSON size={size} depth={depth}")
+                url = f"{base_url.rstrip('/')}/json?size={size}&depth={depth}"
+                parsed = parse_wrk_output(run_wrk(url, DURATION, CONCURRENCY, THREADS))
+                if not parsed:
+                    continue
+                rps = parsed.get("requests_per_sec")
+                transfer = parsed.get("transfer_bytes_per_sec")
+                rows.append(
+                    {
+                        "framework": framework,
+                        "encoder": encoder,
+                        "size": size,
+                        "depth": depth,
+                        "requests_per_sec": rps,
+                        "bytes_per_request": (
+                            round(transfer / rps) if transfer and rps else None
                         ),
+                        "mb_per_sec": round(transfer / 1_000_000, 2) if transfer else None,
+                        "avg_latency_ms": parsed.get("avg_latency_ms"),
+                        "latency_p50_ms": parsed.get("latency_p50_ms"),
+                        "latency_p99_ms": parsed.get("latency_p99_ms"),
+                        "non_2xx": parsed.get("non_2xx", 0),
                     }
                 )
+            recorder.save({"service": service, "encoder": encoder}, rows)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+    return True
+
+
+def add_db_time(rows):
+    """Add each row's in-memory throughput and the database's share of its time.
+
+    Rows are compared per framework and test case with their memory row.
+    """
+    memory_rps = {
+        (row["framework"], row["test"]): csv_number(row["requests_per_sec"])
+        for row in rows
+        if row["storage"] == "memory"
+    }
+    for row in rows:
+        framework_only = memory_rps.get((row["framework"], row["test"]))
+        rps = csv_number(row["requests_per_sec"])
+        row["framework_only_rps"] = framework_only
+        row["db_time_pct"] = None
+        if row["storage"] == "postgres" and rps and framework_only:
+            # Per-request time is 1/rps; the database adds the difference.
+            row["db_time_pct"] = round(max(0.0, 1 - rps / framework_only) * 100, 1)
+
+
+def run_storage_pass(products, recorder):
+    """Run TEST_CASES with and without the database behind each service.
+
+    Returns False when the database could not be seeded.
+    """
+    for service in STORAGE_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping storage backends for {framework}: No base URL configured.")
+            continue
+
+        for backend in STORAGE_BACKENDS:
+            cell = {"service": service, "storage": backend}
+            cases = recorder.pending_cases(framework, **cell)
+            if not cases:
+                continue
+            print(f"\n🗄️ Storage: {service} (STORAGE_BACKEND={backend})")
+            if not reset_database(products):
+                print("❌ Database seeding failed. Skipping the rest of the storage pass.")
+                return False
+            env = {"STORAGE_BACKEND": backend}
+            start_service(service, env)
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            def save(row):
+                storage_row = {
+                    "framework": framework,
+                    "test": row["test"],
+                    "storage": backend,
+                    "requests_per_sec": row["requests_per_sec"],
+                    "framework_only_rps": None,
+                    "db_time_pct": None,
+                    "avg_latency_ms": row["avg_latency_ms"],
+                    "latency_p50_ms": row["latency_p50_ms"],
+                    "latency_p99_ms": row["latency_p99_ms"],
+                    "non_2xx": row["non_2xx"],
+                }
+                recorder.save({**cell, "test": row["test"]}, [storage_row])
+
+            server = describe_server(service, env)
+            run_test_cases(framework, base_url, server, cases=cases, on_result=save)
+            stop_and_remove_service(service)
+            time.sleep(2)
+
+    # Both backends' rows are needed, so this runs on the saved file.
+    rows = recorder.rows()
+    if rows:
+        add_db_time(rows)
+        recorder.rewrite(rows)
+    return True
+
+
+def run_plan_pass(products, recorder):
+    """Capture and check the plan of every statement behind PLAN_CASES.
+
+    Returns False when the database could not be seeded.
+    """
+    if not recorder.pending([{"service": service} for service in PLAN_SERVICES]):
+        return True
+    if not reset_database(products):
+        print("❌ Database seeding failed. Skipping the plan pass.")
+        return False
+    scale_products(PLAN_ROWS)
+    indexes = indexed_columns()
+    set_auto_explain(True)
+    try:
+        for service in PLAN_SERVICES:
+            framework = framework_name_map.get(service, service)
+            base_url = FRAMEWORKS.get(framework)
+            if not base_url:
+                print(f"⚠️ Skipping plans for {framework}: No base URL configured.")
+                continue
+            if recorder.done(service=service):
+                continue
+
+            print(f"\n🧭 Plans: {service} ({PLAN_ROWS} rows)")
+            start_service(service)
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            rows = []
+            with httpx.Client(base_url=base_url, timeout=60) as client:
+                for case in PLAN_CASES:
+                    print(f"  -> Capturing plans: {case['name']}")
+                    client.get(case["path"])  # connection setup queries
+                    since = time.time()
+                    for _ in range(PLAN_REQUESTS):
+                        client.get(case["path"])
+                    time.sleep(1)  # let the log catch up
+                    statements = {}
+                    for duration, plan in read_logged_plans(since):
+                        query = " ".join(plan.get("Query Text", "").split())
+                        calls = statements.get(query, (0,))[0] + 1
+                        statements[query] = (calls, duration, plan)
+                    for query, (calls, duration, plan) in statements.items():
+                        flags, suggestions = analyze_plan(plan, indexes)
+                        top = plan["Plan"]
+                        rows.append(
+                            {
+                                "framework": framework,
+                                "test": case["name"],
+                                "rows": PLAN_ROWS,
+                                "calls_per_request": round(calls / PLAN_REQUESTS, 2),
+                                "duration_ms": duration,
+                                "top_node": top["Node Type"],
+                                "shared_blks_hit": top.get("Shared Hit Blocks"),
+                                "shared_blks_read": top.get("Shared Read Blocks"),
+                                "flags": "; ".join(flags),
+                                "suggestions": "; ".join(suggestions),
+                                "query": query,
+                            }
+                        )
+            recorder.save({"service": service}, rows)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+    finally:
+        set_auto_explain(False)
+
+    suggested = dict.fromkeys(
+        suggestion
+        for row in recorder.rows()
+        if row["suggestions"]
+        for suggestion in row["suggestions"].split("; ")
+    )
+    if suggested:
+        print("\n💡 Suggestions from the captured plans:")
+        for suggestion in suggested:
+            print(f"  {suggestion}")
+    return True
+
+
+def profile_imports(service):
+    """Import the service's app modules under -X importtime in a one-off container.
+
+    Returns (app_import_ms, rows) with the IMPORT_TIME_TOP top-level packages
+    by self time, or (None, []) when the import failed.
+    """
+    modules = IMPORT_TIME_MODULES[service]
+    statement = "import " + ", ".join(modules)
+    output = docker.compose.run(
+        service,
+        ["sh", "-c", f'python -X importtime -c "{statement}" 2>&1 >/dev/null'],
+        dependencies=False,
+        remove=True,
+        tty=False,
+    )
+    # The app modules and their parent packages, e.g. core and core.wsgi
+    app_names = {
+        ".".join(module.split(".")[: i + 1])
+        for module in modules
+        for i in range(module.count(".") + 1)
+    }
+    # -X importtime prints a module after everything it imported, one level
+    # of indentation deeper, so the lines since the last top-level module
+    # belong to the next top-level one.
+    pending, app_lines = [], []
+    for line in output.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        pending.append((name, int(self_us), int(cumulative_us)))
+        if not indent:
+            if name in app_names:
+                app_lines.extend(pending)
+            pending = []
+    if not app_lines:
+        print(f"  ⚠️ No import timings for {service}:\n{output[-2000:]}")
+        return None, []
+
+    app_import_us = sum(c for name, _, c in app_lines if name in app_names)
+    packages = {}
+    for name, self_us, _ in app_lines:
+        package = name.split(".")[0]
+        total, count = packages.get(package, (0, 0))
+        packages[package] = (total + self_us, count + 1)
+    ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+    rows = [
+        {
+            "package": package,
+            "self_ms": round(self_us / 1000, 2),
+            "modules": count,
+            "share_pct": round(self_us / app_import_us * 100, 1),
+        }
+        for package, (self_us, count) in ranked[:IMPORT_TIME_TOP]
+    ]
+    return round(app_import_us / 1000, 2), rows
+
+
+def run_cold_start_pass(products, recorder):
+    """Time each service from container start to its first (and second) responses.
+
+    Returns False when the database could not be seeded.
+    """
+    for service in FRAMEWORK_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping cold start for {framework}: No base URL configured.")
+            continue
+        if recorder.done(service=service):
+            continue
+
+        print(f"\n🧊 Cold start: {service} ({COLD_START_RUNS} runs)")
+        if not reset_database(products):
+            print("❌ Database seeding failed. Skipping the rest of the cold start pass.")
+            return False
+
+        cold_rows, import_rows = [], []
+        if service in IMPORT_TIME_MODULES:
+            print("  -> Profiling imports")
+            app_import_ms, packages = profile_imports(service)
+            import_rows.extend(
+                {"framework": framework, "app_import_ms": app_import_ms, "rank": rank, **row}
+                for rank, row in enumerate(packages, 1)
+            )
+
+        for run in range(1, COLD_START_RUNS + 1):
+            print(f"  -> Run {run}")
+            started = time.perf_counter()
+            start_service(service)
+            container_up_s = time.perf_counter() - started
+            ready_s = wait_for_service_ready(base_url, started, COLD_START_POLL_SECONDS)
+            if ready_s is None:
+                stop_and_remove_service(service)
+                continue
+            with httpx.Client(base_url=base_url, timeout=30) as client:
+                for path in COLD_START_PATHS:
+                    latencies = []
+                    for _ in range(2):
+                        request_started = time.perf_counter()
+                        status = client.get(path).status_code
+                        latencies.append(time.perf_counter() - request_started)
+                    cold_rows.append(
+                        {
+                            "framework": framework,
+                            "run": run,
+                            "container_up_s": round(container_up_s, 3),
+                            "ready_s": round(ready_s, 3),
+                            "path": path,
+                            "status": status,
+                            "first_request_ms": round(latencies[0] * 1000, 2),
+                            "second_request_ms": round(latencies[1] * 1000, 2),
+                        }
+                    )
+            stop_and_remove_service(service)
+            time.sleep(2)
+        recorder.save({"service": service}, cold_rows, import_rows)
+    return True
+
+
+def slope(points):
+    """Least-squares slope of (x, y) points; None with fewer than two."""
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def summarize_soak(framework, windows, memory):
+    """Drift, memory growth and worst seconds of one soak run."""
+    # Drift compares the first and last tenth of the run after the warm-up.
+    steady = [w for w in windows if w["second"] >= SOAK_WARMUP_SECONDS] or windows
+    tenth = max(1, len(steady) // 10)
+    head, tail = steady[:tenth], steady[-tenth:]
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+
+    def drift_pct(key):
+        before, after = mean(w[key] for w in head), mean(w[key] for w in tail)
+        return round((after / before - 1) * 100, 1) if before and after is not None else None
+
+    rss_per_hour = slope([(t, total) for t, total, _, _ in memory])
+    worst = sorted(windows, key=lambda w: w["p99_ms"] or 0, reverse=True)
+    return {
+        "framework": framework,
+        "path": SOAK_PATH,
+        "mode": f"rate {SOAK_RATE:g}/s" if SOAK_RATE else f"concurrency {SOAK_CONCURRENCY}",
+        "duration_s": len(windows),
+        "requests": sum(w["requests"] for w in windows),
+        "mean_rps": round(mean(w["requests"] for w in steady) or 0, 2),
+        "min_rps": min((w["requests"] for w in steady), default=None),
+        "rps_drift_pct": drift_pct("requests"),
+        "p99_drift_pct": drift_pct("p99_ms"),
+        "errors": sum(w["errors"] for w in windows),
+        "non_2xx": sum(w["non_2xx"] for w in windows),
+        "rss_start_mb": round(memory[0][1] / 1_000_000, 1) if memory else None,
+        "rss_end_mb": round(memory[-1][1] / 1_000_000, 1) if memory else None,
+        "rss_growth_mb_per_hour": (
+            round(rss_per_hour * 3600 / 1_000_000, 2) if rss_per_hour is not None else None
+        ),
+        "max_process_rss_mb": round(max(m[2] for m in memory) / 1_000_000, 1) if memory else None,
+        # "second:p99_ms" of the slowest one-second windows
+        "worst_seconds": " ".join(
+            f"{w['second']}:{w['p99_ms']}" for w in worst[:SOAK_WORST_WINDOWS]
+        ),
+    }
+
+
+def run_soak_pass(products, recorder):
+    """Hold each service under steady load for hours and track drift and memory.
+
+    Returns False when the database could not be seeded.
+    """
+    for service in SOAK_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping soak for {framework}: No base URL configured.")
+            continue
+        if recorder.done(service=service):
+            continue
+
+        print(f"\n⏳ Soak: {service} ({SOAK_DURATION}s on {SOAK_PATH})")
+        if not reset_database(products):
+            print("❌ Database seeding failed. Skipping the rest of the soak pass.")
+            return False
+        start_service(service)
+        if not wait_for_service_ready(base_url):
+            print(f"⚠️ Skipping {framework} because it failed the health check.")
+            stop_and_remove_service(service)
+            continue
+
+        with ProcessMemorySampler(service, SOAK_SAMPLE_SECONDS) as sampler:
+            windows = loadgen.run_soak(
+                base_url,
+                "GET",
+                SOAK_PATH,
+                SOAK_CONCURRENCY,
+                SOAK_DURATION,
+                rate=SOAK_RATE or None,
+            )
+        # Requests that completed after the deadline
+        windows = [w for w in windows if w["second"] < SOAK_DURATION]
+        timeseries = [{"framework": framework, **w} for w in windows]
+        memory_rows = [
+            {
+                "framework": framework,
+                "elapsed_s": round(elapsed, 1),
+                "rss_total_mb": round(total / 1_000_000, 1),
+                "rss_max_process_mb": round(largest / 1_000_000, 1),
+                "processes": processes,
+            }
+            for elapsed, total, largest, processes in sampler.samples
+        ]
+        summaries = [summarize_soak(framework, windows, sampler.samples)] if windows else []
+        recorder.save({"service": service}, summaries, timeseries, memory_rows)
 
         stop_and_remove_service(service)
         time.sleep(2)
+    return True
 
-    # Stop all containers at the end
-    stop_and_remove_all_services()
 
-    if results:
-        with open(OUTPUT_PATH, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=results[0].keys())
+def scrape_gc_pauses(base_url, workers):
+    """Cumulative GC pause (count, ms) per generation of each worker /metrics reaches."""
+    per_worker = {}
+    # Each request lands on whichever worker accepts it; ask until all answered.
+    for _ in range(workers * 10):
+        try:
+            text = httpx.get(base_url + "/metrics", timeout=5).text
+        except httpx.RequestError:
+            continue
+        pid = re.search(r"^app_worker_pid (\d+)", text, re.MULTILINE)
+        if not pid:
+            continue
+        pauses = {}
+        for kind, generation, value in GC_METRIC_PATTERN.findall(text):
+            count, total = pauses.get(int(generation), (0, 0.0))
+            if kind == "count":
+                count = int(value)
+            else:
+                total = float(value)
+            pauses[int(generation)] = (count, total)
+        per_worker[pid.group(1)] = pauses
+        if len(per_worker) == workers:
+            break
+    return per_worker
+
+
+def gc_pause_delta(before, after):
+    """Pauses and pause ms per generation added between two scrapes, over common workers."""
+    delta = {generation: [0, 0.0] for generation in range(3)}
+    for pid, pauses in after.items():
+        for generation, (count, total) in pauses.items():
+            count_before, total_before = before.get(pid, {}).get(generation, (0, 0.0))
+            delta[generation][0] += count - count_before
+            delta[generation][1] += total - total_before
+    return delta
+
+
+def run_gc_profile_pass(products, recorder):
+    """Compare default gunicorn workers with preloaded, GC-frozen ones.
+
+    Returns False when the database could not be seeded.
+    """
+    cases = [case for case in TEST_CASES if case["name"] in GC_PROFILE_CASES]
+    for service in GC_PROFILE_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping GC profiles for {framework}: No base URL configured.")
+            continue
+
+        for profile, profile_env in GC_PROFILES.items():
+            if recorder.done(service=service, profile=profile):
+                continue
+            print(f"\n♻️ GC profile: {service} ({profile}, {GC_PROFILE_WORKERS} workers)")
+            if not reset_database(products):
+                print("❌ Database seeding failed. Skipping the rest of the GC profile pass.")
+                return False
+            start_service(service, {"WEB_WORKERS": str(GC_PROFILE_WORKERS), **profile_env})
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            rows = []
+            for case in cases:
+                print(f"  -> Running test: {case['name']}")
+                before = scrape_gc_pauses(base_url, GC_PROFILE_WORKERS)
+                url = base_url.rstrip("/") + case["path"]
+                parsed = parse_wrk_output(run_wrk(url, DURATION, CONCURRENCY, THREADS))
+                if not parsed:
+                    continue
+                pauses = gc_pause_delta(before, scrape_gc_pauses(base_url, GC_PROFILE_WORKERS))
+                memory = container_memory(service)
+                requests = parsed.get("requests") or 1
+                pause_ms = sum(total for _, total in pauses.values())
+                rows.append(
+                    {
+                        "framework": framework,
+                        "profile": profile,
+                        "test": case["name"],
+                        "workers": GC_PROFILE_WORKERS,
+                        "requests_per_sec": parsed.get("requests_per_sec"),
+                        "latency_p50_ms": parsed.get("latency_p50_ms"),
+                        "latency_p99_ms": parsed.get("latency_p99_ms"),
+                        "gc_pauses": sum(count for count, _ in pauses.values()),
+                        "gc_gen2_pauses": pauses[2][0],
+                        "gc_pause_ms": round(pause_ms, 2),
+                        "gc_pause_us_per_request": round(pause_ms * 1000 / requests, 2),
+                        "rss_mb": round(memory["Rss"] / 1_000_000, 1),
+                        "pss_mb": round(memory["Pss"] / 1_000_000, 1),
+                        "shared_mb": round(memory["Shared"] / 1_000_000, 1),
+                        "private_mb": round(memory["Private"] / 1_000_000, 1),
+                        "non_2xx": parsed.get("non_2xx", 0),
+                    }
+                )
+            recorder.save({"service": service, "profile": profile}, rows)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+    return True
+
+
+def resource_cpusets(server_cpus):
+    """Disjoint wrk, DB and server core lists for a profile; None if the host is too small."""
+    wrk_end = RESOURCE_WRK_CPUS
+    db_end = wrk_end + RESOURCE_DB_CPUS
+    if db_end + server_cpus > HOST_CPUS:
+        return None
+    cores = list(range(db_end + server_cpus))
+    return cores[:wrk_end], cores[wrk_end:db_end], cores[db_end:]
+
+
+def cpuset_string(cores):
+    return ",".join(map(str, cores))
+
+
+def add_core_scaling(rows):
+    """Add each row's speedup and scaling efficiency over its smallest profile.
+
+    Rows are compared per framework and test case. An efficiency of 1.0 means
+    throughput grew in proportion to the cores; a flat speedup means the
+    framework (or its configuration) cannot use the extra cores.
+    """
+    baselines = {}
+    for row in rows:
+        key = (row["framework"], row["test"])
+        cpus = csv_number(row["server_cpus"])
+        if key not in baselines or cpus < csv_number(baselines[key]["server_cpus"]):
+            baselines[key] = row
+    for row in rows:
+        baseline = baselines[(row["framework"], row["test"])]
+        baseline_rps = csv_number(baseline["requests_per_sec"])
+        speedup = csv_number(row["requests_per_sec"]) / baseline_rps if baseline_rps else 0.0
+        row["speedup"] = round(speedup, 2)
+        row["scaling_efficiency"] = round(
+            speedup * csv_number(baseline["server_cpus"]) / csv_number(row["server_cpus"]), 2
+        )
+
+
+def print_resource_summary(rows):
+    """Print mean throughput and scaling efficiency per framework and profile."""
+    groups = {}
+    for row in rows:
+        key = (row["framework"], csv_number(row["server_cpus"]), row["profile"])
+        groups.setdefault(key, []).append(row)
+
+    print("\n🧮 Core scaling (mean over test cases):")
+    for (framework, _, profile), group in sorted(groups.items()):
+        rps = sum(csv_number(r["requests_per_sec"]) for r in group) / len(group)
+        efficiency = sum(csv_number(r["scaling_efficiency"]) for r in group) / len(group)
+        print(
+            f"  {framework:<24} {profile:<8} rps={rps:>10.2f} "
+            f"efficiency={efficiency:>5.2f}"
+        )
+
+
+def run_resource_pass(products, recorder):
+    """Run the TEST_CASES under each CPU/memory profile and measure core scaling.
+
+    Returns False when the database could not be seeded.
+    """
+    for profile, cpus in RESOURCE_PROFILES.items():
+        cpusets = resource_cpusets(cpus)
+        if not cpusets:
+            needed = RESOURCE_WRK_CPUS + RESOURCE_DB_CPUS + cpus
+            print(
+                f"⚠️ Skipping resource profile {profile}: "
+                f"needs {needed} cores, the host has {HOST_CPUS}."
+            )
+            continue
+        wrk_cores, db_cores, server_cores = cpusets
+        limits = {
+            "SERVER_CPUSET": cpuset_string(server_cores),
+            "SERVER_MEMORY": RESOURCE_SERVER_MEMORY,
+            "DB_CPUSET": cpuset_string(db_cores),
+            "DB_MEMORY": RESOURCE_DB_MEMORY,
+        }
+        with compose_environment(limits):
+            for service in RESOURCE_SERVICES:
+                framework = framework_name_map.get(service, service)
+                base_url = FRAMEWORKS.get(framework)
+                if not base_url:
+                    print(f"⚠️ Skipping resources for {framework}: No base URL configured.")
+                    continue
+                cell = {"profile": profile, "service": service}
+                cases = recorder.pending_cases(framework, **cell)
+                if not cases:
+                    continue
+
+                # One worker per allocated core; express and gin size themselves.
+                env = {} if service in NON_PYTHON_SERVICES else {"WEB_WORKERS": str(cpus)}
+                server = describe_server(service, env, cpus)
+                print(
+                    f"\n🧮 Resources: {service} ({profile}: server cpuset "
+                    f"{limits['SERVER_CPUSET']}, db {limits['DB_CPUSET']}, "
+                    f"wrk {cpuset_string(wrk_cores)})"
+                )
+                if not reset_database(products):
+                    print("❌ Database seeding failed. Skipping the rest of the resource pass.")
+                    return False
+                start_service(service, env)
+                if not wait_for_service_ready(base_url):
+                    print(f"⚠️ Skipping {framework} because it failed the health check.")
+                    stop_and_remove_service(service)
+                    continue
+
+                def save(row):
+                    resource_row = {
+                        "profile": profile,
+                        "server_cpus": cpus,
+                        "server_memory": RESOURCE_SERVER_MEMORY,
+                        "server_cpuset": limits["SERVER_CPUSET"],
+                        "db_cpuset": limits["DB_CPUSET"],
+                        "wrk_cpuset": cpuset_string(wrk_cores),
+                        **row,
+                        "speedup": None,
+                        "scaling_efficiency": None,
+                    }
+                    recorder.save({**cell, "test": row["test"]}, [resource_row])
+
+                run_test_cases(
+                    framework,
+                    base_url,
+                    server,
+                    wrk_cpuset=wrk_cores,
+                    cases=cases,
+                    on_result=save,
+                )
+                stop_and_remove_service(service)
+                time.sleep(2)
+
+    # Scaling compares every profile's rows, so this runs on the saved file.
+    rows = recorder.rows()
+    if rows:
+        add_core_scaling(rows)
+        recorder.rewrite(rows)
+        print_resource_summary(rows)
+    return True
+
+
+def run_churn_pass(products, recorder):
+    """Measure connection setup cost: churned connections and connect storms.
+
+    Returns False when the database could not be seeded.
+    """
+    modes = [
+        (f"{n}-per-connection" if n > 1 else "close", n) for n in CHURN_REQUESTS_PER_CONNECTION
+    ]
+    modes.append(("storm", 1))
+    for service in CHURN_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping churn for {framework}: No base URL configured.")
+            continue
+        if recorder.done(service=service):
+            continue
+
+        print(f"\n🔌 Connection churn: {service} ({CHURN_PATH})")
+        if not reset_database(products):
+            print("❌ Database seeding failed. Skipping the rest of the churn pass.")
+            return False
+        start_service(service)
+        if not wait_for_service_ready(base_url):
+            print(f"⚠️ Skipping {framework} because it failed the health check.")
+            stop_and_remove_service(service)
+            continue
+
+        rows = []
+        for mode, requests_per_connection in modes:
+            print(f"  -> Running {mode}")
+            before = listen_queue_counters(service)
+            if mode == "storm":
+                samples, elapsed = loadgen.run_connection_storm(
+                    base_url,
+                    CHURN_PATH,
+                    CHURN_STORM_BURST,
+                    CHURN_STORM_BURSTS,
+                    CHURN_STORM_INTERVAL,
+                )
+                concurrency = CHURN_STORM_BURST
+            else:
+                samples, elapsed = loadgen.run_connection_churn(
+                    base_url,
+                    CHURN_PATH,
+                    CHURN_CONCURRENCY,
+                    CHURN_DURATION,
+                    requests_per_connection,
+                )
+                concurrency = CHURN_CONCURRENCY
+            after = listen_queue_counters(service)
+            summary = loadgen.summarize_connections(samples, elapsed)
+            overflows, drops = (
+                (after[0] - before[0], after[1] - before[1]) if before and after else (None, None)
+            )
+            print(
+                f"     {summary['connections_per_sec']} conn/s "
+                f"connect p99={summary['connect_p99_ms']} ms "
+                f"listen overflows={overflows}"
+            )
+            rows.append(
+                {
+                    "framework": framework,
+                    "path": CHURN_PATH,
+                    "mode": mode,
+                    "concurrency": concurrency,
+                    **summary,
+                    "listen_overflows": overflows,
+                    "listen_drops": drops,
+                }
+            )
+        recorder.save({"service": service}, rows)
+
+        stop_and_remove_service(service)
+        time.sleep(2)
+    return True
+
+
+def run_h2_pass(products, recorder):
+    """Compare h2c streams with HTTP/1.1 connections at the same requests in flight.
+
+    Returns False when the database could not be seeded.
+    """
+    cases = [case for case in TEST_CASES if case["name"] in H2_CASES]
+    runs = [
+        (streams, background_path, protocol)
+        for streams in H2_STREAMS
+        for background_path in ([None, H2_SLOW_PATH] if H2_SLOW_PATH else [None])
+        # a background stream needs another one left for the case itself
+        if not (background_path and streams < 2)
+        for protocol in ["h2c", "http/1.1"]
+    ]
+    for service in H2_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping HTTP/2 for {framework}: No base URL configured.")
+            continue
+        if recorder.done(service=service):
+            continue
+
+        print(f"\n🔀 HTTP/2: {service}")
+        if not reset_database(products):
+            print("❌ Database seeding failed. Skipping the rest of the HTTP/2 pass.")
+            return False
+        start_service(service)
+        if not wait_for_service_ready(base_url):
+            print(f"⚠️ Skipping {framework} because it failed the health check.")
+            stop_and_remove_service(service)
+            continue
+
+        rows = []
+        for case in cases:
+            for streams, background_path, protocol in runs:
+                print(
+                    f"  -> Running {case['name']} over {protocol}: {H2_CONNECTIONS}x{streams}"
+                    + (f" alongside {background_path}" if background_path else "")
+                )
+                samples, background, elapsed = loadgen.run_multiplexed(
+                    base_url,
+                    case["path"],
+                    H2_CONNECTIONS,
+                    streams,
+                    H2_DURATION,
+                    http2=protocol == "h2c",
+                    background_path=background_path,
+                )
+                rows.append(
+                    {
+                        "framework": framework,
+                        "test": case["name"],
+                        "protocol": protocol,
+                        "connections": H2_CONNECTIONS * (1 if protocol == "h2c" else streams),
+                        "streams_per_connection": streams if protocol == "h2c" else 1,
+                        "in_flight": H2_CONNECTIONS * streams,
+                        "background_path": background_path or "",
+                        **loadgen.summarize_multiplexed(samples, background, elapsed),
+                    }
+                )
+        recorder.save({"service": service}, rows)
+
+        stop_and_remove_service(service)
+        time.sleep(2)
+    return True
+
+
+def run_replica_pass(products, recorder):
+    """Compare reads on the primary with reads on the replica, and measure lag.
+
+    Returns False when the database or the replica could not be brought up.
+    """
+    cases = [case for case in TEST_CASES if case["name"] in REPLICA_CASES]
+    ids = range(1, len(products) + 1)
+    runs = [
+        ("primary", {"POSTGRES_REPLICA_HOST": ""}, [False]),
+        ("replica", {"POSTGRES_REPLICA_HOST": DB_REPLICA_SERVICE}, [False, True]),
+    ]
+    for service in REPLICA_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping the replica pass for {framework}: No base URL configured.")
+            continue
+
+        for reads_from, replica_env, min_lsn_modes in runs:
+            if recorder.done(service=service, reads_from=reads_from):
+                continue
+            print(f"\n🪞 Read replica: {service} (reads from the {reads_from})")
+            if not reset_database(products):
+                print("❌ Database seeding failed. Skipping the rest of the replica pass.")
+                return False
+            start_service(DB_REPLICA_SERVICE)
+            if not wait_for_replica():
+                stop_and_remove_all_services()
+                return False
+            env = {**replica_env, "WEB_WORKERS": str(REPLICA_WORKERS)}
+            start_service(service, env)
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+            server = describe_server(service, env)
+
+            read_rows, mixed_rows = [], []
+            for case in cases:
+                print(f"  -> Running test: {case['name']}")
+                output = run_wrk(
+                    base_url.rstrip("/") + case["path"], DURATION, CONCURRENCY, THREADS
+                )
+                parsed = parse_wrk_output(output)
+                if parsed:
+                    read_rows.append(
+                        {
+                            "framework": framework,
+                            "test": case["name"],
+                            "reads_from": reads_from,
+                            "workers": server["workers"],
+                            "requests_per_sec": parsed.get("requests_per_sec"),
+                            "avg_latency_ms": parsed.get("avg_latency_ms"),
+                            "latency_p50_ms": parsed.get("latency_p50_ms"),
+                            "latency_p99_ms": parsed.get("latency_p99_ms"),
+                            "non_2xx": parsed.get("non_2xx", 0),
+                            "speedup_vs_primary": None,
+                        }
+                    )
+
+            for min_lsn in min_lsn_modes:
+                print(
+                    f"  -> Running mixed read/write ({REPLICA_WRITE_FRACTION:.0%} writes"
+                    + (", X-Min-LSN)" if min_lsn else ")")
+                )
+                with ReplicationLagSampler(REPLICA_LAG_SAMPLE_SECONDS) as lag:
+                    writes, reads_after_write, reads, elapsed = loadgen.run_read_your_writes(
+                        base_url,
+                        ids,
+                        REPLICA_CONCURRENCY,
+                        REPLICA_DURATION,
+                        REPLICA_WRITE_FRACTION,
+                        min_lsn,
+                    )
+                summary = loadgen.summarize_read_your_writes(
+                    writes, reads_after_write, reads, elapsed
+                )
+                print(
+                    f"     {summary['throughput_rps']} req/s "
+                    f"stale reads={summary['stale_read_pct']}% "
+                    f"primary fallbacks={summary['primary_fallback_pct']}%"
+                )
+                mixed_rows.append(
+                    {
+                        "framework": framework,
+                        "reads_from": reads_from,
+                        "read_your_writes": min_lsn,
+                        "workers": server["workers"],
+                        "concurrency": REPLICA_CONCURRENCY,
+                        "write_fraction": REPLICA_WRITE_FRACTION,
+                        **summary,
+                        **lag.summary(),
+                    }
+                )
+            recorder.save({"service": service, "reads_from": reads_from}, read_rows, mixed_rows)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+
+    # Read scaling: the replica's throughput relative to the primary's, on the saved file
+    read_rows = recorder.rows()
+    primary_rps = {
+        (row["framework"], row["test"]): csv_number(row["requests_per_sec"])
+        for row in read_rows
+        if row["reads_from"] == "primary"
+    }
+    for row in read_rows:
+        baseline = primary_rps.get((row["framework"], row["test"]))
+        rps = csv_number(row["requests_per_sec"])
+        row["speedup_vs_primary"] = (
+            round(rps / baseline, 2) if baseline and rps is not None else None
+        )
+    if read_rows:
+        recorder.rewrite(read_rows)
+    return True
+
+
+def ensure_python_image(version):
+    """Build the source-built base image of a PYTHON_BUILDS entry if it is missing.
+
+    Returns False when the build fails. Official images are pulled by the
+    service builds themselves.
+    """
+    build = PYTHON_BUILDS[version]
+    if "configure" not in build or docker.image.exists(build["image"]):
+        return True
+    source = Path("python") / f"Python-{PYTHON_SOURCE_VERSION}.tar.xz"
+    if not source.exists():
+        print(
+            f"⚠️ Skipping Python {version}: {source} is missing. Download it from "
+            f"https://www.python.org/ftp/python/{PYTHON_SOURCE_VERSION}/{source.name}"
+        )
+        return False
+    print(f"🐍 Building {build['image']} (CPython {PYTHON_SOURCE_VERSION} from source)...")
+    try:
+        docker.build(
+            "python",
+            tags=[build["image"]],
+            build_args={
+                "PYTHON_VERSION": PYTHON_SOURCE_VERSION,
+                "CONFIGURE_FLAGS": build["configure"],
+            },
+            load=True,
+        )
+    except Exception as e:
+        print(f"❌ Could not build {build['image']}: {e}")
+        return False
+    return True
+
+
+def build_service(service, python_image):
+    """Rebuild a Python service's image on `python_image`; False when the build fails."""
+    print(f"Building {service} on {python_image}...")
+    try:
+        with compose_environment({"PYTHON_IMAGE": python_image}):
+            docker.compose.build(services=[service])
+    except Exception as e:
+        print(f"❌ Could not build {service} on {python_image}: {e}")
+        return False
+    return True
+
+
+def interpreter_info(service):
+    """INTERPRETER_SCRIPT's findings in a running service's container, or {}."""
+    try:
+        output = docker.compose.execute(
+            service, ["python", "-c", INTERPRETER_SCRIPT], tty=False
+        )
+        return json.loads(output)
+    except Exception as e:
+        print(f"⚠️ Could not inspect the interpreter of {service}: {e}")
+        return {}
+
+
+def add_version_deltas(rows, baseline_version):
+    """Add each row's throughput and p99 change (%) against `baseline_version`.
+
+    Rows are compared per framework and test case; None when the baseline
+    has no row for them.
+    """
+    baselines = {
+        (row["framework"], row["test"]): row
+        for row in rows
+        if row["python"] == baseline_version
+    }
+    for row in rows:
+        baseline = baselines.get((row["framework"], row["test"]))
+        row["rps_delta_pct"] = row["p99_delta_pct"] = None
+        if not baseline:
+            continue
+        rps, baseline_rps = (csv_number(r["requests_per_sec"]) for r in (row, baseline))
+        p99, baseline_p99 = (csv_number(r["latency_p99_ms"]) for r in (row, baseline))
+        if baseline_rps and rps is not None:
+            row["rps_delta_pct"] = round((rps / baseline_rps - 1) * 100, 1)
+        if baseline_p99 and p99 is not None:
+            row["p99_delta_pct"] = round((p99 / baseline_p99 - 1) * 100, 1)
+
+
+def print_python_summary(rows, baseline_version):
+    """Print the mean throughput change per framework and interpreter."""
+    groups = {}
+    for row in rows:
+        if csv_number(row["rps_delta_pct"]) is not None:
+            groups.setdefault((row["framework"], row["python"]), []).append(row)
+
+    print(f"\n🐍 Interpreter matrix (mean throughput change vs {baseline_version}):")
+    for (framework, version), group in groups.items():
+        delta = sum(csv_number(r["rps_delta_pct"]) for r in group) / len(group)
+        print(f"  {framework:<24} {version:<9} {delta:>+7.1f}%")
+
+
+def run_python_matrix_pass(products, recorder):
+    """Run TEST_CASES on every interpreter of PYTHON_MATRIX_VERSIONS.
+
+    Returns False when the database could not be seeded.
+    """
+    versions = [v for v in PYTHON_MATRIX_VERSIONS if v in PYTHON_BUILDS]
+    for version in set(PYTHON_MATRIX_VERSIONS) - set(versions):
+        print(f"⚠️ Skipping unknown interpreter {version} (see PYTHON_BUILDS).")
+    for service, server_env in PYTHON_MATRIX_SERVICES.items():
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping the interpreter matrix for {framework}: No base URL configured.")
+            continue
+        pending = {
+            version: recorder.pending_cases(framework, service=service, python=version)
+            for version in versions
+        }
+        if not any(pending.values()):
+            continue
+
+        try:
+            for version, cases in pending.items():
+                if not cases:
+                    continue
+                build = PYTHON_BUILDS[version]
+                print(f"\n🐍 Interpreter: {service} on Python {version} ({build['image']})")
+                if not ensure_python_image(version) or not build_service(service, build["image"]):
+                    continue
+                if not reset_database(products):
+                    print("❌ Database seeding failed. Skipping the rest of the interpreter matrix.")
+                    return False
+                env = {**server_env, **build.get("env", {})}
+                start_service(service, env)
+                if not wait_for_service_ready(base_url):
+                    print(f"⚠️ Skipping {framework} because it failed the health check.")
+                    stop_and_remove_service(service)
+                    continue
+
+                interpreter = interpreter_info(service)
+                server = describe_server(
+                    service, env, gil_enabled=interpreter.get("gil_enabled") is not False
+                )
+
+                def save(row):
+                    python_row = {
+                        "python": version,
+                        "python_version": interpreter.get("version"),
+                        "jit": interpreter.get("jit"),
+                        "free_threaded": interpreter.get("free_threaded"),
+                        "gil_enabled": interpreter.get("gil_enabled"),
+                        **row,
+                        "rps_delta_pct": None,
+                        "p99_delta_pct": None,
+                    }
+                    cell = {"service": service, "python": version, "test": row["test"]}
+                    recorder.save(cell, [python_row])
+
+                run_test_cases(framework, base_url, server, cases=cases, on_result=save)
+                stop_and_remove_service(service)
+                time.sleep(2)
+        finally:
+            # Leave the image on the default interpreter for the other passes
+            build_service(service, DEFAULT_PYTHON_IMAGE)
+
+    # Deltas compare every interpreter's rows, so this runs on the saved file.
+    rows = recorder.rows()
+    if rows and versions:
+        add_version_deltas(rows, versions[0])
+        recorder.rewrite(rows)
+        print_python_summary(rows, versions[0])
+    return True
+
+
+def run_crud_pass(products, recorder):
+    """Run the stateful CRUD mix on each service and count successful operations.
+
+    Returns False when CRUD_MIX is invalid or the database could not be seeded.
+    """
+    unknown = set(CRUD_MIX) - set(loadgen.CRUD_EXPECTED_STATUS)
+    if unknown:
+        print(f"❌ Unknown CRUD_MIX operations: {', '.join(sorted(unknown))}. Skipping CRUD.")
+        return False
+    for service in CRUD_SERVICES:
+        framework = framework_name_map.get(service, service)
+        base_url = FRAMEWORKS.get(framework)
+        if not base_url:
+            print(f"⚠️ Skipping CRUD for {framework}: No base URL configured.")
+            continue
+        if recorder.done(service=service):
+            continue
+
+        print(f"\n🔁 CRUD lifecycle: {service}")
+        if not reset_database(products):
+            print("❌ Database seeding failed. Skipping the rest of the CRUD pass.")
+            return False
+        start_service(service)
+        if not wait_for_service_ready(base_url):
+            print(f"⚠️ Skipping {framework} because it failed the health check.")
+            stop_and_remove_service(service)
+            continue
+
+        samples, live_ids, elapsed = loadgen.run_crud(
+            base_url,
+            range(1, len(products) + 1),
+            CRUD_CONCURRENCY,
+            CRUD_DURATION,
+            CRUD_MIX,
+            PRODUCT_JSON,
+            '{"name":"Updated Product"}',
+        )
+        rows = []
+        for summary in loadgen.summarize_crud(samples, elapsed):
+            print(
+                f"  {summary['operation']:<7} {summary['ok_rps']:>10.2f} ok/s "
+                f"p99={summary['ok_p99_ms']} ms failed={summary['failed_statuses'] or 0}"
+            )
+            rows.append(
+                {
+                    "framework": framework,
+                    "concurrency": CRUD_CONCURRENCY,
+                    "mix": ",".join(f"{op}={weight:g}" for op, weight in CRUD_MIX.items()),
+                    **summary,
+                    "live_ids_left": live_ids,
+                }
+            )
+        recorder.save({"service": service}, rows)
+
+        stop_and_remove_service(service)
+        time.sleep(2)
+    return True
+
+
+def run_stats_pass(products, recorder):
+    """Compare the summary-backed and naive /products/stats as the table grows.
+
+    Returns False when the database could not be seeded.
+    """
+    for table_rows in STATS_ROWS:
+        cells = [{"rows": table_rows, "service": service} for service in STATS_SERVICES]
+        if not recorder.pending(cells, rows=table_rows):
+            continue
+        if not reset_database(products):
+            print("❌ Database seeding failed. Skipping the rest of the stats pass.")
+            return False
+        scale_products(table_rows)
+
+        for service in STATS_SERVICES:
+            framework = framework_name_map.get(service, service)
+            base_url = FRAMEWORKS.get(framework)
+            if not base_url:
+                print(f"⚠️ Skipping stats for {framework}: No base URL configured.")
+                continue
+            if recorder.done(rows=table_rows, service=service):
+                continue
+
+            print(f"\n📈 Stats: {service} ({table_rows} rows)")
+            start_service(service)
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            summary, naive = (
+                httpx.get(f"{base_url}/products/stats", params={"mode": mode}, timeout=60)
+                for mode in STATS_MODES
+            )
+            if summary.json() != naive.json():
+                print("  ⚠️ Summary and naive stats differ; the summary is out of date.")
+
+            rows = []
+            for mode in STATS_MODES:
+                print(f"  -> Running test: Stats ({mode})")
+                url = f"{base_url.rstrip('/')}/products/stats?mode={mode}"
+                parsed = parse_wrk_output(run_wrk(url, DURATION, CONCURRENCY, THREADS))
+                if parsed:
+                    rows.append(
+                        {
+                            "framework": framework,
+                            "mode": mode,
+                            "rows": table_rows,
+                            "requests_per_sec": parsed.get("requests_per_sec"),
+                            "avg_latency_ms": parsed.get("avg_latency_ms"),
+                            "latency_p50_ms": parsed.get("latency_p50_ms"),
+                            "latency_p99_ms": parsed.get("latency_p99_ms"),
+                            "non_2xx": parsed.get("non_2xx", 0),
+                        }
+                    )
+            recorder.save({"rows": table_rows, "service": service}, rows)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+    return True
+
+
+def write_csv(path, rows, fieldnames=None):
+    """Write rows to a CSV file, replacing it only once they are all on disk."""
+    staged = path.with_name(path.name + ".tmp")
+    with open(staged, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames or rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staged, path)
+
+
+def append_csv(path, rows):
+    """Append rows to a CSV file, under the header it already has if it exists.
+
+    Rows with columns the header lacks (say a resumed run with PG_STATS now
+    on) rewrite the file under the widened header rather than lose them.
+    """
+    if not rows:
+        return
+    header = None
+    if path.exists() and path.stat().st_size:
+        with open(path, newline="") as f:
+            header = next(csv.reader(f), None)
+    fields = list(header or [])
+    for row in rows:
+        fields.extend(key for key in row if key not in fields)
+    if header is not None and fields != header:
+        print(f"⚠️ Adding columns {', '.join(fields[len(header):])} to {path}")
+        write_csv(path, read_csv(path), fields)
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        if header is None:
             writer.writeheader()
-            writer.writerows(results)
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_csv(path):
+    if not path.exists():
+        return []
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def csv_number(value):
+    """A numeric cell, whether still a number or read back from a CSV; None if empty."""
+    return None if value in (None, "") else float(value)
+
+
+class RunManifest:
+    """Cells of a run that are done, one JSON object per line of MANIFEST_PATH.
+
+    A cell is a dict naming a unit of work, e.g. {"stage": "main",
+    "framework": ..., "server": ..., "test": ...} or {"stage": "soak"}.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if path.exists():
+            with open(path) as f:
+                self.done = {line.strip() for line in f if line.strip()}
+
+    @staticmethod
+    def key(cell):
+        return json.dumps(cell, sort_keys=True)
+
+    def __contains__(self, cell):
+        return self.key(cell) in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def mark_done(self, cell):
+        key = self.key(cell)
+        with open(self.path, "a") as f:
+            f.write(key + "\n")
+        self.done.add(key)
+
+
+class PassRecorder:
+    """Saves an optional pass's rows cell by cell, as the main sweep does.
+
+    A cell is one unit of the pass, e.g. a service under one profile, or one
+    of its test cases. Its rows are appended to the pass's CSV files (one
+    list of rows per file) and the cell is marked done in the manifest as
+    soon as it finishes, so an interrupted pass resumes at the next cell.
+    """
+
+    def __init__(self, name, paths, manifest):
+        self.name = name
+        self.paths = paths
+        self.manifest = manifest
+
+    def cell(self, fields):
+        return {"stage": self.name, **fields}
+
+    def pending(self, cells, **shared):
+        """The cells (dicts of fields) still to run, with a note if none are.
+
+        `shared` names what the cells have in common, for the note; without
+        it the cells are the whole pass.
+        """
+        cells = [fields for fields in cells if self.cell(fields) not in self.manifest]
+        if not cells:
+            label = ", ".join(f"{key}={value}" for key, value in shared.items())
+            what = f"{self.name} ({label})" if label else f"the {self.name} pass"
+            print(f"\n⏭️ Skipping {what}: done in the run being resumed.")
+        return cells
+
+    def done(self, **fields):
+        """True, with a note, when the run being resumed finished this cell."""
+        return not self.pending([fields], **fields)
+
+    def pending_cases(self, framework, **shared):
+        """The framework's TEST_CASES still to run, each a cell of `shared` plus its test."""
+        cases = framework_cases(framework)
+        cells = self.pending([{**shared, "test": case["name"]} for case in cases], **shared)
+        tests = {fields["test"] for fields in cells}
+        return [case for case in cases if case["name"] in tests]
+
+    def save(self, fields, *outputs):
+        """Append each output's rows to its file, then mark the cell done."""
+        for path, rows in zip(self.paths, outputs):
+            append_csv(path, rows)
+        self.manifest.mark_done(self.cell(fields))
+
+    def rows(self, output=0):
+        """Every row saved to an output, including the resumed run's, as strings."""
+        return read_csv(self.paths[output])
+
+    def rewrite(self, rows, output=0):
+        """Replace an output with `rows`, e.g. after adding columns computed across cells."""
+        write_csv(self.paths[output], rows)
+
+
+def print_matrix_summary(results):
+    """Print mean throughput per worker and per core for each server config."""
+    groups = {}
+    for row in results:
+        key = (
+            row["framework"],
+            row["server"],
+            row["worker_class"],
+            row["workers"],
+            row["threads"],
+        )
+        groups.setdefault(key, []).append(row)
+
+    print("\n📊 Server matrix (mean over test cases):")
+    for key, rows in sorted(groups.items()):
+        framework, server, worker_class, workers, threads = key
+        # Rows read back from the CSV hold strings
+        per_worker = sum(float(r["rps_per_worker"]) for r in rows) / len(rows)
+        per_core = sum(float(r["rps_per_core"]) for r in rows) / len(rows)
+        print(
+            f"  {framework:<24} {server:<9} {worker_class or '-':<30} "
+            f"workers={workers:<3} threads={threads:<3} "
+            f"rps/worker={per_worker:>10.2f} rps/core={per_core:>10.2f}"
+        )
+
+
+def optional_passes():
+    """The enabled optional passes in run order, as (name, runner, outputs).
+
+    `outputs` lists the (path, label) each of the runner's results is saved
+    to; a runner with several outputs returns one list of rows per output.
+    """
+    passes = [
+        (OVERLOAD, "overload", run_overload_pass, [(OVERLOAD_OUTPUT_PATH, "🚦 Overload")]),
+        (FORTUNE_PROBE, "fortune", run_fortune_probe, [(FORTUNE_OUTPUT_PATH, "📜 Fortune probe")]),
+        (EXPORT, "export", run_export_pass, [(EXPORT_OUTPUT_PATH, "📤 Export")]),
+        (SEARCH, "search", run_search_pass, [(SEARCH_OUTPUT_PATH, "🔎 Search")]),
+        (STATS, "stats", run_stats_pass, [(STATS_OUTPUT_PATH, "📈 Stats")]),
+        (
+            REVALIDATION,
+            "revalidation",
+            run_revalidation_pass,
+            [(REVALIDATION_OUTPUT_PATH, "🏷️ Revalidation")],
+        ),
+        (
+            COMPRESSION_BENCHMARK,
+            "compression",
+            run_compression_pass,
+            [(COMPRESSION_OUTPUT_PATH, "🗜️ Compression")],
+        ),
+        (JSON_BENCHMARK, "json", run_json_pass, [(JSON_OUTPUT_PATH, "🧾 JSON encoder")]),
+        (STORAGE, "storage", run_storage_pass, [(STORAGE_OUTPUT_PATH, "🗄️ Storage backend")]),
+        (PLANS, "plans", run_plan_pass, [(PLANS_OUTPUT_PATH, "🧭 Query plan")]),
+        (
+            SOAK,
+            "soak",
+            run_soak_pass,
+            [
+                (SOAK_OUTPUT_PATH, "⏳ Soak"),
+                (SOAK_TIMESERIES_OUTPUT_PATH, "⏳ Soak time series"),
+                (SOAK_MEMORY_OUTPUT_PATH, "⏳ Soak memory"),
+            ],
+        ),
+        (GC_PROFILE, "gc", run_gc_profile_pass, [(GC_PROFILE_OUTPUT_PATH, "♻️ GC profile")]),
+        (RESOURCES, "resources", run_resource_pass, [(RESOURCES_OUTPUT_PATH, "🧮 Resource profile")]),
+        (CHURN, "churn", run_churn_pass, [(CHURN_OUTPUT_PATH, "🔌 Connection churn")]),
+        (H2, "h2", run_h2_pass, [(H2_OUTPUT_PATH, "🔀 HTTP/2")]),
+        (
+            REPLICA,
+            "replica",
+            run_replica_pass,
+            [
+                (REPLICA_OUTPUT_PATH, "🪞 Read replica"),
+                (REPLICA_MIXED_OUTPUT_PATH, "🪞 Replica lag"),
+            ],
+        ),
+        (CRUD, "crud", run_crud_pass, [(CRUD_OUTPUT_PATH, "🔁 CRUD lifecycle")]),
+        (
+            PYTHON_MATRIX,
+            "python",
+            run_python_matrix_pass,
+            [(PYTHON_MATRIX_OUTPUT_PATH, "🐍 Interpreter matrix")],
+        ),
+        (
+            COLD_START,
+            "cold_start",
+            run_cold_start_pass,
+            [
+                (COLD_START_OUTPUT_PATH, "🧊 Cold start"),
+                (IMPORT_TIME_OUTPUT_PATH, "🧊 Import time profile"),
+            ],
+        ),
+    ]
+    return [(name, run_pass, outputs) for enabled, name, run_pass, outputs in passes if enabled]
+
+
+def run_main_sweep(products, manifest):
+    """Run TEST_CASES on every service and server config, saving each row as it comes.
+
+    Returns False when the database could not be seeded.
+    """
+    pg_statements = []
+    for service in FRAMEWORK_SERVICES:
+        framework = framework_name_map.get(service, service.capitalize())
+        base_url = FRAMEWORKS.get(framework)
+
+        if not base_url:
+            print(f"⚠️ Skipping {framework}: No base URL configured.")
+            continue
+
+        for server_env in server_configs(service):
+            server = describe_server(service, server_env)
+            label = (
+                f"{service} ({server['server']} {server['worker_class']} "
+                f"workers={server['workers']} threads={server['threads']})"
+            )
+            cell = {"stage": "main", "framework": framework, "server": server_env}
+            cases = [
+                case
+                for case in framework_cases(framework)
+                if {**cell, "test": case["name"]} not in manifest
+            ]
+            if not cases:
+                print(f"\n⏭️ Skipping {label}: done in the run being resumed.")
+                continue
+
+            print(f"\n📦 Benchmarking Service: {label}")
+            if not reset_database(products):
+                print("❌ Database seeding failed. Aborting benchmarks.")
+                return False
+            start_service(service, server_env)
+
+            if not wait_for_service_ready(base_url):
+                print(f"⚠️ Skipping {framework} because it failed the health check.")
+                stop_and_remove_service(service)
+                continue
+
+            def save(row):
+                append_csv(OUTPUT_PATH, [row])
+                append_csv(PG_STATS_OUTPUT_PATH, pg_statements)
+                pg_statements.clear()
+                manifest.mark_done({**cell, "test": row["test"]})
+
+            run_test_cases(framework, base_url, server, pg_statements, cases=cases, on_result=save)
+
+            stop_and_remove_service(service)
+            time.sleep(2)
+    return True
+
+
+def main():
+    products = [dict(p) for p in csv.DictReader(open(DATA_PATH))]
+    manifest = RunManifest(MANIFEST_PATH)
+
+    if ARGS.resume:
+        print(f"--- Resuming Benchmark {OUTPUT_PATH} ({len(manifest)} cells done) ---")
+    else:
+        print("--- Starting Benchmark ---")
+
+    try:
+        if not run_main_sweep(products, manifest):
+            docker.compose.down(remove_orphans=True)
+            return
+
+        for name, run_pass, outputs in optional_passes():
+            if {"stage": name} in manifest:
+                print(f"\n⏭️ Skipping the {name} pass: done in the run being resumed.")
+                continue
+            recorder = PassRecorder(name, [path for path, _ in outputs], manifest)
+            # Cells are saved as they finish; the stage is done once they all are.
+            if run_pass(products, recorder):
+                manifest.mark_done({"stage": name})
+            for path, label in outputs:
+                if path.exists():
+                    print(f"{label} results saved to: {path}")
+    except KeyboardInterrupt:
+        print(f"\n🛑 Interrupted. Continue with: benchmark_wrk.py --resume {OUTPUT_PATH}")
+        raise
+    finally:
+        # Stop all containers at the end
+        stop_and_remove_all_services()
 
+    if SERVER_MATRIX:
+        print_matrix_summary(read_csv(OUTPUT_PATH))
+    if PG_STATS:
+        print(f"🐘 Postgres statement stats saved to: {PG_STATS_OUTPUT_PATH}")
     print(f"\n✅ Benchmarking complete. Results saved to: {OUTPUT_PATH}")
 
 
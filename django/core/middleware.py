@@ -0,0 +1,124 @@
+import gzip
+import re
+
+import brotli
+import zstandard
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponseBadRequest
+from django.utils.cache import patch_vary_headers
+
+from .routers import read_db
+
+COMPRESSORS = {
+    "gzip": lambda body, level: gzip.compress(body, compresslevel=level, mtime=0),
+    "br": lambda body, level: brotli.compress(body, quality=level),
+    "zstd": lambda body, level: zstandard.ZstdCompressor(level=level).compress(body),
+}
+# Levels suited to compressing on the fly; brotli's own default (11) is
+# meant for static assets.
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+
+def negotiate_encoding(accept_encoding):
+    """First encoding of settings.COMPRESSION that Accept-Encoding allows (q > 0)."""
+    weights = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        try:
+            q = float(params.strip().removeprefix("q=")) if params else 1.0
+        except ValueError:
+            q = 0.0
+        weights[name.strip().lower()] = q
+    for encoding in settings.COMPRESSION:
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    level = settings.COMPRESSION_LEVEL or DEFAULT_COMPRESSION_LEVELS[encoding]
+    return COMPRESSORS[encoding](body, level)
+
+
+class CompressionMiddleware:
+    """django.middleware.gzip.GZipMiddleware, negotiating gzip, br or zstd.
+
+    Streaming responses (fortune streaming, export) are sent as they are.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        response.content = compress(response.content, encoding)
+        response.headers["Content-Length"] = str(len(response.content))
+        response.headers["Content-Encoding"] = encoding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            # A strong ETag names the uncompressed bytes.
+            response.headers["ETag"] = "W/" + etag
+        return response
+
+
+# A WAL position as pg_current_wal_lsn() prints it, e.g. 0/16B3748
+LSN_PATTERN = re.compile(r"[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}")
+# Views ReadReplicaMiddleware sends to the replica on GET
+READ_VIEWS = {"product_detail", "product_list_create", "fortune_100"}
+
+
+def replica_caught_up(min_lsn):
+    """Whether the replica has replayed the WAL up to min_lsn."""
+    with connections["replica"].cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_last_wal_replay_lsn() >= CAST(CAST(%s AS text) AS pg_lsn)",
+            [min_lsn],
+        )
+        return bool(cursor.fetchone()[0])
+
+
+class ReadReplicaMiddleware:
+    """Routes GET on READ_VIEWS to the "replica" database.
+
+    Successful writes return the primary's WAL position as X-Write-LSN. A
+    read that sends it back as X-Min-LSN is served by the primary until the
+    replica has replayed that far (read-your-writes). X-DB-Role names the
+    database a read went to.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Reset on every request: the variable outlives a response whose
+        # body is streamed after this returns (streaming fortune).
+        read_db.set("default")
+        response = self.get_response(request)
+        role = getattr(request, "db_role", None)
+        if role:
+            response.headers["X-DB-Role"] = role
+        elif request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+            with connections["default"].cursor() as cursor:
+                cursor.execute("SELECT pg_current_wal_lsn()::text")
+                response.headers["X-Write-LSN"] = cursor.fetchone()[0]
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method != "GET" or request.resolver_match.url_name not in READ_VIEWS:
+            return None
+        min_lsn = request.headers.get("X-Min-LSN")
+        if min_lsn and not LSN_PATTERN.fullmatch(min_lsn):
+            return HttpResponseBadRequest("X-Min-LSN must be a WAL position such as 0/16B3748")
+        request.db_role = "replica" if not min_lsn or replica_caught_up(min_lsn) else "primary"
+        read_db.set("replica" if request.db_role == "replica" else "default")
+        return None
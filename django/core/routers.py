@@ -0,0 +1,22 @@
+from contextvars import ContextVar
+
+# Database the current request reads from; set per request by
+# core.middleware.ReadReplicaMiddleware.
+read_db = ContextVar("read_db", default="default")
+
+
+class ReplicaRouter:
+    """Sends reads to read_db and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return read_db.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
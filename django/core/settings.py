@@ -133,3 +133,68 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Serve GET /products from a values() query instead of the DRF
+# ModelSerializer. Enabled by the lean profile (core.settings_lean).
+PRODUCTS_FAST_LIST = False
+
+# /fortune rendering: "buffered" renders the whole page at once, "streaming"
+# renders it batch by batch from a server-side cursor.
+FORTUNE_MODE = os.getenv("FORTUNE_MODE", "buffered")
+# Rows fetched per round trip from the server-side cursor
+FORTUNE_BATCH_SIZE = int(os.getenv("FORTUNE_BATCH_SIZE", "100"))
+
+# Rows fetched per round trip from the server-side cursor by /products/export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Most products accepted by POST /products/bulk or looked up by GET /products?ids=
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+# postgres: every product endpoint queries the database. memory: the CRUD,
+# list and fortune endpoints serve products held in process memory
+# (products.storage.MemoryProductStore) instead, to measure the framework on
+# its own.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres")
+# Seed data for STORAGE_BACKEND=memory (compose mounts ./data at /data)
+PRODUCTS_CSV = os.getenv("PRODUCTS_CSV", BASE_DIR.parent / "data" / "products.csv")
+
+# Encoder behind every JSON response (products.renderers): stdlib, ujson,
+# orjson or msgspec
+JSON_ENCODER = os.getenv("JSON_ENCODER", "stdlib")
+# Largest payload GET /json?size=&depth= builds
+JSON_MAX_SIZE = 100_000
+JSON_MAX_DEPTH = 64
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "products.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Response compression (core.middleware.CompressionMiddleware): content
+# codings offered, most preferred first (any of gzip, br, zstd); empty
+# disables it.
+COMPRESSION = [e.strip() for e in os.getenv("COMPRESSION", "").split(",") if e.strip()]
+# Bodies shorter than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Codec level; 0 uses each codec's default (see core.middleware)
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "0"))
+if COMPRESSION:
+    # Outermost, so it sees the final body (like GZipMiddleware)
+    MIDDLEWARE.insert(0, "core.middleware.CompressionMiddleware")
+
+# Read/write splitting: with POSTGRES_REPLICA_HOST set, GET on the product
+# detail, list and fortune endpoints reads from this streaming replica
+# (core.routers.ReplicaRouter) and writes stay on "default". A read sending
+# X-Min-LSN falls back to the primary until the replica has replayed it
+# (core.middleware.ReadReplicaMiddleware).
+if os.getenv("POSTGRES_REPLICA_HOST") and STORAGE_BACKEND == "postgres":
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("POSTGRES_REPLICA_HOST"),
+        "PORT": os.getenv("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+    MIDDLEWARE.append("core.middleware.ReadReplicaMiddleware")
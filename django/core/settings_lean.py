@@ -0,0 +1,54 @@
+"""
+Lean API profile for the benchmark.
+
+Select it with ``DJANGO_SETTINGS_MODULE=core.settings_lean``. It keeps the
+database and app configuration from ``core.settings`` but drops everything the
+JSON endpoints never use: admin, sessions, messages, CSRF, auth and
+clickjacking middleware, the browsable API renderer and DEBUG query logging.
+
+``DJANGO_FAST_LIST`` (default ``true``) additionally switches GET /products to
+the values()-based list path, so middleware and serializer cost can be
+benchmarked separately.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+INSTALLED_APPS = [
+    "django.contrib.contenttypes",
+    "django.contrib.auth",
+    "products",  # Custom app for product management
+    "rest_framework",  # Django REST framework for API support
+]
+
+MIDDLEWARE = [
+    "django.middleware.common.CommonMiddleware",
+]
+if COMPRESSION:  # noqa: F405
+    MIDDLEWARE.insert(0, "core.middleware.CompressionMiddleware")
+if "replica" in DATABASES:  # noqa: F405
+    MIDDLEWARE.append("core.middleware.ReadReplicaMiddleware")
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [],
+        },
+    },
+]
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": ["products.renderers.JSONRenderer"],
+    "DEFAULT_PARSER_CLASSES": ["rest_framework.parsers.JSONParser"],
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PERMISSION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+}
+
+PRODUCTS_FAST_LIST = os.getenv("DJANGO_FAST_LIST", "true").lower() == "true"
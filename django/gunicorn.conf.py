@@ -0,0 +1,54 @@
+"""
+Gunicorn settings for the benchmark container.
+
+Everything is read from the environment so the harness can sweep worker
+models without rebuilding the image:
+
+- WEB_WORKERS: number of worker processes (default 1)
+- WORKER_CLASS: sync, gthread or gevent (default sync)
+- WORKER_THREADS: threads per gthread worker (default 1)
+- WORKER_CONNECTIONS: max concurrent clients per gevent worker (default 1000)
+- GUNICORN_PRELOAD: import the app once in the master and fork the workers
+  from it (default false)
+- GC_FREEZE: with GUNICORN_PRELOAD, gc.freeze() the master's objects before
+  each fork so the workers' collections never touch (and copy) their pages
+  (default false)
+- GC_THRESHOLD: gc.set_threshold() for the workers, e.g. "50000,20,20"
+  (default: Python's 700,10,10)
+"""
+
+import gc
+import os
+
+bind = "0.0.0.0:8002"
+workers = int(os.getenv("WEB_WORKERS", "1"))
+worker_class = os.getenv("WORKER_CLASS", "sync")
+threads = int(os.getenv("WORKER_THREADS", "1"))
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "1000"))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+GC_FREEZE = preload_app and os.getenv("GC_FREEZE", "false").lower() == "true"
+GC_THRESHOLD = [int(n) for n in os.getenv("GC_THRESHOLD", "").split(",") if n.strip()]
+
+if GC_FREEZE:
+    # No collection may run in the master between the app import and the
+    # fork: it would dirty the pages the workers are meant to share.
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if GC_FREEZE:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if GC_FREEZE:
+        gc.enable()
+    if GC_THRESHOLD:
+        gc.set_threshold(*GC_THRESHOLD)
+    # psycopg2 is a C extension that gevent's monkey patching cannot reach;
+    # without this every gevent worker would serialize its queries.
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
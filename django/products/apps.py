@@ -1,6 +1,14 @@
+import gc
+
 from django.apps import AppConfig
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from .metrics import record_gc_pause
+
+        if record_gc_pause not in gc.callbacks:
+            gc.callbacks.append(record_gc_pause)
@@ -0,0 +1,66 @@
+import gc
+import os
+import threading
+import time
+
+
+class Histogram:
+    """Cumulative histogram rendered in the Prometheus text format."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+            self.total += 1
+            self.sum += value
+
+    def samples(self, name, labels=""):
+        """Bucket, sum and count lines, each carrying `labels` (e.g. 'generation="0"')."""
+        prefix = f"{labels}," if labels else ""
+        suffix = f"{{{labels}}}" if labels else ""
+        lines = [
+            f'{name}_bucket{{{prefix}le="{bound}"}} {count}'
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.total}')
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.total}")
+        return lines
+
+
+# gc.callbacks brackets every collection: its duration is a stop-the-world
+# pause for whatever requests the process is serving. The callback is
+# installed by ProductsConfig.ready(), so a preloading master has it too.
+GC_PAUSE_MS = [Histogram((0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)) for _ in range(3)]
+gc_started = None
+
+
+def record_gc_pause(phase, info):
+    global gc_started
+    if phase == "start":
+        gc_started = time.perf_counter()
+    elif gc_started is not None:
+        GC_PAUSE_MS[info["generation"]].observe((time.perf_counter() - gc_started) * 1000)
+        gc_started = None
+
+
+def gc_metrics():
+    """GC pause histograms per generation; each worker reports its own."""
+    lines = ["# TYPE app_gc_pause_ms histogram"]
+    for generation, histogram in enumerate(GC_PAUSE_MS):
+        lines.extend(histogram.samples("app_gc_pause_ms", f'generation="{generation}"'))
+    lines += [
+        "# TYPE app_gc_frozen_objects gauge",
+        f"app_gc_frozen_objects {gc.get_freeze_count()}",
+        "# TYPE app_worker_pid gauge",
+        f"app_worker_pid {os.getpid()}",
+    ]
+    return lines
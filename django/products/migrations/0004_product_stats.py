@@ -0,0 +1,162 @@
+# Generated by Django 5.2.4 on 2026-10-18 22:51
+
+from django.db import migrations, models
+
+# Same SQL as PRODUCT_STATS_SQL in benchmark_wrk.py, which installs it on
+# databases seeded by the harness.
+PRODUCT_STATS_SQL = """
+DO $$
+BEGIN
+    -- UNIQUE NULLS NOT DISTINCT below is new in PostgreSQL 15.
+    IF current_setting('server_version_num')::int < 150000 THEN
+        RAISE EXCEPTION 'product_stats needs PostgreSQL 15 or later, found %',
+            current_setting('server_version');
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS product_stats (
+    category TEXT,
+    availability TEXT,
+    product_count BIGINT NOT NULL,
+    total_stock BIGINT NOT NULL,
+    price_count BIGINT NOT NULL,
+    price_sum NUMERIC NOT NULL,
+    min_price NUMERIC,
+    max_price NUMERIC,
+    UNIQUE NULLS NOT DISTINCT (category, availability)
+);
+
+CREATE OR REPLACE FUNCTION product_stats_add() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Groups are upserted in a fixed order so concurrent statements lock
+    -- summary rows in the same order.
+    INSERT INTO product_stats AS s
+    SELECT category, availability, count(*), coalesce(sum(stock), 0),
+           count(price), coalesce(sum(price), 0), min(price), max(price)
+    FROM new_rows
+    GROUP BY category, availability
+    ORDER BY category, availability
+    ON CONFLICT (category, availability) DO UPDATE SET
+        product_count = s.product_count + EXCLUDED.product_count,
+        total_stock = s.total_stock + EXCLUDED.total_stock,
+        price_count = s.price_count + EXCLUDED.price_count,
+        price_sum = s.price_sum + EXCLUDED.price_sum,
+        min_price = least(s.min_price, EXCLUDED.min_price),
+        max_price = greatest(s.max_price, EXCLUDED.max_price);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION product_stats_remove() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- A removed row holding a group's min/max price sets it to NULL, and
+    -- only those extremes are recomputed from product.
+    UPDATE product_stats s SET
+        product_count = s.product_count - r.product_count,
+        total_stock = s.total_stock - r.total_stock,
+        price_count = s.price_count - r.price_count,
+        price_sum = s.price_sum - r.price_sum,
+        min_price = CASE WHEN r.min_price <= s.min_price THEN NULL ELSE s.min_price END,
+        max_price = CASE WHEN r.max_price >= s.max_price THEN NULL ELSE s.max_price END
+    FROM (
+        SELECT category, availability, count(*) AS product_count,
+               coalesce(sum(stock), 0) AS total_stock,
+               count(price) AS price_count,
+               coalesce(sum(price), 0) AS price_sum,
+               min(price) AS min_price, max(price) AS max_price
+        FROM old_rows
+        GROUP BY category, availability
+    ) r
+    WHERE s.category IS NOT DISTINCT FROM r.category
+      AND s.availability IS NOT DISTINCT FROM r.availability;
+
+    DELETE FROM product_stats WHERE product_count = 0;
+
+    UPDATE product_stats s SET
+        min_price = coalesce(s.min_price, e.min_price),
+        max_price = coalesce(s.max_price, e.max_price)
+    FROM product_stats g
+    CROSS JOIN LATERAL (
+        SELECT min(p.price) AS min_price, max(p.price) AS max_price
+        FROM product p
+        WHERE (p.category = g.category OR (p.category IS NULL AND g.category IS NULL))
+          AND (p.availability = g.availability
+               OR (p.availability IS NULL AND g.availability IS NULL))
+    ) e
+    WHERE (g.min_price IS NULL OR g.max_price IS NULL)
+      AND s.category IS NOT DISTINCT FROM g.category
+      AND s.availability IS NOT DISTINCT FROM g.availability;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION product_stats_clear() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE product_stats;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE TRIGGER product_stats_insert AFTER INSERT ON product
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_add();
+CREATE OR REPLACE TRIGGER product_stats_update_old AFTER UPDATE ON product
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_remove();
+CREATE OR REPLACE TRIGGER product_stats_update_new AFTER UPDATE ON product
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_add();
+CREATE OR REPLACE TRIGGER product_stats_delete AFTER DELETE ON product
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_remove();
+CREATE OR REPLACE TRIGGER product_stats_truncate AFTER TRUNCATE ON product
+    FOR EACH STATEMENT EXECUTE FUNCTION product_stats_clear();
+
+TRUNCATE product_stats;
+INSERT INTO product_stats
+SELECT category, availability, count(*), coalesce(sum(stock), 0),
+       count(price), coalesce(sum(price), 0), min(price), max(price)
+FROM product
+GROUP BY category, availability;
+"""
+
+DROP_PRODUCT_STATS_SQL = """
+DROP TRIGGER IF EXISTS product_stats_insert ON product;
+DROP TRIGGER IF EXISTS product_stats_update_old ON product;
+DROP TRIGGER IF EXISTS product_stats_update_new ON product;
+DROP TRIGGER IF EXISTS product_stats_delete ON product;
+DROP TRIGGER IF EXISTS product_stats_truncate ON product;
+DROP FUNCTION IF EXISTS product_stats_add();
+DROP FUNCTION IF EXISTS product_stats_remove();
+DROP FUNCTION IF EXISTS product_stats_clear();
+DROP TABLE IF EXISTS product_stats;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('pk', models.CompositePrimaryKey('category', 'availability', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('category', models.CharField(max_length=255)),
+                ('availability', models.CharField(max_length=32)),
+                ('product_count', models.BigIntegerField()),
+                ('total_stock', models.BigIntegerField()),
+                ('price_count', models.BigIntegerField()),
+                ('price_sum', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=12, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=12, null=True)),
+            ],
+            options={
+                'db_table': 'product_stats',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(PRODUCT_STATS_SQL, DROP_PRODUCT_STATS_SQL),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:10
+
+from django.db import migrations, models
+
+# Same SQL as PRODUCT_VERSION_SQL in benchmark_wrk.py, which installs it on
+# databases seeded by the harness.
+PRODUCT_VERSION_SQL = """
+CREATE OR REPLACE FUNCTION product_bump_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE TRIGGER product_version BEFORE UPDATE ON product
+    FOR EACH ROW EXECUTE FUNCTION product_bump_version();
+"""
+
+DROP_PRODUCT_VERSION_SQL = """
+DROP TRIGGER IF EXISTS product_version ON product;
+DROP FUNCTION IF EXISTS product_bump_version();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='version',
+            field=models.IntegerField(db_default=1, editable=False),
+        ),
+        migrations.RunSQL(PRODUCT_VERSION_SQL, DROP_PRODUCT_VERSION_SQL),
+    ]
@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 # Create your models here.
 
@@ -16,6 +18,9 @@ class Product(models.Model):
     size = models.CharField(max_length=64)
     availability = models.CharField(max_length=32)
     internal_id = models.CharField(max_length=64)
+    # Bumped by the product_version trigger on every UPDATE (migration
+    # 0005_product_version); the ETag of the product views is derived from it.
+    version = models.IntegerField(db_default=1, editable=False)
 
     def __str__(self):
         return self.name
@@ -25,3 +30,46 @@ class Product(models.Model):
         verbose_name_plural = "Products"
         ordering = ["name"]
         db_table = "product"
+        indexes = [
+            # Backs the default ordering so list/fortune queries read the index
+            # instead of sorting the whole table.
+            models.Index(fields=["name"], name="product_name_idx"),
+            # /products/search filters; the seeder creates the same indexes.
+            models.Index(fields=["category"], name="product_category_idx"),
+            models.Index(fields=["brand"], name="product_brand_idx"),
+            models.Index(fields=["availability"], name="product_availability_idx"),
+            models.Index(fields=["price"], name="product_price_idx"),
+            # name__startswith (LIKE 'x%') regardless of the database collation
+            models.Index(
+                fields=["name"],
+                name="product_name_prefix_idx",
+                opclasses=["text_pattern_ops"],
+            ),
+            # name__icontains is UPPER(name) LIKE UPPER('%x%'); needs pg_trgm.
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="product_name_trgm_idx",
+            ),
+        ]
+
+
+class ProductStats(models.Model):
+    """Per (category, availability) aggregates of Product.
+
+    Kept current by statement-level triggers on the product table (see
+    migration 0004_product_stats), so Django never writes to it.
+    """
+
+    pk = models.CompositePrimaryKey("category", "availability")
+    category = models.CharField(max_length=255)
+    availability = models.CharField(max_length=32)
+    product_count = models.BigIntegerField()
+    total_stock = models.BigIntegerField()
+    price_count = models.BigIntegerField()
+    price_sum = models.DecimalField(max_digits=20, decimal_places=2)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+
+    class Meta:
+        managed = False
+        db_table = "product_stats"
@@ -0,0 +1,45 @@
+import json
+
+import msgspec
+import orjson
+import ujson
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+# Types the encoders do not know natively (Decimal, dates, ...) are handled
+# as DRF's own encoder handles them.
+json_default = JSONEncoder().default
+
+
+def msgspec_default(obj):
+    # msgspec hands str subclasses (DRF's ErrorDetail) to the hook as well.
+    if isinstance(obj, str):
+        return str(obj)
+    return json_default(obj)
+
+
+JSON_ENCODERS = {
+    "stdlib": lambda data: json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")
+    ).encode(),
+    "ujson": lambda data: ujson.dumps(
+        data, default=json_default, ensure_ascii=False, escape_forward_slashes=False
+    ).encode(),
+    "orjson": lambda data: orjson.dumps(data, default=json_default),
+    # msgspec would write Decimals as strings; DRF writes them as numbers
+    # (msgspec keeps the Decimal digits: 41 where DRF writes 41.0).
+    "msgspec": msgspec.json.Encoder(
+        enc_hook=msgspec_default, decimal_format="number"
+    ).encode,
+}
+dumps = JSON_ENCODERS[settings.JSON_ENCODER]
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """DRF's JSONRenderer with output from the settings.JSON_ENCODER backend."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return dumps(data)
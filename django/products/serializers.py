@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Product
 
@@ -20,3 +21,26 @@ class ProductSerializer(serializers.ModelSerializer):
             "availability",
             "internal_id",
         ]
+
+
+class ProductSearchSerializer(serializers.Serializer):
+    """Query parameters accepted by /products/search."""
+
+    category = serializers.CharField(required=False)
+    brand = serializers.CharField(required=False)
+    availability = serializers.CharField(required=False)
+    min_price = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    prefix = serializers.CharField(required=False)
+    q = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=0, default=100)
+    offset = serializers.IntegerField(min_value=0, default=0)
+
+
+class JSONPayloadSerializer(serializers.Serializer):
+    """Query parameters accepted by /json?size=&depth=."""
+
+    size = serializers.IntegerField(min_value=0, max_value=settings.JSON_MAX_SIZE)
+    depth = serializers.IntegerField(
+        min_value=1, max_value=settings.JSON_MAX_DEPTH, default=1
+    )
@@ -0,0 +1,94 @@
+import bisect
+import csv
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.exceptions import APIException
+
+from .models import Product
+
+
+class MemoryProductStore:
+    """Products held in process memory, for STORAGE_BACKEND=memory.
+
+    Loaded from PRODUCTS_CSV with the ids the seeder gives them (file order,
+    from 1) and kept per worker process, so writes are not shared between
+    workers. Products are unsaved Product instances, listed by name like
+    Product.Meta.ordering (in code point order, not the database collation),
+    and go through the same serializers as rows read from Postgres.
+    """
+
+    def __init__(self, path):
+        self.products = {}
+        # (name, id) of every product, sorted: the list order
+        self.order = []
+        self.last_id = 0
+        self.lock = threading.Lock()
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            del row["index"]
+            row["price"] = Decimal(row["price"])
+            row["stock"] = int(row["stock"])
+        self.create_many(rows)
+
+    def get(self, id):
+        return self.products.get(id)
+
+    def get_many(self, ids):
+        products = [self.products[id] for id in set(ids) if id in self.products]
+        return sorted(products, key=lambda p: (p.name, p.id))
+
+    def page(self, limit=None, offset=0):
+        stop = None if limit is None else offset + limit
+        with self.lock:
+            return [self.products[id] for _, id in self.order[offset:stop]]
+
+    def create_many(self, items):
+        created = []
+        with self.lock:
+            for data in items:
+                self.last_id += 1
+                product = Product(pk=self.last_id, version=1, **data)
+                self.products[product.pk] = product
+                bisect.insort(self.order, (product.name, product.pk))
+                created.append(product)
+        return created
+
+    def update(self, id, data):
+        with self.lock:
+            product = self.products.get(id)
+            if product is not None:
+                self.order.remove((product.name, id))
+                for field, value in data.items():
+                    setattr(product, field, value)
+                product.version += 1  # as the product_version trigger does
+                bisect.insort(self.order, (product.name, id))
+        return product
+
+    def delete(self, id):
+        with self.lock:
+            product = self.products.pop(id, None)
+            if product is not None:
+                self.order.remove((product.name, id))
+        return product
+
+
+class StorageNotSupported(APIException):
+    status_code = 501
+    default_detail = "Not available with STORAGE_BACKEND=memory."
+    default_code = "not_implemented"
+
+
+def require_postgres():
+    """Search, stats and export have no in-memory implementation."""
+    if memory_store:
+        raise StorageNotSupported()
+
+
+memory_store = (
+    MemoryProductStore(settings.PRODUCTS_CSV)
+    if settings.STORAGE_BACKEND == "memory"
+    else None
+)
@@ -1,3 +1,199 @@
+import csv
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.db.models import Count, Max, Min, Sum
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Product, ProductStats
+from .serializers import ProductSerializer
+from .storage import MemoryProductStore
+
+
+def make_product(**fields):
+    return Product(
+        **{
+            "name": "Product",
+            "description": "A product",
+            "brand": "Brand",
+            "category": "Books",
+            "price": Decimal("10.00"),
+            "currency": "USD",
+            "stock": 5,
+            "ean": "0000000000000",
+            "color": "Red",
+            "size": "M",
+            "availability": "in_stock",
+            "internal_id": "1",
+            **fields,
+        }
+    )
+
+
+class ProductStatsTests(TestCase):
+    """product_stats (kept by the triggers of migration 0004) against a GROUP BY."""
+
+    def assertStatsMatchProducts(self):
+        expected = list(
+            Product.objects.order_by()
+            .values("category", "availability")
+            .annotate(
+                product_count=Count("*"),
+                total_stock=Sum("stock"),
+                price_count=Count("price"),
+                price_sum=Sum("price"),
+                min_price=Min("price"),
+                max_price=Max("price"),
+            )
+            .order_by("category", "availability")
+        )
+        stats = list(
+            ProductStats.objects.values(
+                "category",
+                "availability",
+                "product_count",
+                "total_stock",
+                "price_count",
+                "price_sum",
+                "min_price",
+                "max_price",
+            ).order_by("category", "availability")
+        )
+        self.assertEqual(stats, expected)
+
+    def test_starts_empty(self):
+        self.assertFalse(ProductStats.objects.exists())
+        self.assertStatsMatchProducts()
+
+    def test_create(self):
+        make_product().save()
+        make_product(price=Decimal("4.50"), stock=2).save()
+        self.assertStatsMatchProducts()
+
+    def test_bulk_create(self):
+        Product.objects.bulk_create(
+            make_product(category=category, price=Decimal(price), stock=stock)
+            for category, price, stock in [
+                ("Books", "10.00", 1),
+                ("Books", "30.00", 2),
+                ("Games", "20.00", 3),
+            ]
+        )
+        make_product(category="Games", availability="out_of_stock").save()
+        self.assertStatsMatchProducts()
+
+    def test_update_price_and_category(self):
+        cheap, dear, other = Product.objects.bulk_create(
+            [
+                make_product(price=Decimal("1.00")),
+                make_product(price=Decimal("99.00")),
+                make_product(price=Decimal("50.00")),
+            ]
+        )
+        # Moves the group's max price out of Books, which is then recomputed
+        Product.objects.filter(pk=dear.pk).update(category="Games")
+        self.assertStatsMatchProducts()
+        # Raises the group's min price in place
+        Product.objects.filter(pk=cheap.pk).update(price=Decimal("75.00"), stock=9)
+        self.assertStatsMatchProducts()
+        other.availability = "out_of_stock"
+        other.save()
+        self.assertStatsMatchProducts()
+
+    def test_delete(self):
+        low, high, _ = Product.objects.bulk_create(
+            [
+                make_product(price=Decimal("1.00")),
+                make_product(price=Decimal("9.00")),
+                make_product(category="Games"),
+            ]
+        )
+        low.delete()
+        self.assertStatsMatchProducts()
+        Product.objects.filter(pk=high.pk).delete()
+        self.assertStatsMatchProducts()
+        Product.objects.all().delete()
+        self.assertStatsMatchProducts()
+        self.assertFalse(ProductStats.objects.exists())
+
+
+class MemoryProductStoreTests(TestCase):
+    """The views answer the same with STORAGE_BACKEND=memory as with Postgres.
+
+    The store is loaded from a CSV and the database seeded with the same
+    products under the same ids; every request of a script of reads and
+    writes must then get the same status, body and ETag from both.
+    """
+
+    # Distinct names whose code point order matches the database collation
+    NAMES = ["Delta", "Alpha", "Echo", "Charlie", "Bravo"]
+
+    def setUp(self):
+        products = [
+            make_product(id=id, name=name, price=Decimal(10 + id), stock=id)
+            for id, name in enumerate(self.NAMES, 1)
+        ]
+        fields = [field for field in ProductSerializer.Meta.fields if field != "id"]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "products.csv"
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["index", *fields])
+            for product in products:
+                writer.writerow([product.id, *(getattr(product, field) for field in fields)])
+        self.store = MemoryProductStore(path)
+        Product.objects.bulk_create(products)
+
+    def run_script(self, steps):
+        responses = []
+        for method, path, data in steps:
+            response = getattr(self.client, method)(
+                path, data, content_type="application/json"
+            )
+            responses.append(
+                (method, path, response.status_code, response.content, response.get("ETag"))
+            )
+        return responses
+
+    def assertSameResponses(self, steps):
+        # The database runs the script first; the store starts from the seed.
+        from_postgres = self.run_script(steps)
+        with mock.patch("products.views.memory_store", self.store):
+            from_memory = self.run_script(steps)
+        for postgres, memory in zip(from_postgres, from_memory):
+            self.assertEqual(memory, postgres)
+
+    def test_page(self):
+        self.assertSameResponses(
+            [
+                ("get", "/products", None),
+                ("get", "/products?ids=4,1,99,1", None),
+                ("get", "/products/4", None),
+            ]
+        )
+
+    def test_update_reorders_and_bumps_version(self):
+        self.assertSameResponses(
+            [
+                ("put", "/products/2", {"name": "Cobalt", "price": "1.50"}),
+                ("get", "/products", None),
+                ("get", "/products/2", None),
+                ("put", "/products/2", {"stock": 7}),
+                ("get", "/products/2", None),
+                ("get", "/products?ids=2,3", None),
+            ]
+        )
+
+    def test_delete(self):
+        self.assertSameResponses(
+            [
+                ("delete", "/products/3", None),
+                ("get", "/products", None),
+                ("get", "/products/3", None),
+                ("delete", "/products/3", None),
+                ("get", "/products?ids=1,3,5", None),
+            ]
+        )
@@ -2,6 +2,7 @@ from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
+    re_path("^metrics/?$", views.metrics, name="metrics"),
     re_path(f"plain-text/?$", views.plain_text, name="plain_text"),
     re_path("json/?$", views.json_echo, name="json_echo"),
     re_path(
@@ -9,6 +10,18 @@ urlpatterns = [
         views.ProductListCreateView.as_view(),
         name="product_list_create",
     ),
+    re_path(
+        "^products/stats/?$", views.ProductStatsView.as_view(), name="product_stats"
+    ),
+    re_path(
+        "^products/search/?$", views.ProductSearchView.as_view(), name="product_search"
+    ),
+    re_path("^products/export/?$", views.export, name="product_export"),
+    re_path(
+        "^products/bulk/?$",
+        views.ProductBulkCreateView.as_view(),
+        name="product_bulk_create",
+    ),
     re_path(
         "^products/(?P<pk>\d+)/?$",
         views.ProductRetrieveUpdateDestroyView.as_view(),
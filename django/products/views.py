@@ -1,14 +1,47 @@
+import csv
+import hashlib
+import io
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Sum
+from django.db.models.functions import Coalesce, NullIf, Round
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.template.loader import render_to_string
 from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound, ValidationError
 from django.shortcuts import get_object_or_404, render
-from .models import Product
-from .serializers import ProductSerializer
+from .metrics import gc_metrics
+from .models import Product, ProductStats
+from .renderers import dumps
+from .storage import memory_store, require_postgres
+from .serializers import (
+    JSONPayloadSerializer,
+    ProductSearchSerializer,
+    ProductSerializer,
+)
 
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
+
+
+# Prometheus metrics of the worker that serves the request
+def metrics(request):
+    return HttpResponse(
+        "\n".join(gc_metrics()) + "\n", content_type="text/plain; version=0.0.4"
+    )
 
 
 # PlainText endpoint
@@ -17,10 +50,63 @@ def plain_text(request):
     return Response("Hello, world!")
 
 
+@lru_cache(maxsize=32)
+def json_payload(size, depth):
+    """`size` records, each nesting `depth` levels of child records.
+
+    Cached, so GET /json?size=&depth= times the encoder, not the payload.
+    """
+
+    def record(i, level):
+        node = {
+            "id": i,
+            "name": f"item {i}",
+            "price": i * 0.25,
+            "active": i % 2 == 0,
+            "tags": ["alpha", "beta"],
+        }
+        if level < depth:
+            node["child"] = record(i, level + 1)
+        return node
+
+    return [record(i, 1) for i in range(size)]
+
+
 # JSON Echo endpoint
 @api_view(["GET"])
 def json_echo(request):
-    return Response({"message": "Hello, world from JSON serialization endpoint!"})
+    if "size" not in request.query_params:
+        return Response({"message": "Hello, world from JSON serialization endpoint!"})
+    params = JSONPayloadSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    payload = json_payload(params.validated_data["size"], params.validated_data["depth"])
+    # Encoded as is, without DRF's renderer selection
+    return HttpResponse(dumps(payload), content_type="application/json")
+
+
+# Conditional GET: ETags derived from Product.version
+def product_etag(id, version):
+    return f'"{id}-{version}"'
+
+
+def list_etag(versions):
+    """Strong ETag over the (id, version) pairs of a list, in list order."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for id, version in versions:
+        digest.update(f"{id}-{version},".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    # If-None-Match uses the weak comparison, so a W/ prefix is ignored.
+    tags = parse_etags(request.headers.get("If-None-Match", ""))
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response.headers["ETag"] = etag
+    return response
 
 
 # Product CRUD endpoints
@@ -28,18 +114,271 @@ class ProductListCreateView(generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        ids = self.request.query_params.get("ids")
+        if ids is None:
+            return memory_store.page() if memory_store else queryset
+        try:
+            ids = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            raise ValidationError({"ids": "Must be comma-separated integers."})
+        if len(ids) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({"ids": f"At most {settings.BULK_MAX_ITEMS} ids."})
+        if memory_store:
+            return memory_store.get_many(ids)
+        # PostgreSQL plans IN (...) as = ANY(ARRAY[...]): one index lookup pass.
+        return queryset.filter(id__in=ids)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if memory_store:
+            return self.list_memory(request, queryset)
+        if "If-None-Match" in request.headers:
+            # Revalidation reads (id, version) alone: an unchanged list is
+            # neither loaded in full nor serialized.
+            etag = list_etag(queryset.values_list("id", "version"))
+            if etag_matches(request, etag):
+                return not_modified(etag)
+        if not settings.PRODUCTS_FAST_LIST:
+            products = list(queryset)
+            response = Response(self.get_serializer(products, many=True).data)
+            response.headers["ETag"] = list_etag((p.id, p.version) for p in products)
+            return response
+        # Same payload as ProductSerializer, without per-field serialization:
+        # fetch plain dicts and format the price like DRF's DecimalField.
+        rows = list(queryset.values(*ProductSerializer.Meta.fields, "version"))
+        versions = []
+        for row in rows:
+            row["price"] = format(row["price"], ".2f")
+            versions.append((row["id"], row.pop("version")))
+        response = HttpResponse(dumps(rows), content_type="application/json")
+        response.headers["ETag"] = list_etag(versions)
+        return response
+
+    def list_memory(self, request, products):
+        etag = list_etag((p.id, p.version) for p in products)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        if not settings.PRODUCTS_FAST_LIST:
+            response = Response(self.get_serializer(products, many=True).data)
+        else:
+            fields = ProductSerializer.Meta.fields
+            rows = [{field: getattr(p, field) for field in fields} for p in products]
+            for row in rows:
+                row["price"] = format(row["price"], ".2f")
+            response = HttpResponse(dumps(rows), content_type="application/json")
+        response.headers["ETag"] = etag
+        return response
+
+    def perform_create(self, serializer):
+        if memory_store:
+            serializer.instance = memory_store.create_many([serializer.validated_data])[0]
+        else:
+            serializer.save()
+
+
+class ProductStatsView(APIView):
+    def get(self, request):
+        require_postgres()
+        mode = request.query_params.get("mode", "summary")
+        if mode == "naive":
+            # Full GROUP BY over product on every request, for comparison.
+            stats = Product.objects.values("category", "availability").annotate(
+                product_count=Count("id"),
+                total_stock=Coalesce(Sum("stock"), 0),
+                min_price=Min("price"),
+                avg_price=Round(Avg("price"), 2),
+                max_price=Max("price"),
+            )
+        elif mode == "summary":
+            stats = ProductStats.objects.values(
+                "category",
+                "availability",
+                "product_count",
+                "total_stock",
+                "min_price",
+                "max_price",
+            ).annotate(avg_price=Round(F("price_sum") / NullIf(F("price_count"), 0), 2))
+        else:
+            raise ValidationError({"mode": "Must be summary or naive."})
+        return Response(list(stats.order_by("category", "availability")))
+
+
+class ProductSearchView(generics.ListAPIView):
+    serializer_class = ProductSerializer
+    # Search parameter -> lookup; each lookup is backed by one of Meta.indexes.
+    lookups = {
+        "category": "category",
+        "brand": "brand",
+        "availability": "availability",
+        "min_price": "price__gte",
+        "max_price": "price__lte",
+        "prefix": "name__startswith",
+        "q": "name__icontains",
+    }
+
+    def get_queryset(self):
+        require_postgres()
+        params = ProductSearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = {
+            lookup: params.validated_data[field]
+            for field, lookup in self.lookups.items()
+            if field in params.validated_data
+        }
+        offset = params.validated_data["offset"]
+        limit = params.validated_data["limit"]
+        return Product.objects.filter(**filters).order_by("id")[offset : offset + limit]
+
+
+class ProductBulkCreateView(APIView):
+    def post(self, request):
+        serializer = ProductSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        if len(serializer.validated_data) > settings.BULK_MAX_ITEMS:
+            raise ValidationError(f"At most {settings.BULK_MAX_ITEMS} products.")
+        if memory_store:
+            products = memory_store.create_many(serializer.validated_data)
+        else:
+            # ListSerializer.save() would INSERT row by row; bulk_create sends
+            # multi-row INSERT ... RETURNING statements instead.
+            with transaction.atomic():
+                products = Product.objects.bulk_create(
+                    [Product(**item) for item in serializer.validated_data]
+                )
+        return Response(
+            ProductSerializer(products, many=True).data, status=status.HTTP_201_CREATED
+        )
+
 
 class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        if "If-None-Match" in request.headers:
+            # Revalidation reads the version alone: an unchanged product is
+            # neither loaded in full nor serialized.
+            pk = kwargs["pk"]
+            if memory_store:
+                product = memory_store.get(int(pk))
+                version = product.version if product else None
+            else:
+                version = (
+                    Product.objects.filter(pk=pk).values_list("version", flat=True).first()
+                )
+            if version is None:
+                raise NotFound()
+            etag = product_etag(pk, version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+        product = self.get_object()
+        response = Response(self.get_serializer(product).data)
+        response.headers["ETag"] = product_etag(product.id, product.version)
+        return response
+
     def update(self, request, *args, **kwargs):
         kwargs["partial"] = True  # Allow partial updates for PUT
         return super().update(request, *args, **kwargs)
 
+    def get_object(self):
+        if not memory_store:
+            return super().get_object()
+        product = memory_store.get(int(self.kwargs["pk"]))
+        if product is None:
+            # The message get_object_or_404 gives for a missing row
+            raise NotFound("No Product matches the given query.")
+        return product
+
+    def perform_update(self, serializer):
+        if memory_store:
+            memory_store.update(serializer.instance.pk, serializer.validated_data)
+        else:
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        if memory_store:
+            memory_store.delete(instance.pk)
+        else:
+            instance.delete()
+
+
+def stream_fortune(rows):
+    # fortune.html is head + rows + foot; render the rows one cursor batch
+    # at a time so the page goes out while later rows are still being read.
+    yield render_to_string("fortune_head.html")
+    if memory_store:
+        products = iter(memory_store.page(rows))
+    else:
+        products = Product.objects.all()[:rows].iterator(
+            chunk_size=settings.FORTUNE_BATCH_SIZE
+        )
+    while batch := list(islice(products, settings.FORTUNE_BATCH_SIZE)):
+        yield render_to_string("fortune_rows.html", {"products": batch})
+    yield render_to_string("fortune_foot.html")
+
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def ndjson_chunk(rows):
+    # Prices as ProductSerializer renders them
+    for row in rows:
+        if row["price"] is not None:
+            row["price"] = format(row["price"], ".2f")
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def export_products(format):
+    # Unordered rows from a server-side cursor, one chunk per
+    # EXPORT_BATCH_SIZE rows, so memory stays flat however large the table is.
+    fields = ProductSerializer.Meta.fields
+    queryset = Product.objects.order_by()
+    if format == "csv":
+        yield csv_chunk([fields])
+        rows = queryset.values_list(*fields)
+        encode = csv_chunk
+    else:
+        rows = queryset.values(*fields)
+        encode = ndjson_chunk
+    rows = rows.iterator(chunk_size=settings.EXPORT_BATCH_SIZE)
+    while batch := list(islice(rows, settings.EXPORT_BATCH_SIZE)):
+        yield encode(batch)
+
+
+# Streaming bulk export; a plain view because DRF reserves ?format= for
+# renderer selection.
+def export(request):
+    format = request.GET.get("format", "ndjson")
+    if format not in EXPORT_CONTENT_TYPES:
+        return HttpResponseBadRequest("format must be ndjson or csv")
+    if memory_store:
+        return HttpResponse("Not available with STORAGE_BACKEND=memory", status=501)
+    return StreamingHttpResponse(
+        export_products(format), content_type=EXPORT_CONTENT_TYPES[format]
+    )
+
 
 # Fortune 100 HTML endpoint
 @api_view(["GET"])
 def fortune_100(request):
-    products = Product.objects.all()[:100]
+    try:
+        rows = int(request.query_params.get("rows", 100))
+    except ValueError:
+        raise ValidationError({"rows": "Must be an integer."})
+    if rows < 0:
+        raise ValidationError({"rows": "Must not be negative."})
+    if settings.FORTUNE_MODE == "streaming":
+        return StreamingHttpResponse(stream_fortune(rows), content_type="text/html; charset=utf-8")
+    products = memory_store.page(rows) if memory_store else Product.objects.all()[:rows]
     return render(request, "fortune.html", {"products": products})
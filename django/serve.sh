@@ -0,0 +1,27 @@
+#!/bin/sh
+# Starts the app under the server selected by SERVER (default: gunicorn).
+# gunicorn and granian serve the WSGI application; uvicorn and hypercorn
+# serve the ASGI one. Worker settings for gunicorn live in gunicorn.conf.py.
+set -e
+
+case "${SERVER:-gunicorn}" in
+  gunicorn)
+    exec gunicorn core.wsgi:application
+    ;;
+  granian)
+    exec granian --interface wsgi --host 0.0.0.0 --port 8002 \
+      --workers "${WEB_WORKERS:-1}" --blocking-threads "${WORKER_THREADS:-1}" core.wsgi:application
+    ;;
+  uvicorn)
+    exec uvicorn core.asgi:application --host 0.0.0.0 --port 8002 \
+      --workers "${WEB_WORKERS:-1}"
+    ;;
+  hypercorn)
+    exec hypercorn core.asgi:application --bind 0.0.0.0:8002 \
+      --workers "${WEB_WORKERS:-1}"
+    ;;
+  *)
+    echo "Unsupported SERVER: ${SERVER}" >&2
+    exit 1
+    ;;
+esac
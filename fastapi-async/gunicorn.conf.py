@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for the benchmark container.
+
+Everything is read from the environment so the harness can sweep worker
+models without rebuilding the image:
+
+- WEB_WORKERS: number of worker processes (default 1)
+- WORKER_CLASS: ASGI worker class (default uvicorn.workers.UvicornWorker)
+- GUNICORN_PRELOAD: import the app once in the master and fork the workers
+  from it (default false)
+- GC_FREEZE: with GUNICORN_PRELOAD, gc.freeze() the master's objects before
+  each fork so the workers' collections never touch (and copy) their pages
+  (default false)
+- GC_THRESHOLD: gc.set_threshold() for the workers, e.g. "50000,20,20"
+  (default: Python's 700,10,10)
+"""
+
+import gc
+import os
+
+bind = "0.0.0.0:8003"
+workers = int(os.getenv("WEB_WORKERS", "1"))
+worker_class = os.getenv("WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+GC_FREEZE = preload_app and os.getenv("GC_FREEZE", "false").lower() == "true"
+GC_THRESHOLD = [int(n) for n in os.getenv("GC_THRESHOLD", "").split(",") if n.strip()]
+
+if GC_FREEZE:
+    # No collection may run in the master between the app import and the
+    # fork: it would dirty the pages the workers are meant to share.
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if GC_FREEZE:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if GC_FREEZE:
+        gc.enable()
+    if GC_THRESHOLD:
+        gc.set_threshold(*GC_THRESHOLD)
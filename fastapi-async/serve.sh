@@ -0,0 +1,25 @@
+#!/bin/sh
+# Starts the app under the server selected by SERVER (default: gunicorn).
+# Worker settings for gunicorn live in gunicorn.conf.py.
+set -e
+
+case "${SERVER:-gunicorn}" in
+  gunicorn)
+    exec gunicorn main:app
+    ;;
+  uvicorn)
+    exec uvicorn main:app --host 0.0.0.0 --port 8003 --workers "${WEB_WORKERS:-1}"
+    ;;
+  granian)
+    exec granian --interface asgi --host 0.0.0.0 --port 8003 \
+      --workers "${WEB_WORKERS:-1}" main:app
+    ;;
+  hypercorn)
+    exec hypercorn main:app --bind 0.0.0.0:8003 --workers "${WEB_WORKERS:-1}" \
+      --worker-class uvloop
+    ;;
+  *)
+    echo "Unsupported SERVER for an ASGI app: ${SERVER}" >&2
+    exit 1
+    ;;
+esac
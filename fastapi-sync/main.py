@@ -1,21 +1,59 @@
+from contextlib import asynccontextmanager
+import csv
+import gc
+import gzip
+import hashlib
+import io
+import json
 import os
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse
+import re
+import threading
+import time
+from decimal import Decimal
+from functools import lru_cache
+from itertools import islice
+from typing import List, Literal, Optional
+import anyio
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.responses import (
+    HTMLResponse,
+    PlainTextResponse,
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from pydantic import BaseModel
 from sqlalchemy import (
     create_engine,
+    Column,
     Integer,
+    MetaData,
     String,
     Text,
     Numeric,
+    Table,
+    any_,
+    bindparam,
+    func,
+    insert,
     select,
+    text,
     update,
     delete,
 )
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base, mapped_column, Session
+from psycopg2.errors import QueryCanceled
+from starlette.datastructures import Headers, MutableHeaders
 from dotenv import load_dotenv
+import brotli
+import msgspec
+import orjson
+import ujson
+import zstandard
 
 # Load environment variables from .env if present
 load_dotenv()
@@ -29,12 +67,92 @@ DB_NAME = os.getenv("POSTGRES_DB", "postgres")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# === ADMISSION CONTROL SETTINGS ===
+# Max requests handled at once per worker; beyond it requests get an
+# immediate 503 instead of queueing for a threadpool token. 0 disables it.
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "0"))
+RETRY_AFTER_SECONDS = os.getenv("RETRY_AFTER_SECONDS", "1")
+# Size of the anyio threadpool that runs the sync endpoints (anyio default: 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+# Report how long each request waited for a worker thread (X-Queue-Time-Ms)
+MEASURE_QUEUE_TIME = os.getenv("MEASURE_QUEUE_TIME", "false").lower() == "true"
+# Cancel queries running longer than this many milliseconds. 0 disables it.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# === FORTUNE RENDERING SETTINGS ===
+# buffered: load every row, render the page, send it in one piece.
+# streaming: render rows as they arrive from a server-side cursor.
+FORTUNE_MODE = os.getenv("FORTUNE_MODE", "buffered")
+# Rows fetched per round trip from the server-side cursor
+FORTUNE_BATCH_SIZE = int(os.getenv("FORTUNE_BATCH_SIZE", "100"))
+# Rendered characters collected before a chunk is sent
+FORTUNE_CHUNK_SIZE = int(os.getenv("FORTUNE_CHUNK_SIZE", "16384"))
+
+# === EXPORT SETTINGS ===
+# Rows fetched per round trip from the server-side cursor and encoded per chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# === BATCH SETTINGS ===
+# Most products accepted by POST /products/bulk or looked up by GET /products?ids=
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+# === JSON SETTINGS ===
+# Encoder behind every JSON response: stdlib, ujson, orjson or msgspec
+JSON_ENCODER = os.getenv("JSON_ENCODER", "stdlib")
+# Largest payload GET /json?size=&depth= builds
+JSON_MAX_SIZE = 100_000
+JSON_MAX_DEPTH = 64
+
+# === STORAGE SETTINGS ===
+# postgres: every product endpoint queries the database.
+# memory: the CRUD, list and fortune endpoints serve products held in process
+# memory (MemoryProductStore) instead, to measure the framework on its own.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres")
+# Seed data for STORAGE_BACKEND=memory (compose mounts ./data at /data)
+PRODUCTS_CSV = os.getenv("PRODUCTS_CSV", "../data/products.csv")
+
+# === READ REPLICA SETTINGS ===
+# Streaming replica that serves the read-only endpoints (product detail,
+# list and fortune) while writes stay on POSTGRES_HOST. Empty disables it.
+DB_REPLICA_HOST = os.getenv("POSTGRES_REPLICA_HOST", "")
+DB_REPLICA_PORT = os.getenv("POSTGRES_REPLICA_PORT", DB_PORT)
+
+REPLICA_URL = (
+    f"postgresql://{DB_USER}:{DB_PASS}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}"
+)
+
+# === COMPRESSION SETTINGS ===
+# Content codings offered for responses, most preferred first (any of gzip,
+# br, zstd); empty disables compression.
+COMPRESSION = [e.strip() for e in os.getenv("COMPRESSION", "").split(",") if e.strip()]
+# Bodies shorter than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Codec level; 0 uses DEFAULT_COMPRESSION_LEVELS
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "0"))
+
 # === SQLALCHEMY SETUP ===
-engine = create_engine(DATABASE_URL, echo=False)
+connect_args = {}
+if DB_STATEMENT_TIMEOUT_MS:
+    connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_engine = (
+    create_engine(REPLICA_URL, echo=False, connect_args=connect_args)
+    if DB_REPLICA_HOST
+    else None
+)
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
 Base = declarative_base()
 
-templates = Jinja2Templates(directory="templates")
+# Compiled templates are cached as bytecode on disk, so new worker processes
+# load them instead of compiling the template source again.
+template_env = Environment(
+    loader=FileSystemLoader("templates"),
+    autoescape=True,
+    bytecode_cache=FileSystemBytecodeCache(),
+)
+templates = Jinja2Templates(env=template_env)
+fortune_template = template_env.get_template("fortune.html")
 
 
 # === SQLALCHEMY MODEL ===
@@ -53,6 +171,97 @@ class Product(Base):
     size = mapped_column(String)
     availability = mapped_column(String)
     internal_id = mapped_column(String)
+    # Bumped by the product_version trigger on every UPDATE (see the seeder);
+    # the ETag of /products/{id} and /products is derived from it.
+    version = mapped_column(Integer, nullable=False, server_default=text("1"))
+
+
+# Per (category, availability) aggregates kept current by triggers on
+# product (installed by the seeder), so it stays out of Base.metadata.
+product_stats = Table(
+    "product_stats",
+    MetaData(),
+    Column("category", String),
+    Column("availability", String),
+    Column("product_count", Integer),
+    Column("total_stock", Integer),
+    Column("price_count", Integer),
+    Column("price_sum", Numeric),
+    Column("min_price", Numeric),
+    Column("max_price", Numeric),
+)
+
+
+# === IN-MEMORY STORAGE ===
+class MemoryProductStore:
+    """Products held in process memory, for STORAGE_BACKEND=memory.
+
+    Loaded from PRODUCTS_CSV with the ids the seeder gives them (file order,
+    from 1) and kept per worker process, so writes are not shared between
+    workers. Products are detached Product instances and are serialized
+    exactly like rows read from Postgres. Pages are in id order, the order
+    the unordered list queries return on a freshly seeded table; Postgres
+    may move updated rows, the store does not.
+
+    flask/app.py holds the canonical copy; fastapi-sync and fastapi-async
+    paste it unchanged. Only require_postgres differs, by framework.
+    """
+
+    def __init__(self, path):
+        self.products = {}
+        self.last_id = 0
+        self.lock = threading.Lock()
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            del row["index"]
+            row["price"] = Decimal(row["price"])
+            row["stock"] = int(row["stock"])
+        self.create_many(rows)
+
+    def get(self, id):
+        return self.products.get(id)
+
+    def get_many(self, ids):
+        return [self.products[id] for id in dict.fromkeys(ids) if id in self.products]
+
+    def page(self, limit, offset=0):
+        with self.lock:
+            return list(islice(self.products.values(), offset, offset + limit))
+
+    def create_many(self, items):
+        created = []
+        with self.lock:
+            for data in items:
+                self.last_id += 1
+                product = Product(id=self.last_id, version=1, **data)
+                self.products[product.id] = product
+                created.append(product)
+        return created
+
+    def update(self, id, data):
+        with self.lock:
+            product = self.products.get(id)
+            if product is not None:
+                for field, value in data.items():
+                    setattr(product, field, value)
+                product.version += 1  # as the product_version trigger does
+        return product
+
+    def delete(self, id):
+        with self.lock:
+            return self.products.pop(id, None)
+
+
+memory_store = MemoryProductStore(PRODUCTS_CSV) if STORAGE_BACKEND == "memory" else None
+
+
+def require_postgres():
+    """Search, stats and export have no in-memory implementation."""
+    if memory_store:
+        raise HTTPException(
+            status_code=501, detail="Not available with STORAGE_BACKEND=memory"
+        )
 
 
 # === PYDANTIC MODELS ===
@@ -97,11 +306,311 @@ class ProductOut(ProductBase):
         from_attributes = True
 
 
+class ProductStatsOut(BaseModel):
+    category: Optional[str]
+    availability: Optional[str]
+    product_count: int
+    total_stock: int
+    min_price: Optional[float]
+    avg_price: Optional[float]
+    max_price: Optional[float]
+
+    class Config:
+        from_attributes = True
+
+
+# === METRICS ===
+class Histogram:
+    """Cumulative histogram rendered in the Prometheus text format."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+            self.total += 1
+            self.sum += value
+
+    def samples(self, name, labels=""):
+        """Bucket, sum and count lines, each carrying `labels` (e.g. 'generation="0"')."""
+        prefix = f"{labels}," if labels else ""
+        suffix = f"{{{labels}}}" if labels else ""
+        lines = [
+            f'{name}_bucket{{{prefix}le="{bound}"}} {count}'
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.total}')
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.total}")
+        return lines
+
+    def render(self, name):
+        return [f"# TYPE {name} histogram", *self.samples(name)]
+
+
+QUEUE_TIME_MS = Histogram((1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000))
+requests_rejected = 0
+
+
+# === GC PAUSES ===
+# gc.callbacks brackets every collection: its duration is a stop-the-world
+# pause for whatever requests the process is serving.
+GC_PAUSE_MS = [Histogram((0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)) for _ in range(3)]
+gc_started = None
+
+
+def record_gc_pause(phase, info):
+    global gc_started
+    if phase == "start":
+        gc_started = time.perf_counter()
+    elif gc_started is not None:
+        GC_PAUSE_MS[info["generation"]].observe((time.perf_counter() - gc_started) * 1000)
+        gc_started = None
+
+
+gc.callbacks.append(record_gc_pause)
+
+
+def gc_metrics():
+    """GC pause histograms per generation; each worker reports its own."""
+    lines = ["# TYPE app_gc_pause_ms histogram"]
+    for generation, histogram in enumerate(GC_PAUSE_MS):
+        lines.extend(histogram.samples("app_gc_pause_ms", f'generation="{generation}"'))
+    lines += [
+        "# TYPE app_gc_frozen_objects gauge",
+        f"app_gc_frozen_objects {gc.get_freeze_count()}",
+        "# TYPE app_worker_pid gauge",
+        f"app_worker_pid {os.getpid()}",
+    ]
+    return lines
+
+
+# === ADMISSION CONTROL ===
+def request_arrival(scope):
+    """Wall-clock arrival time, from X-Request-Start (t=<microseconds>) if set."""
+    for name, value in scope["headers"]:
+        if name == b"x-request-start":
+            try:
+                return int(value.removeprefix(b"t=")) / 1_000_000
+            except ValueError:
+                break
+    return time.time()
+
+
+class AdmissionControlMiddleware:
+    """Bounds the work queued in front of the threadpool.
+
+    Requests beyond MAX_IN_FLIGHT are answered with 503 and Retry-After
+    before they reach the router. Admitted requests carry the time they
+    waited for a worker thread in X-Queue-Time-Ms (see mark_dequeued).
+    """
+
+    def __init__(self, app, max_in_flight):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        global requests_rejected
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            requests_rejected += 1
+            response = PlainTextResponse(
+                "Service Unavailable",
+                status_code=503,
+                headers={"Retry-After": RETRY_AFTER_SECONDS},
+            )
+            await response(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        state["arrived_at"] = request_arrival(scope)
+
+        async def send_with_queue_time(message):
+            if message["type"] == "http.response.start" and "queue_time_ms" in state:
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-queue-time-ms", f"{state['queue_time_ms']:.3f}".encode()),
+                ]
+            await send(message)
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_queue_time)
+        finally:
+            self.in_flight -= 1
+
+
+def mark_dequeued(request: Request):
+    # A sync dependency runs in the threadpool, so this fires as soon as the
+    # request gets a worker thread.
+    arrived_at = getattr(request.state, "arrived_at", None)
+    if arrived_at is not None:
+        queue_time_ms = max(0.0, (time.time() - arrived_at) * 1000)
+        request.state.queue_time_ms = queue_time_ms
+        QUEUE_TIME_MS.observe(queue_time_ms)
+
+
+# === COMPRESSION ===
+# COMPRESSORS, negotiate_encoding and compress are pasted unchanged from
+# flask/app.py, which holds the canonical copy.
+COMPRESSORS = {
+    "gzip": lambda body, level: gzip.compress(body, compresslevel=level, mtime=0),
+    "br": lambda body, level: brotli.compress(body, quality=level),
+    "zstd": lambda body, level: zstandard.ZstdCompressor(level=level).compress(body),
+}
+# Levels suited to compressing on the fly; brotli's own default (11) is
+# meant for static assets.
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+
+def negotiate_encoding(accept_encoding):
+    """First encoding of COMPRESSION that Accept-Encoding allows (q > 0)."""
+    weights = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        try:
+            q = float(params.strip().removeprefix("q=")) if params else 1.0
+        except ValueError:
+            q = 0.0
+        weights[name.strip().lower()] = q
+    for encoding in COMPRESSION:
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    level = COMPRESSION_LEVEL or DEFAULT_COMPRESSION_LEVELS[encoding]
+    return COMPRESSORS[encoding](body, level)
+
+
+class CompressionMiddleware:
+    """Compresses complete responses with the encoding the client accepts.
+
+    Streamed responses (more_body on their first chunk) are sent as they are.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message  # held back until the body is known
+                return
+            if start_message is None:
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            if (
+                encoding
+                and not message.get("more_body", False)
+                and len(body) >= COMPRESSION_MIN_SIZE
+                and "content-encoding" not in headers
+            ):
+                body = compress(body, encoding)
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(body))
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # A strong ETag names the uncompressed bytes.
+                    headers["etag"] = "W/" + etag
+                message = {**message, "body": body}
+            await send(start_message)
+            start_message = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    yield
+
+
+# === JSON ENCODING ===
+JSON_ENCODERS = {
+    # What Starlette's JSONResponse renders
+    "stdlib": lambda content: json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode(),
+    "ujson": lambda content: ujson.dumps(
+        content, ensure_ascii=False, escape_forward_slashes=False
+    ).encode(),
+    "orjson": orjson.dumps,
+    "msgspec": msgspec.json.encode,
+}
+json_dumps = JSON_ENCODERS[JSON_ENCODER]
+
+
+class EncodedJSONResponse(JSONResponse):
+    """JSONResponse rendered by the JSON_ENCODER backend."""
+
+    def render(self, content) -> bytes:
+        return json_dumps(content)
+
+
+@lru_cache(maxsize=32)
+def json_payload(size, depth):
+    """`size` records, each nesting `depth` levels of child records.
+
+    Cached, so GET /json?size=&depth= times the encoder, not the payload.
+    """
+
+    def record(i, level):
+        node = {
+            "id": i,
+            "name": f"item {i}",
+            "price": i * 0.25,
+            "active": i % 2 == 0,
+            "tags": ["alpha", "beta"],
+        }
+        if level < depth:
+            node["child"] = record(i, level + 1)
+        return node
+
+    return [record(i, 1) for i in range(size)]
+
+
 # === FASTAPI APP ===
-app = FastAPI()
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=EncodedJSONResponse,
+    dependencies=[Depends(mark_dequeued)] if MEASURE_QUEUE_TIME else None,
+)
+if MAX_IN_FLIGHT or MEASURE_QUEUE_TIME:
+    app.add_middleware(AdmissionControlMiddleware, max_in_flight=MAX_IN_FLIGHT)
+if COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
 
 # Create tables on startup
-Base.metadata.create_all(bind=engine)
+if not memory_store:
+    Base.metadata.create_all(bind=engine)
+    # A preloading gunicorn master (GUNICORN_PRELOAD) must not hand its
+    # pooled connection down to the workers it forks.
+    engine.dispose()
 
 
 # Dependency to get DB session
@@ -113,47 +622,411 @@ def get_session():
         db.close()
 
 
+# === READ REPLICA ===
+LSN_PATTERN = re.compile(r"[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}")
+REPLAYED_SQL = text(
+    "SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)"
+)
+WRITE_LSN_SQL = text("SELECT pg_current_wal_lsn()::text")
+
+
+def replica_caught_up(min_lsn):
+    """Whether the replica has replayed the WAL up to `min_lsn`."""
+    if not LSN_PATTERN.fullmatch(min_lsn):
+        raise HTTPException(
+            status_code=400, detail="X-Min-LSN must be a WAL position such as 0/16B3748"
+        )
+    with replica_engine.connect() as conn:
+        return bool(conn.scalar(REPLAYED_SQL, {"lsn": min_lsn}))
+
+
+def read_sessionmaker(request: Request):
+    """The sessionmaker of a read-only endpoint: the replica's when there is one.
+
+    Read-your-writes: a client sends the X-Write-LSN of its last write back
+    as X-Min-LSN, and reads the primary until the replica has replayed that far.
+    """
+    if replica_engine is None or memory_store:
+        return SessionLocal
+    min_lsn = request.headers.get("x-min-lsn")
+    caught_up = not min_lsn or replica_caught_up(min_lsn)
+    request.state.db_role = "replica" if caught_up else "primary"
+    return ReplicaSessionLocal if caught_up else SessionLocal
+
+
+def get_read_session(make_session=Depends(read_sessionmaker)):
+    db = make_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def set_write_lsn(session, response):
+    """Hand the client the WAL position of its write, to send back as X-Min-LSN."""
+    if replica_engine is not None:
+        response.headers["X-Write-LSN"] = session.scalar(WRITE_LSN_SQL)
+
+
+if replica_engine is not None:
+
+    @app.middleware("http")
+    async def db_role_header(request: Request, call_next):
+        response = await call_next(request)
+        if role := getattr(request.state, "db_role", None):
+            response.headers["X-DB-Role"] = role
+        return response
+
+
+@app.exception_handler(OperationalError)
+async def statement_timeout_handler(request: Request, exc: OperationalError):
+    # Queries cancelled by DB_STATEMENT_TIMEOUT_MS fail fast like a shed request.
+    if isinstance(exc.orig, QueryCanceled):
+        return PlainTextResponse(
+            "Statement timeout",
+            status_code=503,
+            headers={"Retry-After": RETRY_AFTER_SECONDS},
+        )
+    raise exc
+
+
 # === ENDPOINTS ===
+@app.get("/metrics")
+def metrics():
+    lines = [
+        "# TYPE app_requests_rejected_total counter",
+        f"app_requests_rejected_total {requests_rejected}",
+        *QUEUE_TIME_MS.render("app_queue_time_ms"),
+        *gc_metrics(),
+    ]
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
 @app.get("/plain-text")
 def plain_text():
     return PlainTextResponse(b"Hello, world!")
 
 
 @app.get("/json")
-def json_serialization():
-    return JSONResponse({"message": "Hello, world from JSON serialization endpoint!"})
+def json_serialization(
+    size: Optional[int] = Query(None, ge=0, le=JSON_MAX_SIZE),
+    depth: int = Query(1, ge=1, le=JSON_MAX_DEPTH),
+):
+    if size is None:
+        return EncodedJSONResponse(
+            {"message": "Hello, world from JSON serialization endpoint!"}
+        )
+    # Encoded as is, without FastAPI's jsonable_encoder pass
+    return EncodedJSONResponse(json_payload(size, depth))
 
 
 @app.post("/products", response_model=ProductOut)
-def create_product(product: ProductCreate, session: Session = Depends(get_session)):
+def create_product(
+    product: ProductCreate, response: Response, session: Session = Depends(get_session)
+):
+    if memory_store:
+        return memory_store.create_many([product.model_dump()])[0]
     db_product = Product(**product.model_dump())
     session.add(db_product)
     session.commit()
     session.refresh(db_product)
+    set_write_lsn(session, response)
     return db_product
 
 
+def csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def ndjson_chunk(rows):
+    # The fields ProductOut has, with its float prices (the encoders
+    # differ on Decimal)
+    return b"".join(
+        json_dumps(
+            {**row._asdict(), "price": float(row.price) if row.price is not None else None}
+        )
+        + b"\n"
+        for row in rows
+    )
+
+
+def export_products(format: str):
+    # Core rows from a server-side cursor, one chunk per EXPORT_BATCH_SIZE
+    # rows, so memory stays flat however large the table is. The public
+    # columns in Django's ProductSerializer order; version stays internal.
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(
+            select(
+                Product.id,
+                Product.name,
+                Product.description,
+                Product.brand,
+                Product.category,
+                Product.price,
+                Product.currency,
+                Product.stock,
+                Product.ean,
+                Product.color,
+                Product.size,
+                Product.availability,
+                Product.internal_id,
+            )
+        )
+        if format == "csv":
+            yield csv_chunk([result.keys()])
+        encode = csv_chunk if format == "csv" else ndjson_chunk
+        for batch in result.partitions():
+            yield encode(batch)
+
+
+@app.post("/products/bulk", response_model=List[ProductOut], status_code=201)
+def bulk_create_products(
+    products: List[ProductCreate],
+    response: Response,
+    session: Session = Depends(get_session),
+):
+    if len(products) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {BULK_MAX_ITEMS} products per request"
+        )
+    if not products:
+        return []
+    if memory_store:
+        return memory_store.create_many([p.model_dump() for p in products])
+    # Multi-row INSERT ... RETURNING in a single transaction.
+    stmt = insert(Product).returning(Product, sort_by_parameter_order=True)
+    created = session.scalars(stmt, [p.model_dump() for p in products]).all()
+    # Serialize before the commit expires the instances (one SELECT each).
+    serialized = [ProductOut.model_validate(p) for p in created]
+    session.commit()
+    set_write_lsn(session, response)
+    return serialized
+
+
+# === CONDITIONAL GET ===
+def product_etag(id, version):
+    return f'"{id}-{version}"'
+
+
+def list_etag(versions):
+    """Strong ETag over the (id, version) pairs of a page, in page order."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for id, version in versions:
+        digest.update(f"{id}-{version},".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match uses the weak comparison, so a W/ prefix is ignored.
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(etag):
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def parse_ids(ids: str) -> List[int]:
+    try:
+        parsed = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="ids must be comma-separated integers"
+        )
+    if len(parsed) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {BULK_MAX_ITEMS} ids per request"
+        )
+    return parsed
+
+
+def search_filters(category, brand, availability, min_price, max_price, prefix, q):
+    """WHERE clauses for /products/search; each one matches an index from the seeder."""
+    filters = []
+    if category is not None:
+        filters.append(Product.category == category)
+    if brand is not None:
+        filters.append(Product.brand == brand)
+    if availability is not None:
+        filters.append(Product.availability == availability)
+    if min_price is not None:
+        filters.append(Product.price >= min_price)
+    if max_price is not None:
+        filters.append(Product.price <= max_price)
+    if prefix:
+        # name LIKE 'prefix%': product_name_prefix_idx (text_pattern_ops)
+        filters.append(Product.name.startswith(prefix, autoescape=True))
+    if q:
+        # UPPER(name) LIKE '%Q%': product_name_trgm_idx (pg_trgm), the same
+        # expression Django's icontains produces.
+        filters.append(func.upper(Product.name).contains(q.upper(), autoescape=True))
+    return filters
+
+
+def stats_statement(mode: str):
+    if mode == "naive":
+        # Full GROUP BY over product on every request, for comparison.
+        return (
+            select(
+                Product.category,
+                Product.availability,
+                func.count().label("product_count"),
+                func.coalesce(func.sum(Product.stock), 0).label("total_stock"),
+                func.min(Product.price).label("min_price"),
+                func.round(func.avg(Product.price), 2).label("avg_price"),
+                func.max(Product.price).label("max_price"),
+            )
+            .group_by(Product.category, Product.availability)
+            .order_by(Product.category, Product.availability)
+        )
+    stats = product_stats.c
+    avg_price = stats.price_sum / func.nullif(stats.price_count, 0)
+    return select(
+        stats.category,
+        stats.availability,
+        stats.product_count,
+        stats.total_stock,
+        stats.min_price,
+        func.round(avg_price, 2).label("avg_price"),
+        stats.max_price,
+    ).order_by(stats.category, stats.availability)
+
+
+# /products/stats, /search and /export are declared before /products/{id},
+# which would otherwise match them.
+@app.get(
+    "/products/stats",
+    response_model=List[ProductStatsOut],
+    dependencies=[Depends(require_postgres)],
+)
+def product_stats_endpoint(
+    mode: Literal["summary", "naive"] = "summary",
+    session: Session = Depends(get_session),
+):
+    return session.execute(stats_statement(mode)).all()
+
+
+@app.get(
+    "/products/search",
+    response_model=List[ProductOut],
+    dependencies=[Depends(require_postgres)],
+)
+def search_products(
+    category: Optional[str] = None,
+    brand: Optional[str] = None,
+    availability: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    prefix: Optional[str] = None,
+    q: Optional[str] = None,
+    limit: int = Query(100, ge=0),
+    offset: int = Query(0, ge=0),
+    session: Session = Depends(get_session),
+):
+    filters = search_filters(
+        category, brand, availability, min_price, max_price, prefix, q
+    )
+    stmt = (
+        select(Product).where(*filters).order_by(Product.id).limit(limit).offset(offset)
+    )
+    return session.scalars(stmt).all()
+
+
+@app.get("/products/export", dependencies=[Depends(require_postgres)])
+def export(format: Literal["ndjson", "csv"] = "ndjson"):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(export_products(format), media_type=media_type)
+
+
 @app.get("/products/{id}", response_model=ProductOut)
-def get_product(id: int, session: Session = Depends(get_session)):
+def get_product(
+    id: int,
+    request: Request,
+    response: Response,
+    session: Session = Depends(get_read_session),
+):
+    if_none_match = request.headers.get("if-none-match")
+    if memory_store:
+        result = memory_store.get(id)
+        if not result:
+            raise HTTPException(status_code=404, detail="Product not found")
+        etag = product_etag(id, result.version)
+        if if_none_match and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return result
+    if if_none_match:
+        # Revalidation reads the version alone: an unchanged product is
+        # neither loaded in full nor serialized.
+        version = session.scalar(select(Product.version).where(Product.id == id))
+        if version is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        etag = product_etag(id, version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
     result = session.get(Product, id)
     if not result:
         raise HTTPException(status_code=404, detail="Product not found")
+    response.headers["ETag"] = product_etag(result.id, result.version)
     return result
 
 
 @app.get("/products", response_model=List[ProductOut])
 def list_products(
-    limit: int = 100, offset: int = 0, session: Session = Depends(get_session)
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    offset: int = 0,
+    ids: Optional[str] = None,
+    session: Session = Depends(get_read_session),
 ):
+    if ids is not None:
+        if memory_store:
+            return memory_store.get_many(parse_ids(ids))
+        # One array parameter keeps the statement text the same for any count.
+        stmt = select(Product).where(
+            Product.id == any_(bindparam("ids", parse_ids(ids), type_=ARRAY(Integer)))
+        )
+        return session.scalars(stmt).all()
+    if_none_match = request.headers.get("if-none-match")
+    if memory_store:
+        products = memory_store.page(limit, offset)
+        etag = list_etag((p.id, p.version) for p in products)
+        if if_none_match and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return products
+    if if_none_match:
+        versions = session.execute(
+            select(Product.id, Product.version).limit(limit).offset(offset)
+        )
+        etag = list_etag(versions)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
     stmt = select(Product).limit(limit).offset(offset)
     result = session.execute(stmt)
-    return result.scalars().all()
+    products = result.scalars().all()
+    response.headers["ETag"] = list_etag((p.id, p.version) for p in products)
+    return products
 
 
 @app.put("/products/{id}", response_model=ProductOut)
 def update_product(
-    id: int, product: ProductUpdate, session: Session = Depends(get_session)
+    id: int,
+    product: ProductUpdate,
+    response: Response,
+    session: Session = Depends(get_session),
 ):
+    if memory_store:
+        db_product = memory_store.update(id, product.model_dump(exclude_unset=True))
+        if not db_product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return db_product
     db_product = session.get(Product, id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -161,24 +1034,64 @@ def update_product(
         setattr(db_product, field, value)
     session.commit()
     session.refresh(db_product)
+    set_write_lsn(session, response)
     return db_product
 
 
 @app.delete("/products/{id}")
-def delete_product(id: int, session: Session = Depends(get_session)):
+def delete_product(id: int, response: Response, session: Session = Depends(get_session)):
+    if memory_store:
+        if not memory_store.delete(id):
+            raise HTTPException(status_code=404, detail="Product not found")
+        return {"ok": True}
     db_product = session.get(Product, id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     session.delete(db_product)
     session.commit()
+    set_write_lsn(session, response)
     return {"ok": True}
 
 
+def chunked(fragments, size):
+    """Join small template fragments into chunks of at least `size` characters."""
+    buffer, length = [], 0
+    for fragment in fragments:
+        buffer.append(fragment)
+        length += len(fragment)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_fortune(rows: int, make_session):
+    if memory_store:
+        products = memory_store.page(rows)
+        yield from chunked(fortune_template.generate(products=products), FORTUNE_CHUNK_SIZE)
+        return
+    # The generator outlives the request dependencies, so it owns its session.
+    with make_session() as session:
+        stmt = select(Product).limit(rows).execution_options(yield_per=FORTUNE_BATCH_SIZE)
+        products = session.execute(stmt).scalars()
+        yield from chunked(fortune_template.generate(products=products), FORTUNE_CHUNK_SIZE)
+
+
 @app.get("/fortune", response_class=HTMLResponse)
-def fortune_100(request: Request, session: Session = Depends(get_session)):
-    stmt = select(Product).limit(100)
-    result = session.execute(stmt)
-    products = result.scalars().all()
+def fortune_100(
+    request: Request,
+    rows: int = Query(100, ge=0),
+    make_session=Depends(read_sessionmaker),
+    session: Session = Depends(get_read_session),
+):
+    if FORTUNE_MODE == "streaming":
+        return StreamingResponse(stream_fortune(rows, make_session), media_type="text/html")
+    if memory_store:
+        products = memory_store.page(rows)
+    else:
+        result = session.execute(select(Product).limit(rows))
+        products = result.scalars().all()
     return templates.TemplateResponse(
         "fortune.html", {"request": request, "products": products}
     )
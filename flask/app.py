@@ -1,9 +1,47 @@
+import csv
+import gc
+import gzip
+import hashlib
+import io
+import json
 import os
-from flask import Flask, request, jsonify, render_template, abort
+import re
+import threading
+import time
+from decimal import Decimal
+from functools import lru_cache
+from itertools import islice
+from flask import Flask, request, jsonify, render_template, stream_template, abort, g
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Numeric, Text
+from flask_sqlalchemy.session import Session as FlaskSession
+from jinja2 import FileSystemBytecodeCache
+from psycopg2.errors import QueryCanceled
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    Text,
+    any_,
+    bindparam,
+    func,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from werkzeug.wsgi import ClosingIterator
 from dotenv import load_dotenv
+import brotli
+import msgspec
+import orjson
 import ujson
+import zstandard
 
 # Load environment variables from .env if present
 load_dotenv()
@@ -17,12 +55,151 @@ DB_NAME = os.getenv("POSTGRES_DB", "postgres")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# === ADMISSION CONTROL SETTINGS ===
+# Max requests handled at once per worker (matters for gthread/gevent
+# workers); beyond it requests get an immediate 503. 0 disables it.
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "0"))
+RETRY_AFTER_SECONDS = os.getenv("RETRY_AFTER_SECONDS", "1")
+# Report how long each request waited before its view ran (X-Queue-Time-Ms)
+MEASURE_QUEUE_TIME = os.getenv("MEASURE_QUEUE_TIME", "false").lower() == "true"
+# Cancel queries running longer than this many milliseconds. 0 disables it.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# === FORTUNE RENDERING SETTINGS ===
+# buffered: load every row, render the page, send it in one piece.
+# streaming: render rows as they arrive from a server-side cursor.
+FORTUNE_MODE = os.getenv("FORTUNE_MODE", "buffered")
+# Rows fetched per round trip from the server-side cursor
+FORTUNE_BATCH_SIZE = int(os.getenv("FORTUNE_BATCH_SIZE", "100"))
+# Rendered characters collected before a chunk is sent
+FORTUNE_CHUNK_SIZE = int(os.getenv("FORTUNE_CHUNK_SIZE", "16384"))
+
+# === EXPORT SETTINGS ===
+# Rows fetched per round trip from the server-side cursor and encoded per chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# === BATCH SETTINGS ===
+# Most products accepted by POST /products/bulk or looked up by GET /products?ids=
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+# === COMPRESSION SETTINGS ===
+# Content codings offered for responses, most preferred first (any of gzip,
+# br, zstd); empty disables compression.
+COMPRESSION = [e.strip() for e in os.getenv("COMPRESSION", "").split(",") if e.strip()]
+# Bodies shorter than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Codec level; 0 uses DEFAULT_COMPRESSION_LEVELS
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "0"))
+
+# === JSON SETTINGS ===
+# Encoder behind every JSON response: stdlib, ujson, orjson or msgspec
+JSON_ENCODER = os.getenv("JSON_ENCODER", "stdlib")
+# Largest payload GET /json?size=&depth= builds
+JSON_MAX_SIZE = 100_000
+JSON_MAX_DEPTH = 64
+
+# === STORAGE SETTINGS ===
+# postgres: every product endpoint queries the database.
+# memory: the CRUD, list and fortune endpoints serve products held in process
+# memory (MemoryProductStore) instead, to measure the framework on its own.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres")
+# Seed data for STORAGE_BACKEND=memory (compose mounts ./data at /data)
+PRODUCTS_CSV = os.getenv("PRODUCTS_CSV", "../data/products.csv")
+
+# === READ REPLICA SETTINGS ===
+# Streaming replica that serves the read-only endpoints (product detail,
+# list and fortune) while writes stay on POSTGRES_HOST. Empty disables it.
+DB_REPLICA_HOST = os.getenv("POSTGRES_REPLICA_HOST", "")
+DB_REPLICA_PORT = os.getenv("POSTGRES_REPLICA_PORT", DB_PORT)
+
+REPLICA_URL = (
+    f"postgresql://{DB_USER}:{DB_PASS}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}"
+)
+
+# === JSON ENCODING ===
+# Types the encoders do not know natively (Decimal, dates, ...) are handled
+# as Flask's own provider handles them.
+json_default = DefaultJSONProvider.default
+JSON_ENCODERS = {
+    "stdlib": lambda obj: json.dumps(
+        obj, default=json_default, ensure_ascii=False, separators=(",", ":")
+    ).encode(),
+    "ujson": lambda obj: ujson.dumps(
+        obj, default=json_default, ensure_ascii=False, escape_forward_slashes=False
+    ).encode(),
+    # Result-row keys are SQLAlchemy quoted_name, a str subclass
+    "orjson": lambda obj: orjson.dumps(
+        obj, default=json_default, option=orjson.OPT_NON_STR_KEYS
+    ),
+    "msgspec": msgspec.json.Encoder(enc_hook=json_default).encode,
+}
+json_dumps = JSON_ENCODERS[JSON_ENCODER]
+
+
+class EncoderJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with output from the JSON_ENCODER backend.
+
+    Keys keep their insertion order, as in the other apps.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return json_dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(json_dumps(obj), mimetype=self.mimetype)
+
+
+@lru_cache(maxsize=32)
+def json_payload(size, depth):
+    """`size` records, each nesting `depth` levels of child records.
+
+    Cached, so GET /json?size=&depth= times the encoder, not the payload.
+    """
+
+    def record(i, level):
+        node = {
+            "id": i,
+            "name": f"item {i}",
+            "price": i * 0.25,
+            "active": i % 2 == 0,
+            "tags": ["alpha", "beta"],
+        }
+        if level < depth:
+            node["child"] = record(i, level + 1)
+        return node
+
+    return [record(i, 1) for i in range(size)]
+
+
 # === FLASK APP SETUP ===
 app = Flask(__name__)
+app.json = EncoderJSONProvider(app)
+# Compiled templates are cached as bytecode on disk, so new worker processes
+# load them instead of compiling the template source again.
+app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache()}
+app.jinja_env.get_template("fortune.html")
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+if DB_STATEMENT_TIMEOUT_MS:
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "connect_args": {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    }
+if DB_REPLICA_HOST:
+    app.config["SQLALCHEMY_BINDS"] = {"replica": REPLICA_URL}
+
+
+class RoutingSession(FlaskSession):
+    """db.session, on the replica's engine in requests routed there (g.db_role)."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and g.get("db_role") == "replica":
+            return self._db.engines["replica"]
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
 
 
 # === SQLALCHEMY MODEL ===
@@ -41,6 +218,9 @@ class Product(db.Model):
     size = db.Column(db.String)
     availability = db.Column(db.String)
     internal_id = db.Column(db.String)
+    # Bumped by the product_version trigger on every UPDATE (see the seeder);
+    # the ETag of /products/<id> and /products is derived from it.
+    version = db.Column(db.Integer, nullable=False, server_default=text("1"))
 
     def to_dict(self):
         return {
@@ -60,7 +240,363 @@ class Product(db.Model):
         }
 
 
+# Per (category, availability) aggregates kept current by triggers on
+# product (installed by the seeder), so it stays out of db.Model.metadata.
+product_stats = Table(
+    "product_stats",
+    MetaData(),
+    Column("category", String),
+    Column("availability", String),
+    Column("product_count", Integer),
+    Column("total_stock", Integer),
+    Column("price_count", Integer),
+    Column("price_sum", Numeric),
+    Column("min_price", Numeric),
+    Column("max_price", Numeric),
+)
+
+
+# === IN-MEMORY STORAGE ===
+class MemoryProductStore:
+    """Products held in process memory, for STORAGE_BACKEND=memory.
+
+    Loaded from PRODUCTS_CSV with the ids the seeder gives them (file order,
+    from 1) and kept per worker process, so writes are not shared between
+    workers. Products are detached Product instances and are serialized
+    exactly like rows read from Postgres. Pages are in id order, the order
+    the unordered list queries return on a freshly seeded table; Postgres
+    may move updated rows, the store does not.
+
+    flask/app.py holds the canonical copy; fastapi-sync and fastapi-async
+    paste it unchanged. Only require_postgres differs, by framework.
+    """
+
+    def __init__(self, path):
+        self.products = {}
+        self.last_id = 0
+        self.lock = threading.Lock()
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            del row["index"]
+            row["price"] = Decimal(row["price"])
+            row["stock"] = int(row["stock"])
+        self.create_many(rows)
+
+    def get(self, id):
+        return self.products.get(id)
+
+    def get_many(self, ids):
+        return [self.products[id] for id in dict.fromkeys(ids) if id in self.products]
+
+    def page(self, limit, offset=0):
+        with self.lock:
+            return list(islice(self.products.values(), offset, offset + limit))
+
+    def create_many(self, items):
+        created = []
+        with self.lock:
+            for data in items:
+                self.last_id += 1
+                product = Product(id=self.last_id, version=1, **data)
+                self.products[product.id] = product
+                created.append(product)
+        return created
+
+    def update(self, id, data):
+        with self.lock:
+            product = self.products.get(id)
+            if product is not None:
+                for field, value in data.items():
+                    setattr(product, field, value)
+                product.version += 1  # as the product_version trigger does
+        return product
+
+    def delete(self, id):
+        with self.lock:
+            return self.products.pop(id, None)
+
+
+memory_store = MemoryProductStore(PRODUCTS_CSV) if STORAGE_BACKEND == "memory" else None
+
+
+def require_postgres():
+    """Search, stats and export have no in-memory implementation."""
+    if memory_store:
+        abort(501, description="Not available with STORAGE_BACKEND=memory")
+
+
+# === METRICS ===
+class Histogram:
+    """Cumulative histogram rendered in the Prometheus text format."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+            self.total += 1
+            self.sum += value
+
+    def samples(self, name, labels=""):
+        """Bucket, sum and count lines, each carrying `labels` (e.g. 'generation="0"')."""
+        prefix = f"{labels}," if labels else ""
+        suffix = f"{{{labels}}}" if labels else ""
+        lines = [
+            f'{name}_bucket{{{prefix}le="{bound}"}} {count}'
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.total}')
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.total}")
+        return lines
+
+    def render(self, name):
+        return [f"# TYPE {name} histogram", *self.samples(name)]
+
+
+QUEUE_TIME_MS = Histogram((1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000))
+
+
+# === GC PAUSES ===
+# gc.callbacks brackets every collection: its duration is a stop-the-world
+# pause for whatever requests the process is serving.
+GC_PAUSE_MS = [Histogram((0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)) for _ in range(3)]
+gc_started = None
+
+
+def record_gc_pause(phase, info):
+    global gc_started
+    if phase == "start":
+        gc_started = time.perf_counter()
+    elif gc_started is not None:
+        GC_PAUSE_MS[info["generation"]].observe((time.perf_counter() - gc_started) * 1000)
+        gc_started = None
+
+
+gc.callbacks.append(record_gc_pause)
+
+
+def gc_metrics():
+    """GC pause histograms per generation; each worker reports its own."""
+    lines = ["# TYPE app_gc_pause_ms histogram"]
+    for generation, histogram in enumerate(GC_PAUSE_MS):
+        lines.extend(histogram.samples("app_gc_pause_ms", f'generation="{generation}"'))
+    lines += [
+        "# TYPE app_gc_frozen_objects gauge",
+        f"app_gc_frozen_objects {gc.get_freeze_count()}",
+        "# TYPE app_worker_pid gauge",
+        f"app_worker_pid {os.getpid()}",
+    ]
+    return lines
+
+
+# === ADMISSION CONTROL ===
+def request_arrival(environ):
+    """Wall-clock arrival time, from X-Request-Start (t=<microseconds>) if set.
+
+    gunicorn does not expose when it accepted a connection, so without the
+    header the queue time only covers the app itself; the accept backlog is
+    bounded separately with GUNICORN_BACKLOG.
+    """
+    header = environ.get("HTTP_X_REQUEST_START", "")
+    try:
+        return int(header.removeprefix("t=")) / 1_000_000
+    except ValueError:
+        return time.time()
+
+
+class AdmissionControl:
+    """WSGI middleware that sheds requests beyond MAX_IN_FLIGHT with a 503."""
+
+    def __init__(self, wsgi_app, max_in_flight):
+        self.wsgi_app = wsgi_app
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self.lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                start_response(
+                    "503 Service Unavailable",
+                    [
+                        ("Content-Type", "text/plain"),
+                        ("Retry-After", RETRY_AFTER_SECONDS),
+                    ],
+                )
+                return [b"Service Unavailable"]
+            self.in_flight += 1
+        environ["benchmark.arrived_at"] = request_arrival(environ)
+        try:
+            app_iter = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self.release()
+            raise
+        # Streamed responses stay in flight until the server closes them.
+        return ClosingIterator(app_iter, self.release)
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+admission_control = None
+if MAX_IN_FLIGHT or MEASURE_QUEUE_TIME:
+    admission_control = AdmissionControl(app.wsgi_app, MAX_IN_FLIGHT)
+    app.wsgi_app = admission_control
+
+    @app.before_request
+    def record_queue_time():
+        arrived_at = request.environ.get("benchmark.arrived_at")
+        if arrived_at is not None:
+            g.queue_time_ms = max(0.0, (time.time() - arrived_at) * 1000)
+            QUEUE_TIME_MS.observe(g.queue_time_ms)
+
+    @app.after_request
+    def add_queue_time_header(response):
+        if "queue_time_ms" in g:
+            response.headers["X-Queue-Time-Ms"] = f"{g.queue_time_ms:.3f}"
+        return response
+
+
+# === READ REPLICA ===
+# Views whose queries go to the replica
+READ_ENDPOINTS = {"get_product", "list_products", "fortune_100"}
+LSN_PATTERN = re.compile(r"[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}")
+REPLAYED_SQL = text(
+    "SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)"
+)
+WRITE_LSN_SQL = text("SELECT pg_current_wal_lsn()::text")
+
+
+def replica_caught_up(min_lsn):
+    """Whether the replica has replayed the WAL up to `min_lsn`."""
+    if not LSN_PATTERN.fullmatch(min_lsn):
+        abort(400, description="X-Min-LSN must be a WAL position such as 0/16B3748")
+    with db.engines["replica"].connect() as conn:
+        return bool(conn.scalar(REPLAYED_SQL, {"lsn": min_lsn}))
+
+
+def read_engine():
+    return db.engines["replica"] if g.get("db_role") == "replica" else db.engine
+
+
+if DB_REPLICA_HOST and not memory_store:
+
+    @app.before_request
+    def route_reads():
+        # Read-your-writes: a client sends the X-Write-LSN of its last write
+        # back as X-Min-LSN, and reads the primary until the replica has
+        # replayed that far.
+        if request.endpoint in READ_ENDPOINTS:
+            min_lsn = request.headers.get("X-Min-LSN")
+            caught_up = not min_lsn or replica_caught_up(min_lsn)
+            g.db_role = "replica" if caught_up else "primary"
+
+    @app.after_request
+    def add_routing_headers(response):
+        if "db_role" in g:
+            response.headers["X-DB-Role"] = g.db_role
+        elif request.method in ("POST", "PUT", "DELETE") and response.status_code < 400:
+            response.headers["X-Write-LSN"] = db.session.scalar(WRITE_LSN_SQL)
+        return response
+
+
+# === COMPRESSION ===
+# The canonical COMPRESSORS, negotiate_encoding and compress; both FastAPI
+# apps paste them unchanged.
+COMPRESSORS = {
+    "gzip": lambda body, level: gzip.compress(body, compresslevel=level, mtime=0),
+    "br": lambda body, level: brotli.compress(body, quality=level),
+    "zstd": lambda body, level: zstandard.ZstdCompressor(level=level).compress(body),
+}
+# Levels suited to compressing on the fly; brotli's own default (11) is
+# meant for static assets.
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+
+def negotiate_encoding(accept_encoding):
+    """First encoding of COMPRESSION that Accept-Encoding allows (q > 0)."""
+    weights = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        try:
+            q = float(params.strip().removeprefix("q=")) if params else 1.0
+        except ValueError:
+            q = 0.0
+        weights[name.strip().lower()] = q
+    for encoding in COMPRESSION:
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    level = COMPRESSION_LEVEL or DEFAULT_COMPRESSION_LEVELS[encoding]
+    return COMPRESSORS[encoding](body, level)
+
+
+if COMPRESSION:
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+        # Streamed responses (fortune streaming, export) are sent as they are.
+        if (
+            encoding is None
+            or response.is_streamed
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # A strong ETag names the uncompressed bytes.
+            response.set_etag(etag, weak=True)
+        return response
+
+
+@app.errorhandler(OperationalError)
+def statement_timeout(error):
+    # Queries cancelled by DB_STATEMENT_TIMEOUT_MS fail fast like a shed request.
+    if isinstance(error.orig, QueryCanceled):
+        return (
+            "Statement timeout",
+            503,
+            {"Content-Type": "text/plain", "Retry-After": RETRY_AFTER_SECONDS},
+        )
+    raise error
+
+
 # === ROUTES ===
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    rejected = admission_control.rejected if admission_control else 0
+    lines = [
+        "# TYPE app_requests_rejected_total counter",
+        f"app_requests_rejected_total {rejected}",
+        *QUEUE_TIME_MS.render("app_queue_time_ms"),
+        *gc_metrics(),
+    ]
+    return ("\n".join(lines) + "\n", 200, {"Content-Type": "text/plain; version=0.0.4"})
+
+
 @app.route("/plain-text", methods=["GET"])
 def plain_text():
     return ("Hello, world!", 200, {"Content-Type": "text/plain"})
@@ -68,39 +604,299 @@ def plain_text():
 
 @app.route("/json", methods=["GET"])
 def json_serialization():
-    return app.response_class(
-        ujson.dumps({"message": "Hello, world from JSON serialization endpoint!"}),
-        mimetype="application/json",
-    )
+    if "size" not in request.args:
+        return jsonify({"message": "Hello, world from JSON serialization endpoint!"})
+    try:
+        size = int(request.args["size"])
+        depth = int(request.args.get("depth", 1))
+    except ValueError:
+        abort(400, description="size and depth must be integers")
+    if not (0 <= size <= JSON_MAX_SIZE and 1 <= depth <= JSON_MAX_DEPTH):
+        abort(
+            400,
+            description=f"size must be 0-{JSON_MAX_SIZE}, depth 1-{JSON_MAX_DEPTH}",
+        )
+    return jsonify(json_payload(size, depth))
 
 
 @app.route("/products", methods=["POST"])
 def create_product():
     data = request.get_json()
+    if memory_store:
+        return jsonify(memory_store.create_many([data])[0].to_dict()), 201
     product = Product(**data)
     db.session.add(product)
     db.session.commit()
     return jsonify(product.to_dict()), 201
 
 
+@app.route("/products/bulk", methods=["POST"])
+def bulk_create_products():
+    data = request.get_json()
+    if not isinstance(data, list):
+        abort(400, description="Expected a JSON array of products")
+    if len(data) > BULK_MAX_ITEMS:
+        abort(400, description=f"At most {BULK_MAX_ITEMS} products per request")
+    if not data:
+        return jsonify([]), 201
+    if memory_store:
+        return jsonify([p.to_dict() for p in memory_store.create_many(data)]), 201
+    # Multi-row INSERT ... RETURNING in a single transaction.
+    stmt = insert(Product).returning(Product, sort_by_parameter_order=True)
+    # Serialize before the commit expires the instances (one SELECT each).
+    created = [p.to_dict() for p in db.session.scalars(stmt, data)]
+    db.session.commit()
+    return jsonify(created), 201
+
+
+# === CONDITIONAL GET ===
+def product_etag(id, version):
+    return f"{id}-{version}"
+
+
+def list_etag(versions):
+    """ETag over the (id, version) pairs of a page, in page order."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for id, version in versions:
+        digest.update(f"{id}-{version},".encode())
+    return digest.hexdigest()
+
+
+def not_modified(etag):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
 @app.route("/products/<int:id>", methods=["GET"])
 def get_product(id):
+    if memory_store:
+        product = memory_store.get(id)
+        if not product:
+            abort(404, description="Product not found")
+        etag = product_etag(id, product.version)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        response = jsonify(product.to_dict())
+        response.set_etag(etag)
+        return response
+    if request.if_none_match:
+        # Revalidation reads the version alone: an unchanged product is
+        # neither loaded in full nor serialized.
+        version = db.session.scalar(select(Product.version).where(Product.id == id))
+        if version is None:
+            abort(404, description="Product not found")
+        etag = product_etag(id, version)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
     product = db.session.get(Product, id)
     if not product:
         abort(404, description="Product not found")
-    return jsonify(product.to_dict())
+    response = jsonify(product.to_dict())
+    response.set_etag(product_etag(product.id, product.version))
+    return response
+
+
+def csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def ndjson_chunk(rows):
+    # The fields Product.to_dict has, with its float prices (the encoders
+    # differ on Decimal)
+    return b"".join(
+        json_dumps(
+            {**row._asdict(), "price": float(row.price) if row.price is not None else None}
+        )
+        + b"\n"
+        for row in rows
+    )
+
+
+def export_products(engine, format):
+    # Core rows from a server-side cursor, one chunk per EXPORT_BATCH_SIZE
+    # rows, so memory stays flat however large the table is. The public
+    # columns in Django's ProductSerializer order; version stays internal.
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(
+            select(
+                Product.id,
+                Product.name,
+                Product.description,
+                Product.brand,
+                Product.category,
+                Product.price,
+                Product.currency,
+                Product.stock,
+                Product.ean,
+                Product.color,
+                Product.size,
+                Product.availability,
+                Product.internal_id,
+            )
+        )
+        if format == "csv":
+            yield csv_chunk([result.keys()])
+        encode = csv_chunk if format == "csv" else ndjson_chunk
+        for batch in result.partitions():
+            yield encode(batch)
+
+
+def stats_statement(mode):
+    if mode == "naive":
+        # Full GROUP BY over product on every request, for comparison.
+        return (
+            select(
+                Product.category,
+                Product.availability,
+                func.count().label("product_count"),
+                func.coalesce(func.sum(Product.stock), 0).label("total_stock"),
+                func.min(Product.price).label("min_price"),
+                func.round(func.avg(Product.price), 2).label("avg_price"),
+                func.max(Product.price).label("max_price"),
+            )
+            .group_by(Product.category, Product.availability)
+            .order_by(Product.category, Product.availability)
+        )
+    stats = product_stats.c
+    avg_price = stats.price_sum / func.nullif(stats.price_count, 0)
+    return select(
+        stats.category,
+        stats.availability,
+        stats.product_count,
+        stats.total_stock,
+        stats.min_price,
+        func.round(avg_price, 2).label("avg_price"),
+        stats.max_price,
+    ).order_by(stats.category, stats.availability)
+
+
+def stats_to_dict(row):
+    data = row._asdict()
+    for field in ("min_price", "avg_price", "max_price"):
+        if data[field] is not None:
+            data[field] = float(data[field])
+    return data
+
+
+@app.route("/products/stats", methods=["GET"])
+def product_stats_endpoint():
+    require_postgres()
+    mode = request.args.get("mode", "summary")
+    if mode not in ("summary", "naive"):
+        abort(400, description="mode must be summary or naive")
+    rows = db.session.execute(stats_statement(mode))
+    return jsonify([stats_to_dict(row) for row in rows])
+
+
+def search_filters(args):
+    """WHERE clauses for /products/search; each one matches an index from the seeder."""
+    filters = []
+    for field in ("category", "brand", "availability"):
+        if field in args:
+            filters.append(getattr(Product, field) == args[field])
+    try:
+        if "min_price" in args:
+            filters.append(Product.price >= float(args["min_price"]))
+        if "max_price" in args:
+            filters.append(Product.price <= float(args["max_price"]))
+    except ValueError:
+        abort(400, description="min_price and max_price must be numbers")
+    if args.get("prefix"):
+        # name LIKE 'prefix%': product_name_prefix_idx (text_pattern_ops)
+        filters.append(Product.name.startswith(args["prefix"], autoescape=True))
+    if args.get("q"):
+        # UPPER(name) LIKE '%Q%': product_name_trgm_idx (pg_trgm), the same
+        # expression Django's icontains produces.
+        filters.append(
+            func.upper(Product.name).contains(args["q"].upper(), autoescape=True)
+        )
+    return filters
+
+
+@app.route("/products/search", methods=["GET"])
+def search_products():
+    require_postgres()
+    try:
+        limit = int(request.args.get("limit", 100))
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        abort(400, description="limit and offset must be integers")
+    if limit < 0 or offset < 0:
+        abort(400, description="limit and offset must not be negative")
+    stmt = (
+        select(Product)
+        .where(*search_filters(request.args))
+        .order_by(Product.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return jsonify([p.to_dict() for p in db.session.scalars(stmt)])
+
+
+@app.route("/products/export", methods=["GET"])
+def export():
+    require_postgres()
+    format = request.args.get("format", "ndjson")
+    if format not in EXPORT_MIMETYPES:
+        abort(400, description="format must be ndjson or csv")
+    return app.response_class(
+        export_products(db.engine, format), mimetype=EXPORT_MIMETYPES[format]
+    )
 
 
 @app.route("/products", methods=["GET"])
 def list_products():
+    ids = request.args.get("ids")
+    if ids is not None:
+        try:
+            ids = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            abort(400, description="ids must be comma-separated integers")
+        if len(ids) > BULK_MAX_ITEMS:
+            abort(400, description=f"At most {BULK_MAX_ITEMS} ids per request")
+        if memory_store:
+            return jsonify([p.to_dict() for p in memory_store.get_many(ids)])
+        # One array parameter keeps the statement text the same for any count.
+        stmt = select(Product).where(
+            Product.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+        )
+        return jsonify([p.to_dict() for p in db.session.scalars(stmt)])
     limit = int(request.args.get("limit", 100))
     offset = int(request.args.get("offset", 0))
+    if memory_store:
+        products = memory_store.page(limit, offset)
+        etag = list_etag((p.id, p.version) for p in products)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        response = jsonify([p.to_dict() for p in products])
+        response.set_etag(etag)
+        return response
+    if request.if_none_match:
+        versions = db.session.execute(
+            select(Product.id, Product.version).offset(offset).limit(limit)
+        )
+        etag = list_etag(versions)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
     products = Product.query.offset(offset).limit(limit).all()
-    return jsonify([p.to_dict() for p in products])
+    response = jsonify([p.to_dict() for p in products])
+    response.set_etag(list_etag((p.id, p.version) for p in products))
+    return response
 
 
 @app.route("/products/<int:id>", methods=["PUT"])
 def update_product(id):
+    if memory_store:
+        data = request.get_json()
+        product = memory_store.update(
+            id, {field: value for field, value in data.items() if hasattr(Product, field)}
+        )
+        if not product:
+            abort(404, description="Product not found")
+        return jsonify(product.to_dict())
     product = db.session.get(Product, id)
     if not product:
         abort(404, description="Product not found")
@@ -114,6 +910,10 @@ def update_product(id):
 
 @app.route("/products/<int:id>", methods=["DELETE"])
 def delete_product(id):
+    if memory_store:
+        if not memory_store.delete(id):
+            abort(404, description="Product not found")
+        return jsonify({"ok": True})
     product = db.session.get(Product, id)
     if not product:
         abort(404, description="Product not found")
@@ -122,9 +922,45 @@ def delete_product(id):
     return jsonify({"ok": True})
 
 
+def chunked(fragments, size):
+    """Join small template fragments into chunks of at least `size` characters."""
+    buffer, length = [], 0
+    for fragment in fragments:
+        buffer.append(fragment)
+        length += len(fragment)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_products(engine, rows):
+    # db.session is removed when the view returns, before the streamed body
+    # is rendered, so the cursor gets a session of its own.
+    with Session(engine) as session:
+        stmt = select(Product).limit(rows).execution_options(yield_per=FORTUNE_BATCH_SIZE)
+        yield from session.execute(stmt).scalars()
+
+
 @app.route("/fortune", methods=["GET"])
 def fortune_100():
-    products = Product.query.limit(100).all()
+    try:
+        rows = int(request.args.get("rows", 100))
+    except ValueError:
+        abort(400, description="rows must be an integer")
+    if rows < 0:
+        abort(400, description="rows must not be negative")
+    if FORTUNE_MODE == "streaming":
+        products = (
+            memory_store.page(rows) if memory_store else iter_products(read_engine(), rows)
+        )
+        fragments = stream_template("fortune.html", products=products)
+        return app.response_class(chunked(fragments, FORTUNE_CHUNK_SIZE), mimetype="text/html")
+    if memory_store:
+        products = memory_store.page(rows)
+    else:
+        products = Product.query.limit(rows).all()
     return render_template("fortune.html", products=products)
 
 
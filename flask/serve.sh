@@ -0,0 +1,18 @@
+#!/bin/sh
+# Starts the app under the server selected by SERVER (default: gunicorn).
+# Worker settings for gunicorn live in gunicorn.conf.py.
+set -e
+
+case "${SERVER:-gunicorn}" in
+  gunicorn)
+    exec gunicorn app:app
+    ;;
+  granian)
+    exec granian --interface wsgi --host 0.0.0.0 --port 8001 \
+      --workers "${WEB_WORKERS:-1}" --blocking-threads "${WORKER_THREADS:-1}" app:app
+    ;;
+  *)
+    echo "Unsupported SERVER for a WSGI app: ${SERVER}" >&2
+    exit 1
+    ;;
+esac
@@ -0,0 +1,840 @@
+"""
+Closed-loop HTTP load generator for the harness modes wrk cannot cover.
+
+wrk only reports aggregate latency, so cases that need per-request status
+codes or response headers (goodput, admitted-only percentiles, server-side
+queue time, ...) run through this module instead. Each of ``concurrency``
+workers sends requests back to back for ``duration`` seconds over its own
+keep-alive connection. ``run_soak`` drives one endpoint for hours, either
+the same way or at a fixed request rate, and keeps per-second windows
+instead of every sample. ``run_connection_churn`` and ``run_connection_storm``
+open a new TCP connection every few requests, or in bursts, over plain
+sockets so the time to connect can be measured on its own.
+``run_multiplexed`` compares HTTP/2 streams with HTTP/1.1 connections.
+``run_read_your_writes`` mixes product updates with reads of the same
+products to catch reads a lagging replica serves stale. ``run_crud`` keeps
+a pool of live product ids so updates and deletes hit real rows.
+``time_to_first_byte`` covers the sequential probes that time streamed
+responses chunk by chunk.
+"""
+
+import asyncio
+import random
+import time
+from collections import Counter
+from contextlib import suppress
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+
+
+@dataclass
+class Sample:
+    started: float  # seconds since the start of the run
+    latency: float  # seconds
+    status: int  # 0 when the request failed at the transport level
+    queue_time_ms: float | None = None
+    connect_time: float | None = None  # seconds, on a connection's first request
+    connect_error: bool = False
+    db_role: str | None = None  # X-DB-Role of a read: "primary" or "replica"
+    stale: bool = False  # a read that missed this worker's last write
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list; None when it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+async def _worker(
+    client, method, path, body, headers, deadline, started, record, interval=None, offset=0
+):
+    """Send requests until `deadline`, back to back or one every `interval` seconds.
+
+    Paced requests are timed from when they were due, not from when they
+    went out, so a server that falls behind shows up in the latencies.
+    """
+    due = started + offset
+    while (now := time.perf_counter()) < deadline:
+        if interval:
+            if due > now:
+                await asyncio.sleep(due - now)
+            now, due = due, due + interval
+            if now >= deadline:
+                break
+        # Lets the app measure queueing in front of it (proxy convention).
+        request_headers = {**headers, "X-Request-Start": f"t={int(time.time() * 1_000_000)}"}
+        try:
+            response = await client.request(
+                method, path, content=body, headers=request_headers
+            )
+            status = response.status_code
+            queue_time = response.headers.get("x-queue-time-ms")
+        except httpx.HTTPError:
+            status, queue_time = 0, None
+        record(
+            Sample(
+                started=now - started,
+                latency=time.perf_counter() - now,
+                status=status,
+                queue_time_ms=float(queue_time) if queue_time else None,
+            )
+        )
+
+
+async def _run(
+    base_url, method, path, concurrency, duration, body, headers, timeout, record, rate=None
+):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    # At a fixed rate each worker sends every concurrency/rate seconds, the
+    # workers staggered evenly across that interval.
+    interval = concurrency / rate if rate else None
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(
+                _worker(
+                    client,
+                    method,
+                    path,
+                    body,
+                    headers,
+                    deadline,
+                    started,
+                    record,
+                    interval,
+                    i * interval / concurrency if interval else 0,
+                )
+                for i in range(concurrency)
+            )
+        )
+        return time.perf_counter() - started
+
+
+def run_load(
+    base_url, method, path, concurrency, duration, body=None, headers=None, timeout=30
+):
+    """Drive one endpoint and return (samples, elapsed_seconds)."""
+    samples = []
+    elapsed = asyncio.run(
+        _run(
+            base_url,
+            method,
+            path,
+            concurrency,
+            duration,
+            body,
+            headers or {},
+            timeout,
+            samples.append,
+        )
+    )
+    return samples, elapsed
+
+
+class TimeSeries:
+    """Per-second windows of completed requests.
+
+    Only the window still open keeps its latencies, so memory stays flat
+    however long the run is.
+    """
+
+    def __init__(self):
+        self.windows = []
+        self._second = 0
+        self._latencies = []
+        self._errors = 0
+        self._non_2xx = 0
+
+    def record(self, sample):
+        second = int(sample.started + sample.latency)
+        while second > self._second:
+            self._close()
+        self._latencies.append(sample.latency)
+        if sample.status == 0 or sample.status >= 500:
+            self._errors += 1
+        elif not 200 <= sample.status < 300:
+            self._non_2xx += 1
+
+    def _close(self):
+        self.windows.append(
+            {
+                "second": self._second,
+                "requests": len(self._latencies),
+                "p50_ms": _ms(percentile(self._latencies, 50)),
+                "p99_ms": _ms(percentile(self._latencies, 99)),
+                "max_ms": _ms(max(self._latencies, default=None)),
+                "errors": self._errors,
+                "non_2xx": self._non_2xx,
+            }
+        )
+        self._second += 1
+        self._latencies, self._errors, self._non_2xx = [], 0, 0
+
+    def finish(self):
+        if self._latencies:
+            self._close()
+        return self.windows
+
+
+def run_soak(
+    base_url,
+    method,
+    path,
+    concurrency,
+    duration,
+    rate=None,
+    body=None,
+    headers=None,
+    timeout=30,
+):
+    """Drive one endpoint for `duration` seconds and return its per-second windows.
+
+    Without `rate` the `concurrency` workers send back to back (closed loop);
+    with it they send `rate` requests per second between them (open loop,
+    limited to `concurrency` requests in flight).
+    """
+    series = TimeSeries()
+    asyncio.run(
+        _run(
+            base_url,
+            method,
+            path,
+            concurrency,
+            duration,
+            body,
+            headers or {},
+            timeout,
+            series.record,
+            rate,
+        )
+    )
+    return series.finish()
+
+
+async def _run_multiplexed(
+    base_url,
+    path,
+    connections,
+    streams,
+    duration,
+    http2,
+    background_path,
+    timeout,
+    record,
+    background_record,
+):
+    # h2 multiplexes a connection's streams; HTTP/1.1 needs a connection per
+    # request in flight, so each client gets as many as it has streams.
+    clients = [
+        httpx.AsyncClient(
+            base_url=base_url,
+            http1=not http2,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=1 if http2 else streams,
+                max_keepalive_connections=1 if http2 else streams,
+            ),
+            timeout=timeout,
+        )
+        for _ in range(connections)
+    ]
+    try:
+        started = time.perf_counter()
+        deadline = started + duration
+        workers = []
+        for client in clients:
+            for stream in range(streams):
+                if background_path and stream == 0:
+                    worker_path, worker_record = background_path, background_record
+                else:
+                    worker_path, worker_record = path, record
+                workers.append(
+                    _worker(client, "GET", worker_path, None, {}, deadline, started, worker_record)
+                )
+        await asyncio.gather(*workers)
+        return time.perf_counter() - started
+    finally:
+        for client in clients:
+            await client.aclose()
+
+
+def run_multiplexed(
+    base_url, path, connections, streams, duration, http2=True, background_path=None, timeout=30
+):
+    """GET `path` over `connections` clients with `streams` requests in flight on each.
+
+    With `http2` every client holds one h2c connection (HTTP/2 over
+    cleartext, by prior knowledge) and multiplexes its streams on it;
+    otherwise it opens one HTTP/1.1 keep-alive connection per stream. With
+    `background_path` the first stream of every client requests that path
+    instead, so the latency of `path` shows the head-of-line blocking slower
+    responses sharing its connection cause. Returns (samples,
+    background_samples, elapsed_seconds).
+    """
+    samples, background = [], []
+    elapsed = asyncio.run(
+        _run_multiplexed(
+            base_url,
+            path,
+            connections,
+            streams,
+            duration,
+            http2,
+            background_path,
+            timeout,
+            samples.append,
+            background.append,
+        )
+    )
+    return samples, background, elapsed
+
+
+def summarize_multiplexed(samples, background, elapsed):
+    """Throughput and latency of a multiplexed run, and of its background requests."""
+    latencies = [s.latency for s in samples if s.status]
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "errors": sum(1 for s in samples if s.status == 0),
+        "non_2xx": sum(1 for s in samples if s.status and not 200 <= s.status < 300),
+        "latency_p50_ms": _ms(percentile(latencies, 50)),
+        "latency_p99_ms": _ms(percentile(latencies, 99)),
+        "latency_max_ms": _ms(max(latencies, default=None)),
+        "background_rps": round(len(background) / elapsed, 2),
+        "background_p99_ms": _ms(percentile([s.latency for s in background if s.status], 99)),
+    }
+
+
+async def _read_write_worker(
+    client, ids, write_fraction, min_lsn, deadline, started, records
+):
+    """Update `ids` (owned by this worker alone) and read them back until `deadline`.
+
+    A write sets a new stock; the read of the same product right after it,
+    and any later read, is stale when it returns another stock. With
+    `min_lsn` the reads send the last write's X-Write-LSN as X-Min-LSN.
+    """
+    write_record, read_after_write_record, read_record = records
+    written = {}  # id -> stock last written
+    lsn = None
+    while (now := time.perf_counter()) < deadline:
+        product_id = random.choice(ids)
+        record = read_record
+        if random.random() < write_fraction:
+            stock = written.get(product_id, 0) + 1
+            try:
+                response = await client.put(f"/products/{product_id}", json={"stock": stock})
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            # A failed write leaves the product's stock as last written
+            if status == 200:
+                written[product_id] = stock
+                lsn = response.headers.get("x-write-lsn") or lsn
+            write_record(
+                Sample(started=now - started, latency=time.perf_counter() - now, status=status)
+            )
+            now = time.perf_counter()
+            record = read_after_write_record
+        headers = {"X-Min-LSN": lsn} if min_lsn and lsn else {}
+        try:
+            response = await client.get(f"/products/{product_id}", headers=headers)
+            status = response.status_code
+            role = response.headers.get("x-db-role")
+            stale = (
+                status == 200
+                and product_id in written
+                and response.json()["stock"] != written[product_id]
+            )
+        except httpx.HTTPError:
+            status, role, stale = 0, None, False
+        record(
+            Sample(
+                started=now - started,
+                latency=time.perf_counter() - now,
+                status=status,
+                db_role=role,
+                stale=stale,
+            )
+        )
+
+
+async def _run_read_your_writes(
+    base_url, ids, concurrency, duration, write_fraction, min_lsn, timeout, records
+):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(
+                _read_write_worker(
+                    client, ids[i::concurrency], write_fraction, min_lsn, deadline, started, records
+                )
+                for i in range(concurrency)
+                if ids[i::concurrency]
+            )
+        )
+        return time.perf_counter() - started
+
+
+def run_read_your_writes(
+    base_url, ids, concurrency, duration, write_fraction, min_lsn=True, timeout=30
+):
+    """Mix product updates (PUT) with reads (GET) of the products `ids`.
+
+    Each worker owns its share of `ids`, so any read of a product returning
+    a stock other than the one the worker last wrote is stale. A
+    `write_fraction` of the iterations update a product and read it back
+    straight away; the rest read a random product. Returns (writes,
+    reads_after_write, reads, elapsed_seconds).
+    """
+    writes, reads_after_write, reads = [], [], []
+    elapsed = asyncio.run(
+        _run_read_your_writes(
+            base_url,
+            list(ids),
+            concurrency,
+            duration,
+            write_fraction,
+            min_lsn,
+            timeout,
+            (writes.append, reads_after_write.append, reads.append),
+        )
+    )
+    return writes, reads_after_write, reads, elapsed
+
+
+def summarize_read_your_writes(writes, reads_after_write, reads, elapsed):
+    """Throughput, stale reads and primary fallbacks of a read/write run."""
+    all_reads = reads_after_write + reads
+    ok_reads = [s for s in all_reads if s.status == 200]
+    after_write = [s.latency for s in reads_after_write if s.status]
+
+    def pct(count, total):
+        return round(100 * count / total, 2) if total else None
+
+    return {
+        "requests": len(writes) + len(all_reads),
+        "throughput_rps": round((len(writes) + len(all_reads)) / elapsed, 2),
+        "write_rps": round(len(writes) / elapsed, 2),
+        "read_rps": round(len(all_reads) / elapsed, 2),
+        "errors": sum(1 for s in writes + all_reads if s.status == 0),
+        "non_2xx": sum(1 for s in writes + all_reads if s.status and not 200 <= s.status < 300),
+        "write_p99_ms": _ms(percentile([s.latency for s in writes if s.status], 99)),
+        "read_p50_ms": _ms(percentile([s.latency for s in all_reads if s.status], 50)),
+        "read_p99_ms": _ms(percentile([s.latency for s in all_reads if s.status], 99)),
+        "read_after_write_p99_ms": _ms(percentile(after_write, 99)),
+        "stale_reads": sum(1 for s in ok_reads if s.stale),
+        "stale_read_pct": pct(sum(1 for s in ok_reads if s.stale), len(ok_reads)),
+        "stale_after_write_pct": pct(
+            sum(1 for s in reads_after_write if s.stale),
+            sum(1 for s in reads_after_write if s.status == 200),
+        ),
+        "replica_read_pct": pct(sum(1 for s in ok_reads if s.db_role == "replica"), len(ok_reads)),
+        "primary_fallback_pct": pct(
+            sum(1 for s in ok_reads if s.db_role == "primary"), len(ok_reads)
+        ),
+    }
+
+
+# Statuses that count as a successful operation in run_crud
+CRUD_EXPECTED_STATUS = {
+    "create": {200, 201},
+    "read": {200},
+    "update": {200},
+    "delete": {200, 204},
+}
+
+
+class IdPool:
+    """Ids of the products that exist, shared by the run_crud workers.
+
+    An id is taken out of the pool while a request on it is in flight, so
+    no two workers act on the same row at once and an update never races
+    the delete of its row. The workers share one event loop and never await
+    between taking and returning an id, so no lock is needed.
+    """
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def take(self):
+        """A random id, or None when the pool is empty."""
+        if not self.ids:
+            return None
+        i = random.randrange(len(self.ids))
+        self.ids[i], self.ids[-1] = self.ids[-1], self.ids[i]
+        return self.ids.pop()
+
+    def put(self, product_id):
+        self.ids.append(product_id)
+
+
+async def _crud_worker(client, pool, mix, create_body, update_body, deadline, started, records):
+    operations, weights = list(mix), list(mix.values())
+    headers = {"Content-Type": "application/json"}
+    while (now := time.perf_counter()) < deadline:
+        operation = random.choices(operations, weights)[0]
+        product_id = None if operation == "create" else pool.take()
+        if product_id is None:
+            operation = "create"  # nothing left to read, update or delete
+        path = f"/products/{product_id}" if product_id is not None else "/products"
+        try:
+            if operation == "create":
+                response = await client.post(path, content=create_body, headers=headers)
+            elif operation == "read":
+                response = await client.get(path)
+            elif operation == "update":
+                response = await client.put(path, content=update_body, headers=headers)
+            else:
+                response = await client.delete(path)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        ok = status in CRUD_EXPECTED_STATUS[operation]
+        if operation == "create":
+            if ok:
+                with suppress(ValueError, KeyError, TypeError):
+                    pool.put(response.json()["id"])
+        elif not (operation == "delete" and ok) and status != 404:
+            # A 404 means the row is gone after all; keep it out of the pool.
+            pool.put(product_id)
+        records[operation](
+            Sample(started=now - started, latency=time.perf_counter() - now, status=status)
+        )
+
+
+async def _run_crud(
+    base_url, pool, concurrency, duration, mix, create_body, update_body, timeout, records
+):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(
+                _crud_worker(
+                    client, pool, mix, create_body, update_body, deadline, started, records
+                )
+                for _ in range(concurrency)
+            )
+        )
+        return time.perf_counter() - started
+
+
+def run_crud(
+    base_url, ids, concurrency, duration, mix, create_body, update_body, timeout=30
+):
+    """Drive the product CRUD endpoints against rows that exist.
+
+    `ids` seeds the pool of live products; created products join it and
+    deleted ones leave it, and reads, updates and deletes draw from it.
+    `mix` maps each of create, read, update and delete to its relative
+    weight. Returns ({operation: samples}, live_ids_left, elapsed_seconds).
+    """
+    pool = IdPool(ids)
+    samples = {operation: [] for operation in CRUD_EXPECTED_STATUS}
+    elapsed = asyncio.run(
+        _run_crud(
+            base_url,
+            pool,
+            concurrency,
+            duration,
+            mix,
+            create_body,
+            update_body,
+            timeout,
+            {operation: s.append for operation, s in samples.items()},
+        )
+    )
+    return samples, len(pool), elapsed
+
+
+def summarize_crud(samples, elapsed):
+    """One row per operation, and one for all of them.
+
+    Only responses with an expected status (CRUD_EXPECTED_STATUS) count as
+    successful operations; every other status is tallied in
+    `failed_statuses` (0: transport error).
+    """
+    ok = {
+        op: [s for s in group if s.status in CRUD_EXPECTED_STATUS[op]]
+        for op, group in samples.items()
+    }
+    groups = [(op, samples[op], ok[op]) for op in samples]
+    groups.append(
+        (
+            "all",
+            [s for group in samples.values() for s in group],
+            [s for group in ok.values() for s in group],
+        )
+    )
+    rows = []
+    for operation, group, successes in groups:
+        failed = Counter(s.status for s in group) - Counter(s.status for s in successes)
+        failed_statuses = " ".join(f"{status}:{n}" for status, n in sorted(failed.items()))
+        rows.append(
+            {
+                "operation": operation,
+                "requests": len(group),
+                "ok": len(successes),
+                "ok_rps": round(len(successes) / elapsed, 2),
+                "failed": len(group) - len(successes),
+                "failed_statuses": failed_statuses,
+                "ok_p50_ms": _ms(percentile([s.latency for s in successes], 50)),
+                "ok_p99_ms": _ms(percentile([s.latency for s in successes], 99)),
+            }
+        )
+    return rows
+
+
+def summarize(samples, elapsed):
+    """Goodput and latency percentiles, split into admitted and shed requests.
+
+    A request is *admitted* when the server handled it (any response other
+    than a 503 shed); goodput counts only 2xx responses.
+    """
+    admitted = [s for s in samples if s.status and s.status != 503]
+    ok = [s for s in admitted if 200 <= s.status < 300]
+    queue_times = [s.queue_time_ms for s in admitted if s.queue_time_ms is not None]
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "goodput_rps": round(len(ok) / elapsed, 2),
+        "shed_503": sum(1 for s in samples if s.status == 503),
+        "errors": sum(1 for s in samples if s.status == 0),
+        "non_2xx_admitted": len(admitted) - len(ok),
+        "admitted_p50_ms": _ms(percentile([s.latency for s in admitted], 50)),
+        "admitted_p99_ms": _ms(percentile([s.latency for s in admitted], 99)),
+        "all_p99_ms": _ms(percentile([s.latency for s in samples], 99)),
+        "queue_p50_ms": percentile(queue_times, 50),
+        "queue_p99_ms": percentile(queue_times, 99),
+    }
+
+
+# Anything that ends an exchange on a raw connection early
+_CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncio.IncompleteReadError,
+    asyncio.LimitOverrunError,
+    ValueError,
+    IndexError,
+)
+
+
+def _request_bytes(host, port, path, close):
+    connection = "close" if close else "keep-alive"
+    return (
+        f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+        f"Connection: {connection}\r\n\r\n"
+    ).encode()
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response off `reader`.
+
+    Returns its status code and whether the server keeps the connection open
+    (gunicorn's sync workers, for one, close it after every response).
+    """
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split()[1])
+    headers = {}
+    for line in head[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)  # the chunk and its CRLF
+            if not size:
+                break
+    else:
+        await reader.read()  # delimited by the server closing the connection
+        return status, False
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def _connection(host, port, requests, started, record, timeout):
+    """Open a connection, send each of `requests` in turn over it and close it.
+
+    Stops early when the server closes the connection.
+    """
+    connect_started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except _CONNECTION_ERRORS:
+        record(
+            Sample(
+                started=connect_started - started,
+                latency=time.perf_counter() - connect_started,
+                status=0,
+                connect_error=True,
+            )
+        )
+        return
+    connect_time = time.perf_counter() - connect_started
+    try:
+        for i, request in enumerate(requests):
+            now = time.perf_counter()
+            try:
+                writer.write(request)
+                status, keep_alive = await asyncio.wait_for(_read_response(reader), timeout)
+            except _CONNECTION_ERRORS:
+                status, keep_alive = 0, False
+            record(
+                Sample(
+                    started=now - started,
+                    latency=time.perf_counter() - now,
+                    status=status,
+                    connect_time=connect_time if i == 0 else None,
+                )
+            )
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+        with suppress(*_CONNECTION_ERRORS):
+            await writer.wait_closed()
+
+
+async def _churn(host, port, path, concurrency, duration, requests_per_connection, record, timeout):
+    # The last request on each connection asks the server to close it.
+    requests = [_request_bytes(host, port, path, close=False)] * (requests_per_connection - 1)
+    requests.append(_request_bytes(host, port, path, close=True))
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await _connection(host, port, requests, started, record, timeout)
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+def run_connection_churn(
+    base_url, path, concurrency, duration, requests_per_connection=1, timeout=30
+):
+    """GET `path` for `duration` seconds, reconnecting every `requests_per_connection` requests.
+
+    With 1 every request goes out on a new connection with `Connection:
+    close`, like traffic from proxies and serverless clients that do not
+    pool. Servers that close connections themselves get fewer requests per
+    connection. Returns (samples, elapsed_seconds).
+    """
+    url = urlsplit(base_url)
+    samples = []
+    elapsed = asyncio.run(
+        _churn(
+            url.hostname,
+            url.port or 80,
+            path,
+            concurrency,
+            duration,
+            requests_per_connection,
+            samples.append,
+            timeout,
+        )
+    )
+    return samples, elapsed
+
+
+async def _storm(host, port, path, burst, bursts, interval, record, timeout):
+    request = [_request_bytes(host, port, path, close=True)]
+    started = time.perf_counter()
+    for i in range(bursts):
+        due = started + i * interval
+        if due > time.perf_counter():
+            await asyncio.sleep(due - time.perf_counter())
+        await asyncio.gather(
+            *(_connection(host, port, request, started, record, timeout) for _ in range(burst))
+        )
+    return time.perf_counter() - started
+
+
+def run_connection_storm(base_url, path, burst, bursts, interval, timeout=30):
+    """Open `burst` connections at once, `bursts` times, one every `interval` seconds.
+
+    Each connection sends a single `Connection: close` GET. A burst larger
+    than the server's listen backlog overflows its accept queue; the dropped
+    SYNs are retried by the kernel and show up as connect times of a second
+    or more. Returns (samples, elapsed_seconds).
+    """
+    url = urlsplit(base_url)
+    samples = []
+    elapsed = asyncio.run(
+        _storm(
+            url.hostname,
+            url.port or 80,
+            path,
+            burst,
+            bursts,
+            interval,
+            samples.append,
+            timeout,
+        )
+    )
+    return samples, elapsed
+
+
+def summarize_connections(samples, elapsed):
+    """Throughput, request latency and connect time percentiles of a churn or storm run."""
+    connected = [s.connect_time for s in samples if s.connect_time is not None]
+    requests = [s for s in samples if not s.connect_error]
+    ok = [s for s in requests if 200 <= s.status < 300]
+    return {
+        "connections": len(connected),
+        "connect_errors": sum(1 for s in samples if s.connect_error),
+        "connections_per_sec": round(len(connected) / elapsed, 2),
+        "requests": len(requests),
+        "requests_per_connection": round(len(requests) / len(connected), 2) if connected else 0,
+        "throughput_rps": round(len(requests) / elapsed, 2),
+        "goodput_rps": round(len(ok) / elapsed, 2),
+        "errors": sum(1 for s in requests if s.status == 0),
+        "non_2xx": sum(1 for s in requests if s.status and not 200 <= s.status < 300),
+        "connect_p50_ms": _ms(percentile(connected, 50)),
+        "connect_p99_ms": _ms(percentile(connected, 99)),
+        "connect_max_ms": _ms(max(connected, default=None)),
+        "latency_p50_ms": _ms(percentile([s.latency for s in requests], 50)),
+        "latency_p99_ms": _ms(percentile([s.latency for s in requests], 99)),
+    }
+
+
+def time_to_first_byte(base_url, path, requests, params=None, timeout=60):
+    """Send `requests` sequential GETs and time each one's first body byte.
+
+    Returns a list of (ttfb_seconds, total_seconds, body_bytes). Headers of a
+    streamed response can go out before any body has been rendered, so the
+    clock stops at the first body chunk rather than at the response headers.
+    """
+    timings = []
+    with httpx.Client(base_url=base_url, timeout=timeout) as client:
+        for _ in range(requests):
+            started = time.perf_counter()
+            first_byte, size = None, 0
+            with client.stream("GET", path, params=params) as response:
+                response.raise_for_status()
+                for chunk in response.iter_raw():
+                    if first_byte is None:
+                        first_byte = time.perf_counter()
+                    size += len(chunk)
+            finished = time.perf_counter()
+            timings.append(((first_byte or finished) - started, finished - started, size))
+    return timings
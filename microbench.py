@@ -0,0 +1,514 @@
+"""
+In-process microbenchmarks of the Python apps: no Docker, no network.
+
+Each target imports one app and calls its WSGI or ASGI callable directly
+with a hand-built environ or scope, so a change to a hot path can be
+checked in seconds instead of rebuilding an image and running a 60-second
+wrk pass. Besides whole requests it times the layers a request goes through
+on their own: routing, validation, ORM hydration, serialization and
+template rendering. Each result has the time per call (mean, p50, p99) and
+what a call allocates according to tracemalloc (peak and retained bytes).
+
+Run it in an environment with the target's requirements installed:
+
+    pip install -r flask/requirements.txt
+    python microbench.py flask --storage memory
+
+The targets are flask, django-wsgi, django-asgi, fastapi-sync and
+fastapi-async. `all` runs each in its own process, since the apps share
+module names. With --storage postgres (the default) the apps connect to
+POSTGRES_HOST as they do under compose, and Create/Update Product write to
+that database; --storage memory serves data/products.csv from memory
+instead and skips the ORM layer.
+"""
+
+import argparse
+import asyncio
+import csv
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+TARGETS = {
+    "flask": {"dir": "flask", "module": "app", "callable": "app", "interface": "wsgi"},
+    "django-wsgi": {
+        "dir": "django",
+        "module": "core.wsgi",
+        "callable": "application",
+        "interface": "wsgi",
+    },
+    # Django's ASGI handler does not speak the lifespan protocol
+    "django-asgi": {
+        "dir": "django",
+        "module": "core.asgi",
+        "callable": "application",
+        "interface": "asgi",
+    },
+    "fastapi-sync": {
+        "dir": "fastapi-sync",
+        "module": "main",
+        "callable": "app",
+        "interface": "asgi",
+        "lifespan": True,
+    },
+    "fastapi-async": {
+        "dir": "fastapi-async",
+        "module": "main",
+        "callable": "app",
+        "interface": "asgi",
+        "lifespan": True,
+    },
+}
+
+# The harness's PRODUCT_JSON and PUT body (benchmark_wrk.py)
+PRODUCT_JSON = '{"name":"Test Product","price":99.99,"stock":100, "description": "desc", "brand": "brand", "category": "cat", "currency": "USD", "ean": "123", "color": "red", "size": "M", "availability": "in-stock", "internal_id": "123"}'
+UPDATE_JSON = '{"name":"Updated Product"}'
+
+# (name, method, path, body), named like the harness's TEST_CASES
+CASES = [
+    ("PlainText", "GET", "/plain-text", None),
+    ("JSON Echo", "GET", "/json", None),
+    ("Get Product", "GET", "/products/1", None),
+    ("List Products", "GET", "/products", None),
+    ("Create Product", "POST", "/products", PRODUCT_JSON),
+    ("Update Product", "PUT", "/products/1", UPDATE_JSON),
+    ("Fortune 100", "GET", "/fortune", None),
+]
+# Products the serialization and template layers work on, like /fortune
+LAYER_ROWS = 100
+
+
+# === MEASUREMENT ===
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list (as loadgen.percentile)."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(times_ns, peaks, retained):
+    return {
+        "calls": len(times_ns),
+        "mean_us": round(sum(times_ns) / len(times_ns) / 1000, 2),
+        "p50_us": round(percentile(times_ns, 50) / 1000, 2),
+        "p99_us": round(percentile(times_ns, 99) / 1000, 2),
+        "alloc_peak_bytes": round(sum(peaks) / len(peaks)),
+        "alloc_retained_bytes": round(sum(retained) / len(retained)),
+    }
+
+
+def measure(call, iterations, warmup, alloc_calls):
+    """Time `call` and then trace its allocations.
+
+    Allocations are traced on separate, fewer calls: tracemalloc slows every
+    allocation down and would distort the timings.
+    """
+    for _ in range(warmup):
+        call()
+    times = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        call()
+        times.append(time.perf_counter_ns() - started)
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_calls):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call()
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    return summarize(times, peaks, retained)
+
+
+async def measure_async(call, iterations, warmup, alloc_calls):
+    """measure() for a coroutine function, timed inside the running loop."""
+    for _ in range(warmup):
+        await call()
+    times = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        await call()
+        times.append(time.perf_counter_ns() - started)
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_calls):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await call()
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    return summarize(times, peaks, retained)
+
+
+def first_line(error):
+    """An exception as one line: validation errors run to dozens."""
+    message = str(error).splitlines()
+    return f"{error.__class__.__name__}: {message[0] if message else ''}"
+
+
+# === WSGI / ASGI DRIVERS ===
+def wsgi_request(app, method, path, body=None):
+    """Call a WSGI app once and drain its response; returns the status code."""
+    path, _, query = path.partition("?")
+    body = body.encode() if body else b""
+    environ = {
+        "REQUEST_METHOD": method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "HTTP_HOST": "localhost",
+        "CONTENT_TYPE": "application/json" if body else "",
+        "CONTENT_LENGTH": str(len(body)) if body else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    status = []
+
+    def start_response(line, headers, exc_info=None):
+        status.append(line)
+
+    result = app(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return int(status[0][:3])
+
+
+async def asgi_request(app, method, path, body=None):
+    """Call an ASGI app once and drain its response; returns the status code."""
+    path, _, query = path.partition("?")
+    body = body.encode() if body else b""
+    headers = [(b"host", b"localhost")]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", b"%d" % len(body))]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client never disconnects; apps listening for it get cancelled.
+        await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+class Lifespan:
+    """Drives an ASGI app's lifespan protocol around the benchmark."""
+
+    def __init__(self, app):
+        self.app = app
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        self.task = None
+
+    async def _event(self, sent, expected):
+        await self.inbox.put({"type": sent})
+        message = await self.outbox.get()
+        if message["type"] != expected:
+            raise RuntimeError(f"lifespan: {message}")
+
+    async def startup(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+        self.task = asyncio.create_task(self.app(scope, self.inbox.get, self.outbox.put))
+        await self._event("lifespan.startup", "lifespan.startup.complete")
+
+    async def shutdown(self):
+        await self._event("lifespan.shutdown", "lifespan.shutdown.complete")
+        await self.task
+
+
+# === LAYERS ===
+# Each returns {layer: callable or coroutine function}; the app module has
+# been imported and, for Django, set up.
+def flask_layers(module, memory):
+    from flask import render_template
+
+    app, db, Product = module.app, module.db, module.Product
+    # Kept pushed for the rest of the process
+    app.app_context().push()
+    adapter = app.url_map.bind("localhost")
+    payload = json.loads(PRODUCT_JSON)
+
+    def load():
+        products = Product.query.limit(LAYER_ROWS).all()
+        db.session.remove()
+        return products
+
+    products = module.memory_store.page(LAYER_ROWS) if memory else load()
+    layers = {
+        "routing": lambda: adapter.match("/products/1", "GET"),
+        # Flask has no schema: the body goes straight into the model.
+        "validation": lambda: Product(**payload),
+        "serialization": lambda: app.json.dumps([p.to_dict() for p in products]),
+        "template": lambda: render_template("fortune.html", products=products),
+    }
+    if not memory:
+        layers["orm"] = load
+    return layers
+
+
+def django_layers(module, memory):
+    from django.template.loader import render_to_string
+    from django.urls import resolve
+    from products.models import Product
+    from products.renderers import JSONRenderer
+    from products.serializers import ProductSerializer
+
+    payload = json.loads(PRODUCT_JSON)
+    renderer = JSONRenderer()
+
+    def load():
+        return list(Product.objects.all()[:LAYER_ROWS])
+
+    def validate():
+        ProductSerializer(data=payload).is_valid(raise_exception=True)
+
+    if memory:
+        from products.storage import memory_store
+
+        products = memory_store.page(LAYER_ROWS)
+    else:
+        products = load()
+    layers = {
+        "routing": lambda: resolve("/products/1"),
+        "validation": validate,
+        "serialization": lambda: renderer.render(ProductSerializer(products, many=True).data),
+        "template": lambda: render_to_string("fortune.html", {"products": products}),
+    }
+    if not memory:
+        layers["orm"] = load
+    return layers
+
+
+def fastapi_layers(module, memory, runner):
+    from fastapi.encoders import jsonable_encoder
+    from sqlalchemy import select
+    from starlette.routing import Match
+
+    app, Product = module.app, module.Product
+    scope = {"type": "http", "path": "/products/1", "method": "GET", "root_path": ""}
+    template = module.templates.get_template("fortune.html")
+
+    def route():
+        return next(r for r in app.router.routes if r.matches(scope)[0] == Match.FULL)
+
+    if hasattr(module, "async_session"):
+
+        async def load():
+            async with module.async_session() as session:
+                return (await session.scalars(select(Product).limit(LAYER_ROWS))).all()
+
+        products = module.memory_store.page(LAYER_ROWS) if memory else runner.run(load())
+    else:
+
+        def load():
+            with module.SessionLocal() as session:
+                return session.scalars(select(Product).limit(LAYER_ROWS)).all()
+
+        products = module.memory_store.page(LAYER_ROWS) if memory else load()
+
+    layers = {
+        "routing": route,
+        "validation": lambda: module.ProductCreate.model_validate_json(PRODUCT_JSON),
+        # What FastAPI does with a response_model: validate, encode, render
+        "serialization": lambda: module.json_dumps(
+            jsonable_encoder([module.ProductOut.model_validate(p) for p in products])
+        ),
+        "template": lambda: template.render(products=products),
+    }
+    if not memory:
+        layers["orm"] = load
+    return layers
+
+
+# === RUNNER ===
+def import_target(target, storage):
+    """Import a target's app with the storage backend selected; returns its module."""
+    spec = TARGETS[target]
+    app_dir = ROOT / spec["dir"]
+    os.environ["STORAGE_BACKEND"] = storage
+    os.environ.setdefault("PRODUCTS_CSV", str(ROOT / "data" / "products.csv"))
+    if spec["dir"] == "django":
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    # The apps resolve templates and caches relative to their directory.
+    os.chdir(app_dir)
+    sys.path.insert(0, str(app_dir))
+    return importlib.import_module(spec["module"])
+
+
+def run_target(target, storage, iterations, warmup, alloc_calls):
+    """Benchmark one target's requests and layers; returns the result rows."""
+    spec = TARGETS[target]
+    module = import_target(target, storage)
+    app = getattr(module, spec["callable"])
+    memory = storage == "memory"
+    rows = []
+
+    def record(kind, name, result):
+        row = {"target": target, "storage": storage, "kind": kind, "name": name, **result}
+        rows.append(row)
+        print(
+            f"  {kind:<8} {name:<16} {row['mean_us']:>10.2f} µs  p99 {row['p99_us']:>10.2f} µs  "
+            f"peak {row['alloc_peak_bytes']:>9} B  retained {row['alloc_retained_bytes']:>7} B"
+        )
+
+    print(f"\n🔬 {target} ({spec['interface'].upper()}, STORAGE_BACKEND={storage})")
+    with asyncio.Runner() as runner:
+        lifespan = Lifespan(app) if spec.get("lifespan") else None
+        if lifespan:
+            runner.run(lifespan.startup())
+
+        for name, method, path, body in CASES:
+            try:
+                if spec["interface"] == "wsgi":
+                    status = wsgi_request(app, method, path, body)
+                else:
+                    status = runner.run(asgi_request(app, method, path, body))
+            except Exception as e:
+                # Apps re-raise unhandled errors to the server, i.e. us
+                print(f"  ⚠️ Skipping {name}: {method} {path} raised {first_line(e)}")
+                continue
+            if not 200 <= status < 300:
+                print(f"  ⚠️ Skipping {name}: {method} {path} returned {status}")
+                continue
+            if spec["interface"] == "wsgi":
+                result = measure(
+                    lambda: wsgi_request(app, method, path, body), iterations, warmup, alloc_calls
+                )
+            else:
+                result = runner.run(
+                    measure_async(
+                        lambda: asgi_request(app, method, path, body),
+                        iterations,
+                        warmup,
+                        alloc_calls,
+                    )
+                )
+            record("request", name, result)
+
+        if spec["dir"] == "django":
+            layers = django_layers(module, memory)
+        elif spec["dir"] == "flask":
+            layers = flask_layers(module, memory)
+        else:
+            layers = fastapi_layers(module, memory, runner)
+        for name in ["routing", "validation", "orm", "serialization", "template"]:
+            if name not in layers:
+                continue
+            call = layers[name]
+            try:
+                if asyncio.iscoroutinefunction(call):
+                    result = runner.run(measure_async(call, iterations, warmup, alloc_calls))
+                else:
+                    result = measure(call, iterations, warmup, alloc_calls)
+            except Exception as e:
+                print(f"  ⚠️ Skipping {name}: {first_line(e)}")
+                continue
+            record("layer", name, result)
+
+        if lifespan:
+            runner.run(lifespan.shutdown())
+    return rows
+
+
+def append_csv(path, rows):
+    """Append rows to `path`, writing the header if the file is new."""
+    new = not path.exists() or not path.stat().st_size
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        if new:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process microbenchmarks of the Python apps.")
+    parser.add_argument("target", choices=[*TARGETS, "all"])
+    parser.add_argument("--storage", choices=["postgres", "memory"], default="postgres")
+    parser.add_argument("--iterations", type=int, default=2000, help="timed calls per case")
+    parser.add_argument("--warmup", type=int, default=200, help="untimed calls first")
+    parser.add_argument(
+        "--alloc-calls", type=int, default=50, help="calls traced for allocations"
+    )
+    parser.add_argument("--csv", type=Path, help="append the results to this CSV file")
+    args = parser.parse_args()
+
+    if args.target == "all":
+        # One process per target: the apps share module names (main, app)
+        # and configure themselves at import.
+        options = [
+            f"--storage={args.storage}",
+            f"--iterations={args.iterations}",
+            f"--warmup={args.warmup}",
+            f"--alloc-calls={args.alloc_calls}",
+        ]
+        if args.csv:
+            options.append(f"--csv={args.csv.resolve()}")
+        failed = [
+            target
+            for target in TARGETS
+            if subprocess.run([sys.executable, __file__, target, *options]).returncode
+        ]
+        if failed:
+            sys.exit(f"❌ Failed: {', '.join(failed)}")
+        return
+
+    csv_path = args.csv.resolve() if args.csv else None  # before chdir
+    rows = run_target(args.target, args.storage, args.iterations, args.warmup, args.alloc_calls)
+    if csv_path and rows:
+        append_csv(csv_path, rows)
+        print(f"🔬 Results appended to: {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
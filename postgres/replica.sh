@@ -0,0 +1,17 @@
+#!/bin/bash
+# Streaming replica of the db service. It keeps no state of its own: every
+# start clones the primary with pg_basebackup (-R writes standby.signal and
+# primary_conninfo) and then follows its WAL.
+set -e
+
+export PGPASSWORD="$POSTGRES_PASSWORD"
+until pg_isready -q -h db -U "$POSTGRES_USER"; do
+    sleep 1
+done
+
+rm -rf "${PGDATA:?}"/*
+pg_basebackup -h db -U "$POSTGRES_USER" -D "$PGDATA" -R -X stream
+chmod 700 "$PGDATA"
+
+# hot_standby_feedback keeps the primary's vacuum from cancelling reads
+exec postgres -c hot_standby=on -c hot_standby_feedback=on